@@ -0,0 +1,131 @@
+import argparse
+import json
+import logging
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+
+class FakeOllamaServer:
+    """Local stand-in for Ollama's /api/generate with controllable latency.
+
+    Streams ``tokens`` NDJSON chunks per request, the first after
+    ``first_token_latency`` seconds and the rest ``token_latency`` seconds
+    apart, so the LLM stage costs a known amount and the rest of the
+    pipeline can be measured in isolation.
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, tokens: int = 64,
+                 token_latency: float = 0.01, first_token_latency: float = 0.05):
+        self.tokens = tokens
+        self.token_latency = token_latency
+        self.first_token_latency = first_token_latency
+        self.requests = 0
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == "/api/tags":
+                    self._send_json({"models": [{"name": "fake"}]})
+                else:
+                    self._send_json({"error": "not found"}, status=404)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+                if self.path != "/api/generate":
+                    self._send_json({"error": "not found"}, status=404)
+                    return
+                server.requests += 1
+                model = request.get("model", "fake")
+                words = [f"token{i} " for i in range(server.tokens)]
+
+                if not request.get("stream", True):
+                    time.sleep(server.first_token_latency + server.token_latency * max(server.tokens - 1, 0))
+                    self._send_json({"model": model, "response": "".join(words), "done": True})
+                    return
+
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+
+                def write_chunk(payload):
+                    data = (json.dumps(payload) + "\n").encode("utf-8")
+                    self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+                    self.wfile.flush()
+
+                time.sleep(server.first_token_latency)
+                for i, word in enumerate(words):
+                    if i:
+                        time.sleep(server.token_latency)
+                    write_chunk({"model": model, "response": word, "done": False})
+                write_chunk({"model": model, "response": "", "done": True, "eval_count": server.tokens})
+                self.wfile.write(b"0\r\n\r\n")
+                self.wfile.flush()
+
+        return Handler
+
+    def start(self) -> "FakeOllamaServer":
+        """Serve in a background thread."""
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-ollama", daemon=True)
+        self._thread.start()
+        logger.info(f"Fake Ollama listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+def main(argv=None):
+    """Command-line entry point: python -m benchmarks.fake_ollama --port 11434"""
+    parser = argparse.ArgumentParser(description="Fake Ollama server with configurable token latency")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--tokens", type=int, default=64, help="Tokens streamed per request")
+    parser.add_argument("--token-latency-ms", type=float, default=10.0, help="Delay between tokens")
+    parser.add_argument("--first-token-ms", type=float, default=50.0, help="Delay before the first token")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    server = FakeOllamaServer(
+        args.host, args.port, tokens=args.tokens,
+        token_latency=args.token_latency_ms / 1000, first_token_latency=args.first_token_ms / 1000
+    )
+    print(f"Serving fake Ollama on {server.url}")
+    try:
+        server._server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server._server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,354 @@
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List
+import numpy as np
+import config
+from services import telemetry
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.synthetic_pdfs import WORDS, write_digital_pdf, write_scanned_pdf
+
+logger = logging.getLogger(__name__)
+
+RESULTS_DIR = config.BASE_DIR / "benchmarks" / "results"
+
+# Stage -> unit its throughput is reported in
+STAGE_UNITS = {
+    "extract": "pages",
+    "ocr": "pages",
+    "chunk": "chunks",
+    "embed": "chunks",
+    "index": "chunks",
+    "retrieve": "queries",
+    "pack": "queries",
+    "llm_first_token": "queries",
+    "llm_total": "queries",
+    "query_total": "queries"
+}
+
+# Metrics compared against a baseline run: (path, higher is better)
+COMPARED_METRICS = [
+    *[(("stages", stage, "p95_ms"), False) for stage in STAGE_UNITS],
+    *[(("stages", stage, "throughput"), True) for stage in STAGE_UNITS],
+    (("memory", "peak_rss_mb"), False)
+]
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    if not samples:
+        return {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p95_ms": float(np.percentile(ms, 95)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "max_ms": float(ms.max())
+    }
+
+
+def peak_rss_mb() -> Dict[str, float]:
+    """Peak resident set size of this process and of its (OCR) children, in MB."""
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return {
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale,
+        "peak_rss_children_mb": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / scale
+    }
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=config.BASE_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return "unknown"
+
+
+def isolate_storage(workdir: Path, embedding_cache: bool, ocr_cache: bool = False):
+    """Point every persistent store at a scratch directory so runs start cold and leave no trace."""
+    config.VECTOR_DB_PATH = workdir / "vectordb"
+    config.LEXICAL_INDEX_DIR = config.VECTOR_DB_PATH / "lexical"
+    config.EXACT_INDEX_DIR = config.VECTOR_DB_PATH / "exact"
+    config.COLLECTION_REGISTRY_PATH = config.VECTOR_DB_PATH / "collections.sqlite3"
+    config.INGEST_CACHE_DIR = workdir / "ingest_cache"
+    config.EMBEDDING_CACHE_PATH = workdir / "embedding_cache.sqlite3"
+    config.SUMMARY_CACHE_PATH = workdir / "summary_cache.sqlite3"
+    config.OCR_CACHE_PATH = workdir / "ocr_cache.sqlite3"
+    config.TRACE_DUMP_DIR = workdir / "traces"
+    config.EMBEDDING_CACHE_ENABLED = embedding_cache
+    config.OCR_CACHE_ENABLED = ocr_cache
+    for directory in (config.LEXICAL_INDEX_DIR, config.EXACT_INDEX_DIR, config.INGEST_CACHE_DIR):
+        directory.mkdir(parents=True, exist_ok=True)
+
+
+def generate_corpus(workdir: Path, args) -> List[Path]:
+    """Write the synthetic digital and scanned PDFs for this run."""
+    pdf_dir = workdir / "pdfs"
+    pdf_dir.mkdir()
+    paths = []
+    for i in range(args.digital_docs):
+        paths.append(write_digital_pdf(pdf_dir / f"digital_{i}.pdf", args.pages, seed=args.seed + i))
+    for i in range(args.scanned_docs):
+        paths.append(write_scanned_pdf(
+            pdf_dir / f"scanned_{i}.pdf", args.pages, seed=args.seed + 1000 + i,
+            dpi=args.scan_dpi, noise=args.scan_noise
+        ))
+    return paths
+
+
+class Benchmark:
+    """Drives the real ingestion pipeline and Q&A services over a synthetic corpus.
+
+    Ingestion runs through IngestPipeline.run, the same path as uploads;
+    per-stage timings are read back from the telemetry trace of each run.
+    """
+
+    def __init__(self, args, llm_endpoint: str):
+        from services.document_processor import DocumentProcessor
+        from services.ocr_service import OCRService
+        from services.embedding_service import EmbeddingService
+        from services.vector_db_service import VectorDBService
+        from services.llm_service import LLMService
+        from services.context_packer import ContextPacker
+        from services.ingest_cache import IngestCache
+        from services.ingest_pipeline import IngestPipeline
+
+        self.args = args
+        self.document_processor = DocumentProcessor()
+        self.ocr_service = OCRService()
+        self.embedding_service = EmbeddingService()
+        self.vector_db_service = VectorDBService(self.embedding_service)
+        self.llm_service = LLMService()
+        self.llm_service.endpoint = llm_endpoint
+        self.context_packer = ContextPacker()
+        # Reads config.INGEST_CACHE_DIR, which isolate_storage has pointed at the scratch directory
+        self.pipeline = IngestPipeline(
+            self.document_processor, self.ocr_service, self.embedding_service,
+            self.vector_db_service, IngestCache()
+        )
+
+        self.samples: Dict[str, List[float]] = {stage: [] for stage in STAGE_UNITS}
+        self.units: Dict[str, int] = {stage: 0 for stage in STAGE_UNITS}
+        self.busy: Dict[str, float] = {stage: 0.0 for stage in STAGE_UNITS}
+        self.collections: List[str] = []
+        self.counts = {"documents": 0, "pages": 0, "ocr_pages": 0, "chunks": 0, "llm_tokens": 0}
+
+    def record(self, stage: str, seconds: float, units: int = 1):
+        self.samples[stage].append(seconds)
+        self.busy[stage] += seconds
+        self.units[stage] += units
+
+    async def ingest(self, path: Path):
+        ocr_pages = 0
+
+        def progress(stage, done, total):
+            nonlocal ocr_pages
+            if stage == "ocr" and total:
+                ocr_pages = total
+
+        with telemetry.trace("benchmark_ingest", file=path.name) as ingest_trace:
+            result = await self.pipeline.run(str(path), progress=progress)
+        if result["from_cache"]:
+            raise RuntimeError(f"{path.name} was served from the ingest cache; storage is not isolated")
+
+        # Stage spans recorded by the services themselves, summed per stage
+        stage_ms = ingest_trace.breakdown()
+        chunks = len(result["chunks"])
+        for stage, units in (("extract", result["page_count"]), ("ocr", ocr_pages),
+                             ("chunk", chunks), ("embed", chunks), ("index", chunks)):
+            if stage in stage_ms:
+                self.record(stage, stage_ms[stage] / 1000, units)
+
+        self.collections.append(result["collection_name"])
+        self.counts["documents"] += 1
+        self.counts["pages"] += result["page_count"]
+        self.counts["ocr_pages"] += ocr_pages
+        self.counts["chunks"] += chunks
+
+    async def ask(self, collection_name: str, question: str):
+        query_started = time.perf_counter()
+        results = await asyncio.to_thread(
+            self.vector_db_service.query_collection, collection_name, question,
+            n_results=config.CONTEXT_CANDIDATES
+        )
+        self.record("retrieve", time.perf_counter() - query_started)
+
+        started = time.perf_counter()
+        context, _ = self.context_packer.pack(results)
+        self.record("pack", time.perf_counter() - started)
+
+        started = time.perf_counter()
+        first_token_at, tokens = None, 0
+        async for _ in self.llm_service.answer_question_stream(question, context):
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                self.record("llm_first_token", first_token_at - started)
+            tokens += 1
+        self.record("llm_total", time.perf_counter() - started)
+        self.record("query_total", time.perf_counter() - query_started)
+        self.counts["llm_tokens"] += tokens
+
+    async def run(self, paths: List[Path]) -> Dict[str, Any]:
+        wall = {}
+        started = time.perf_counter()
+        for path in paths:
+            await self.ingest(path)
+        wall["ingest_seconds"] = time.perf_counter() - started
+
+        rng = random.Random(self.args.seed)
+        questions = [
+            (rng.choice(self.collections), f"What does the {rng.choice(WORDS)} {rng.choice(WORDS)} clause say?")
+            for _ in range(self.args.queries)
+        ]
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def bounded(collection_name, question):
+            async with semaphore:
+                await self.ask(collection_name, question)
+
+        started = time.perf_counter()
+        await asyncio.gather(*[bounded(c, q) for c, q in questions])
+        wall["query_seconds"] = time.perf_counter() - started
+        await self.llm_service.aclose()
+
+        stages = {}
+        for stage, unit in STAGE_UNITS.items():
+            busy = self.busy[stage]
+            stages[stage] = {
+                "count": len(self.samples[stage]),
+                "unit": unit,
+                "units": self.units[stage],
+                "busy_seconds": busy,
+                # Units per second of time spent in the stage
+                "throughput": self.units[stage] / busy if busy > 0 else 0.0,
+                **percentiles(self.samples[stage])
+            }
+        wall["queries_per_second"] = self.args.queries / wall["query_seconds"] if wall["query_seconds"] else 0.0
+        wall["llm_tokens_per_second"] = (
+            self.counts["llm_tokens"] / self.busy["llm_total"] if self.busy["llm_total"] else 0.0
+        )
+        return {"stages": stages, "totals": dict(self.counts, **wall)}
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float) -> List[str]:
+    """List metrics that regressed by more than ``tolerance`` relative to the baseline."""
+    regressions = []
+    for path, higher_is_better in COMPARED_METRICS:
+        current, previous = results, baseline
+        for key in path:
+            current = current.get(key, {}) if isinstance(current, dict) else {}
+            previous = previous.get(key, {}) if isinstance(previous, dict) else {}
+        if not isinstance(current, (int, float)) or not isinstance(previous, (int, float)) or not previous:
+            continue
+        change = (current - previous) / previous
+        worse = -change if higher_is_better else change
+        line = f"{'.'.join(path)}: {previous:.2f} -> {current:.2f} ({change:+.1%})"
+        print(("REGRESSION " if worse > tolerance else "           ") + line)
+        if worse > tolerance:
+            regressions.append(line)
+    return regressions
+
+
+def main(argv=None):
+    """Command-line entry point: python -m benchmarks.run [options]"""
+    parser = argparse.ArgumentParser(description="End-to-end ingestion and Q&A benchmark")
+    parser.add_argument("--digital-docs", type=int, default=4, help="PDFs with a text layer")
+    parser.add_argument("--scanned-docs", type=int, default=2, help="Image-only PDFs that need OCR")
+    parser.add_argument("--pages", type=int, default=10, help="Pages per document")
+    parser.add_argument("--scan-dpi", type=int, default=150, help="Resolution of scanned page images")
+    parser.add_argument("--scan-noise", type=float, default=0.0, help="Fraction of speckled pixels in scans")
+    parser.add_argument("--queries", type=int, default=50, help="Questions asked across the corpus")
+    parser.add_argument("--concurrency", type=int, default=4, help="Questions in flight at once")
+    parser.add_argument("--llm-tokens", type=int, default=64, help="Tokens streamed per fake LLM answer")
+    parser.add_argument("--token-latency-ms", type=float, default=10.0, help="Fake LLM delay between tokens")
+    parser.add_argument("--first-token-ms", type=float, default=50.0, help="Fake LLM delay before the first token")
+    parser.add_argument("--embedding-cache", action="store_true", help="Keep the embedding cache enabled")
+    parser.add_argument("--ocr-cache", action="store_true", help="Keep the OCR cache enabled")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="Results file (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--baseline", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Relative change flagged as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show service logs")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO if args.verbose else logging.WARNING,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+
+    with tempfile.TemporaryDirectory(prefix="bench_") as tmp:
+        workdir = Path(tmp)
+        isolate_storage(workdir, args.embedding_cache, args.ocr_cache)
+        paths = generate_corpus(workdir, args)
+
+        server = FakeOllamaServer(
+            tokens=args.llm_tokens,
+            token_latency=args.token_latency_ms / 1000,
+            first_token_latency=args.first_token_ms / 1000
+        ).start()
+        started = time.perf_counter()
+        benchmark = Benchmark(args, server.url)
+        startup_seconds = time.perf_counter() - started
+        try:
+            results = asyncio.run(benchmark.run(paths))
+        finally:
+            benchmark.ocr_service.shutdown()
+            server.stop()
+
+    results["totals"]["startup_seconds"] = startup_seconds
+    results["memory"] = peak_rss_mb()
+    results["meta"] = {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("output", "baseline", "verbose")},
+        "config": {
+            "embedding_model": config.EMBEDDING_MODEL,
+            "chunk_size": config.CHUNK_SIZE,
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "ocr_parallel": config.OCR_PARALLEL,
+            "ocr_workers": config.OCR_WORKERS,
+            "vector_backend": config.VECTOR_BACKEND,
+            "vector_storage_dtype": config.VECTOR_STORAGE_DTYPE,
+            "hybrid_search": config.HYBRID_SEARCH_ENABLED
+        }
+    }
+
+    output = Path(args.output) if args.output else RESULTS_DIR / f"{datetime.now():%Y%m%d-%H%M%S}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(results, indent=2))
+
+    print(f"{'stage':<16}{'count':>7}{'throughput':>16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for stage, row in results["stages"].items():
+        if row["count"]:
+            print(
+                f"{stage:<16}{row['count']:>7}{row['throughput']:>11.1f} {row['unit'][:4]}/s"
+                f"{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+            )
+    print(f"peak RSS {results['memory']['peak_rss_mb']:.0f} MB "
+          f"(OCR workers {results['memory']['peak_rss_children_mb']:.0f} MB); results written to {output}")
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} metrics regressed by more than {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,160 @@
+import random
+from pathlib import Path
+from typing import List
+from PIL import Image, ImageDraw, ImageFont
+
+# Letter size in PDF points
+PAGE_WIDTH = 612
+PAGE_HEIGHT = 792
+
+WORDS = (
+    "the contract supplier customer invoice payment delivery warranty period notice "
+    "agreement section clause party obligation term service product quality audit "
+    "report schedule annex liability insurance claim review approval budget project "
+    "milestone risk safety standard procedure inspection record document revision "
+    "manager engineer operator system network storage module component version"
+).split()
+
+
+def make_paragraphs(rng: random.Random, n_paragraphs: int) -> List[str]:
+    """Deterministic filler text with section numbers and identifiers mixed in."""
+    paragraphs = []
+    for _ in range(n_paragraphs):
+        sentences = []
+        for _ in range(rng.randint(3, 6)):
+            words = [rng.choice(WORDS) for _ in range(rng.randint(8, 16))]
+            if rng.random() < 0.3:
+                words.insert(rng.randrange(len(words)), f"{rng.randint(1, 9)}.{rng.randint(1, 9)}.{rng.randint(1, 9)}")
+            if rng.random() < 0.2:
+                words.insert(rng.randrange(len(words)), f"ISO-{rng.randint(1000, 9999)}")
+            sentences.append(" ".join(words).capitalize() + ".")
+        paragraphs.append(" ".join(sentences))
+    return paragraphs
+
+
+def _wrap(paragraphs: List[str], width: int) -> List[str]:
+    lines = []
+    for paragraph in paragraphs:
+        line = ""
+        for word in paragraph.split():
+            if line and len(line) + 1 + len(word) > width:
+                lines.append(line)
+                line = word
+            else:
+                line = f"{line} {word}" if line else word
+        lines.append(line)
+        lines.append("")
+    return lines
+
+
+def _page_lines(rng: random.Random, title: str, page_num: int, lines_per_page: int, width: int) -> List[str]:
+    lines = [f"{title} - page {page_num}", ""]
+    while len(lines) < lines_per_page:
+        lines.extend(_wrap(make_paragraphs(rng, 1), width))
+    return lines[:lines_per_page]
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_digital_pdf(path, pages: int, seed: int = 0, title: str = "Synthetic Digital Document") -> Path:
+    """
+    Write a PDF with a real text layer (Helvetica), one object per page.
+
+    Args:
+        path: Output file
+        pages: Number of pages
+        seed: Seed for the filler text
+        title: Heading repeated on each page
+
+    Returns:
+        Path: The written file
+    """
+    rng = random.Random(seed)
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        None,  # page tree, filled in once page object numbers are known
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    page_refs = []
+    for page_num in range(1, pages + 1):
+        lines = _page_lines(rng, title, page_num, lines_per_page=48, width=95)
+        stream = ["BT", "/F1 10 Tf", "13 TL", f"54 {PAGE_HEIGHT - 54} Td"]
+        stream.extend(f"({_escape(line)}) Tj T*" for line in lines)
+        stream.append("ET")
+        content = "\n".join(stream).encode("latin-1", errors="replace")
+
+        objects.append(b"<< /Length %d >>\nstream\n" % len(content) + content + b"\nendstream")
+        content_ref = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>"
+            % (PAGE_WIDTH, PAGE_HEIGHT, content_ref)
+        )
+        page_refs.append(len(objects))
+
+    kids = " ".join(f"{ref} 0 R" for ref in page_refs)
+    objects[1] = f"<< /Type /Pages /Kids [{kids}] /Count {len(page_refs)} >>".encode("ascii")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref_offset)
+
+    path = Path(path)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def write_scanned_pdf(path, pages: int, seed: int = 0, dpi: int = 150, noise: float = 0.0,
+                      title: str = "Synthetic Scanned Document") -> Path:
+    """
+    Write an image-only PDF, as produced by a scanner, so every page needs OCR.
+
+    Args:
+        path: Output file
+        pages: Number of pages
+        seed: Seed for the filler text and noise
+        dpi: Rendering resolution of the page images
+        noise: Fraction of pixels flipped to simulate scanner speckle
+        title: Heading repeated on each page
+
+    Returns:
+        Path: The written file
+    """
+    rng = random.Random(seed)
+    width, height = PAGE_WIDTH * dpi // 72, PAGE_HEIGHT * dpi // 72
+    font_size = max(10, dpi // 7)
+    try:
+        font = ImageFont.load_default(size=font_size)
+    except TypeError:
+        # Pillow without FreeType only has the small bitmap font
+        font = ImageFont.load_default()
+    line_height = int(font_size * 1.4)
+    margin = dpi // 2
+    lines_per_page = (height - 2 * margin) // line_height
+    chars_per_line = int((width - 2 * margin) / (font_size * 0.55))
+
+    images = []
+    for page_num in range(1, pages + 1):
+        image = Image.new("L", (width, height), 255)
+        draw = ImageDraw.Draw(image)
+        for i, line in enumerate(_page_lines(rng, title, page_num, lines_per_page, chars_per_line)):
+            draw.text((margin, margin + i * line_height), line, fill=0, font=font)
+        if noise:
+            pixels = image.load()
+            for _ in range(int(width * height * noise)):
+                x, y = rng.randrange(width), rng.randrange(height)
+                pixels[x, y] = 255 - pixels[x, y]
+        images.append(image)
+
+    path = Path(path)
+    images[0].save(path, "PDF", resolution=dpi, save_all=True, append_images=images[1:])
+    return path
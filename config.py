@@ -18,6 +18,29 @@ TEMP_DIR.mkdir(exist_ok=True)
 EMBEDDING_MODEL = "BAAI/bge-small-en-v1.5"
 LLM_MODEL = "llama3"
 LLM_ENDPOINT = "http://localhost:11434"
+LLM_TIMEOUT = 60  # seconds between streamed chunks
+LLM_MAX_CONNECTIONS = 8
+LLM_MAX_CONCURRENCY = 4  # parallel generate calls, e.g. summary map steps
+
+
+# Map-reduce summarization of long documents (token counts are estimates)
+SUMMARY_CONTEXT_TOKENS = 6000  # text above this is summarized with map-reduce
+SUMMARY_MAP_TOKENS = 3000
+SUMMARY_CACHE_PATH = BASE_DIR / "summary_cache.sqlite3"
+SUMMARY_CACHE_MAX_ENTRIES = 20_000
+
+
+# Persistent embedding cache (float32 vectors, LRU-evicted)
+EMBEDDING_CACHE_ENABLED = True
+EMBEDDING_CACHE_PATH = BASE_DIR / "embedding_cache.sqlite3"
+EMBEDDING_CACHE_MAX_ENTRIES = 200_000
+EMBEDDING_BATCH_SIZE = 32
+
+
+# Query embedding micro-batching for concurrent users
+QUERY_BATCHING_ENABLED = True
+QUERY_BATCH_WINDOW_MS = 5
+QUERY_BATCH_MAX_SIZE = 32
 
 
 
@@ -25,11 +48,137 @@ VECTOR_DB_PATH = BASE_DIR / "vectordb"
 VECTOR_DB_PATH.mkdir(exist_ok=True)
 
 
+# Ingestion results keyed on PDF bytes + pipeline settings
+INGEST_CACHE_DIR = BASE_DIR / "ingest_cache"
+INGEST_CACHE_DIR.mkdir(exist_ok=True)
+
+# Incremental re-ingestion: an upload the user marks as a revision of their current
+# document updates that document's vectors in place, embedding only changed chunks
+INCREMENTAL_INGEST = False
+INCREMENTAL_MIN_PAGE_OVERLAP = 0.5  # below this fraction of unchanged pages, ingest as a new document
+
+
+# Hybrid retrieval: BM25 index per collection fused with vector search (RRF)
+LEXICAL_INDEX_DIR = VECTOR_DB_PATH / "lexical"
+LEXICAL_INDEX_DIR.mkdir(exist_ok=True)
+LEXICAL_LOG_MIN_BYTES = 1024 * 1024  # change log size before it is folded into the index snapshot
+HYBRID_SEARCH_ENABLED = True
+HYBRID_VECTOR_WEIGHT = 1.0
+HYBRID_LEXICAL_WEIGHT = 1.0
+HYBRID_VECTOR_CANDIDATES = 20
+HYBRID_LEXICAL_CANDIDATES = 20
+HYBRID_SEARCH_THREADS = 8
+RRF_K = 60
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+
+# Vector store backend: "chroma" (HNSW), "numpy" (exact, brute force) or "auto"
+VECTOR_BACKEND = "auto"
+EXACT_INDEX_DIR = VECTOR_DB_PATH / "exact"
+EXACT_INDEX_DIR.mkdir(exist_ok=True)
+EXACT_BACKEND_MAX_VECTORS = 20_000  # in auto mode, larger float32 collections move to Chroma
+# Stored-vector precision on the NumPy backend: "float32", "float16" or "int8".
+# Queries scan the compressed matrix and rescore the best candidates at float32.
+# In auto mode a compressed dtype keeps every collection, the corpus included, on NumPy
+VECTOR_STORAGE_DTYPE = "float32"
+QUANTIZED_RESCORE_FACTOR = 4  # candidates rescored, as a multiple of n_results
+
+
+# Collection lifecycle: access tracking, eviction and compaction
+COLLECTION_REGISTRY_PATH = VECTOR_DB_PATH / "collections.sqlite3"
+COLLECTION_TOUCH_INTERVAL = 60  # seconds between last-access writes per collection
+COLLECTION_TTL_SECONDS = 7 * 24 * 3600  # idle collections are evicted; 0 disables
+COLLECTION_MAX_TOTAL_BYTES = 0  # 0 disables the size limit
+COLLECTION_MAX_COUNT = 0  # 0 disables the count limit
+COLLECTION_UNLOAD_SECONDS = 3600  # idle collections are dropped from memory (kept on disk); 0 disables
+COLLECTION_GC_INTERVAL = 3600  # seconds between background eviction runs; 0 disables
+
+# Admin API (collection deletion, eviction, compaction, bulk ingest): requests must send
+# this token in the X-Admin-Token header; unset disables the admin routes
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+
+# Tracing: recent request timelines are kept in memory; set TRACE_DUMP_ENABLED to write each to disk
+TRACE_RECENT = 200
+TRACE_DUMP_ENABLED = False
+TRACE_DUMP_DIR = BASE_DIR / "traces"
+TRACE_SLOW_SECONDS = 10.0  # slower traces are logged with their stage breakdown
+
+
+# Corpus mode: all documents share one collection, filtered by doc_id metadata
+CORPUS_MODE = False
+CORPUS_COLLECTION = "corpus"  # never evicted by the collection lifecycle
+
+
+# Context packing between retrieval and generation
+CONTEXT_CANDIDATES = 10  # chunks retrieved before packing
+CONTEXT_TOKEN_BUDGET = 1500
+CONTEXT_MMR_LAMBDA = 0.7  # 1.0 = relevance only, lower favours diversity
+CONTEXT_DUPLICATE_THRESHOLD = 0.8  # Jaccard similarity treated as a duplicate
+CONTEXT_MIN_PASSAGE_TOKENS = 64  # smallest remainder an oversized passage is truncated into
+
+
 OCR_CHUNK_SIZE = 1000  
 
 
-CHUNK_SIZE = 512
-CHUNK_OVERLAP = 128
+# Per-page routing: pages whose PyPDF2 text fails these checks are rasterized and OCR'd
+OCR_MIN_PAGE_CHARS = 50
+OCR_MIN_TEXT_QUALITY = 0.6
+OCR_DPI = 300
+
+# Pages rendered per poppler call; bounds peak memory and scratch disk per job
+PDF_RENDER_WINDOW = 4
+
+
+# Tesseract settings; parallel mode OCRs pages on a process pool
+OCR_LANG = "eng"
+OCR_TESSERACT_CONFIG = ""
+OCR_PARALLEL = True
+OCR_WORKERS = None  # None uses one worker per CPU core
+OCR_PAGE_TIMEOUT = 120  # seconds
+
+
+# In-memory page preprocessing before Tesseract
+OCR_CLEAN_DPI = 200  # clean, high-contrast pages are downscaled to this DPI; None disables
+OCR_DESKEW = False
+OCR_BINARIZE = False
+OCR_DEBUG_PAGES = False  # keep lossless page images in the job scratch directory
+
+# Persistent OCR results keyed by page pixels + Tesseract settings (LRU-evicted)
+OCR_CACHE_ENABLED = True
+OCR_CACHE_PATH = BASE_DIR / "ocr_cache.sqlite3"
+OCR_CACHE_MAX_ENTRIES = 50_000
+
+
+# Chunk budget and overlap, both in embedding-model tokens
+CHUNK_SIZE = 256
+CHUNK_OVERLAP = 32
+
+
+# Gradio queue: concurrent handler executions and pending requests
+GRADIO_CONCURRENCY = 8
+GRADIO_QUEUE_MAX_SIZE = 64
+
+
+# Startup: services load in the background once the server is listening
+WARMUP_ON_STARTUP = True  # False loads them on the first request instead
+WARMUP_ENCODE = True  # run a dummy encode so the first query doesn't pay for model init
+
+
+# Background ingestion jobs
+INGEST_WORKERS = 2
+INGEST_QUEUE_MAX_SIZE = 16
+INGEST_JOB_RETENTION = 200  # finished jobs kept for status lookups
+
+
+# Bulk (directory) ingestion pipeline
+BULK_QUEUE_SIZE = 4  # documents buffered between stages
+BULK_EXTRACT_WORKERS = 2
+BULK_OCR_WORKERS = 2
+# Directory the /ingest/bulk API may read from; unset disables the route
+BULK_INGEST_ROOT = Path(os.environ["BULK_INGEST_ROOT"]) if os.getenv("BULK_INGEST_ROOT") else None
+BULK_RUN_RETENTION = 20  # finished runs kept for status lookups
 
 
 SUMMARIZATION_PROMPT_TEMPLATE = """
@@ -45,6 +194,27 @@ Text to summarize:
 Provide a summary that captures the essence of the document in at most 5 paragraphs.
 """
 
+SUMMARY_MAP_PROMPT_TEMPLATE = """
+You are a helpful assistant summarizing one section of a longer document.
+Summarize the section below, keeping key facts, names, numbers and findings.
+Do not add information that is not in the text.
+
+Section:
+{text}
+
+Summary of this section:
+"""
+
+SUMMARY_REDUCE_PROMPT_TEMPLATE = """
+You are a helpful assistant combining partial summaries of consecutive sections of a document.
+Merge them into a single, shorter summary that preserves the key information, entities and findings.
+
+Partial summaries:
+{text}
+
+Combined summary:
+"""
+
 RAG_PROMPT_TEMPLATE = """
 You are a helpful assistant answering questions about a document. 
 Use ONLY the following context to answer the user's question. If you can't find the 
@@ -2,9 +2,17 @@ import logging
 import os
 import sys
 from pathlib import Path
+import asyncio
+import hmac
+import uuid
+from collections import OrderedDict
 import uvicorn
-from fastapi import FastAPI
+from fastapi import Depends, FastAPI, Header, HTTPException, Response
+from pydantic import BaseModel
+from typing import Optional
 from ui.gradio_app import GradioInterface
+from services.bulk_ingest import BulkIngestor
+from services import telemetry
 import gradio as gr
 import config
 import webbrowser
@@ -33,6 +41,216 @@ gradio_interface = GradioInterface()
 gradio_app = gradio_interface.create_ui()
 
 
+class BulkIngestRequest(BaseModel):
+    directory: str  # relative to config.BULK_INGEST_ROOT
+    pattern: str = "*.pdf"
+    recursive: bool = True
+
+
+bulk_runs = OrderedDict()
+bulk_tasks = set()
+
+
+@app.on_event("startup")
+async def start_warm_up():
+    # Runs after startup returns, so the port is bound while models load
+    if config.WARMUP_ON_STARTUP:
+        gradio_interface.start_warm_up()
+
+
+async def require_services():
+    """Wait for service warm-up; answer 503 if it failed."""
+    try:
+        await gradio_interface.ready()
+    except Exception as e:
+        raise HTTPException(status_code=503, detail=f"Service warm-up failed: {e}")
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """Allow admin routes only with the configured X-Admin-Token."""
+    if not config.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin API is disabled; set ADMIN_TOKEN to enable it")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, config.ADMIN_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid or missing X-Admin-Token")
+
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving requests."""
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz(response: Response):
+    """Readiness: 200 once models and storage are loaded, 503 while warming up or failed."""
+    if not gradio_interface.is_ready:
+        response.status_code = 503
+    return dict(gradio_interface.warmup)
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics: stage latencies, throughput counters, cache hit rates and queue depths."""
+    body, content_type = telemetry.render_metrics()
+    return Response(content=body, media_type=content_type)
+
+
+@app.get("/traces", dependencies=[Depends(require_admin)])
+async def list_traces(limit: int = 50):
+    """Stage breakdowns of the most recent requests and ingestion jobs."""
+    return telemetry.recent_traces(limit)
+
+
+@app.get("/traces/{trace_id}", dependencies=[Depends(require_admin)])
+async def get_trace(trace_id: str):
+    """Full span timeline of one recent trace."""
+    trace = telemetry.get_trace(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Unknown trace: {trace_id}")
+    return trace
+
+
+class EvictRequest(BaseModel):
+    ttl_seconds: Optional[float] = None
+    max_total_bytes: Optional[int] = None
+    max_collections: Optional[int] = None
+    dry_run: bool = False
+
+
+@app.get("/admin/collections", dependencies=[Depends(require_admin)])
+async def list_collections():
+    """List collections with vector counts, disk usage and last access."""
+    await require_services()
+    return await asyncio.to_thread(gradio_interface.vector_db_service.lifecycle.list_collections)
+
+
+@app.delete("/admin/collections/{name}", dependencies=[Depends(require_admin)])
+async def delete_collection(name: str):
+    """Delete one collection."""
+    await require_services()
+    deleted = await asyncio.to_thread(gradio_interface.vector_db_service.delete_collection, name)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {name}")
+    return {"deleted": name}
+
+
+@app.delete("/documents/{doc_id}", dependencies=[Depends(require_admin)])
+async def delete_document(doc_id: str):
+    """Delete one document from the shared corpus collection."""
+    await require_services()
+    deleted = await asyncio.to_thread(gradio_interface.vector_db_service.delete_document, doc_id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Unknown document: {doc_id}")
+    return {"deleted": doc_id, "chunks": deleted}
+
+
+@app.get("/admin/collections/{name}/quantization-report", dependencies=[Depends(require_admin)])
+async def collection_quantization_report(name: str, k: int = 10, queries: int = 100):
+    """Recall@k and latency of float16/int8 storage against float32 for one collection."""
+    await require_services()
+    vector_db_service = gradio_interface.vector_db_service
+    if not await asyncio.to_thread(vector_db_service.collection_exists, name):
+        raise HTTPException(status_code=404, detail=f"Unknown collection: {name}")
+    return await asyncio.to_thread(vector_db_service.quantization_report, name, None, k, queries)
+
+
+@app.post("/admin/collections/evict", dependencies=[Depends(require_admin)])
+async def evict_collections(request: EvictRequest):
+    """Evict idle collections and enforce size limits (config defaults when unset)."""
+    await require_services()
+    evicted = await asyncio.to_thread(
+        gradio_interface.vector_db_service.lifecycle.evict,
+        request.ttl_seconds,
+        request.max_total_bytes,
+        request.max_collections,
+        request.dry_run
+    )
+    return {"evicted": evicted, "dry_run": request.dry_run}
+
+
+@app.post("/admin/collections/compact", dependencies=[Depends(require_admin)])
+async def compact_collections():
+    """Remove orphaned segments and side files and vacuum the databases."""
+    await require_services()
+    return await asyncio.to_thread(gradio_interface.vector_db_service.lifecycle.compact)
+
+
+async def collection_gc_loop():
+    """Periodically evict idle and excess collections."""
+    while True:
+        await asyncio.sleep(config.COLLECTION_GC_INTERVAL)
+        try:
+            await gradio_interface.ready()
+            await asyncio.to_thread(gradio_interface.vector_db_service.lifecycle.evict)
+        except Exception as e:
+            logger.error(f"Collection eviction failed: {e}")
+
+
+@app.on_event("startup")
+async def start_collection_gc():
+    if config.COLLECTION_GC_INTERVAL:
+        app.state.collection_gc_task = asyncio.get_running_loop().create_task(collection_gc_loop())
+
+
+def resolve_bulk_directory(directory: str) -> Path:
+    """Resolve a requested directory, refusing anything outside BULK_INGEST_ROOT."""
+    if config.BULK_INGEST_ROOT is None:
+        raise HTTPException(status_code=403, detail="Bulk ingest is disabled; set BULK_INGEST_ROOT to enable it")
+    root = config.BULK_INGEST_ROOT.resolve()
+    resolved = (root / directory).resolve()
+    if not resolved.is_relative_to(root):
+        raise HTTPException(status_code=400, detail=f"Directory is outside the bulk ingest root: {directory}")
+    if not resolved.is_dir():
+        raise HTTPException(status_code=400, detail=f"Not a directory: {directory}")
+    return resolved
+
+
+def prune_bulk_runs():
+    """Forget the oldest finished bulk runs beyond the retention limit."""
+    finished = [run_id for run_id, ingestor in bulk_runs.items() if ingestor.stats["status"] in ("done", "failed")]
+    for run_id in finished[:max(0, len(finished) - config.BULK_RUN_RETENTION)]:
+        del bulk_runs[run_id]
+
+
+@app.post("/ingest/bulk", dependencies=[Depends(require_admin)])
+async def start_bulk_ingest(request: BulkIngestRequest):
+    """Start a pipelined bulk ingestion of a directory of PDFs under BULK_INGEST_ROOT."""
+    directory = resolve_bulk_directory(request.directory)
+    await require_services()
+
+    ingestor = BulkIngestor(
+        gradio_interface.document_processor,
+        gradio_interface.ocr_service,
+        gradio_interface.embedding_service,
+        gradio_interface.vector_db_service,
+        gradio_interface.ingest_cache
+    )
+    root = config.BULK_INGEST_ROOT.resolve()
+    paths = await asyncio.to_thread(ingestor.find_pdfs, directory, request.pattern, request.recursive)
+    # Symlinks must not lead out of the root either
+    paths = [p for p in paths if p.resolve().is_relative_to(root)]
+
+    run_id = uuid.uuid4().hex[:12]
+    prune_bulk_runs()
+    bulk_runs[run_id] = ingestor
+    task = asyncio.get_running_loop().create_task(ingestor.run(paths))
+    # Hold a reference so the run is not garbage-collected mid-flight
+    bulk_tasks.add(task)
+    task.add_done_callback(bulk_tasks.discard)
+
+    logger.info(f"Started bulk ingest {run_id}: {len(paths)} PDFs under {directory}")
+    return {"run_id": run_id, "documents": len(paths)}
+
+
+@app.get("/ingest/bulk/{run_id}", dependencies=[Depends(require_admin)])
+async def get_bulk_ingest(run_id: str):
+    """Report progress and throughput of a bulk ingestion run."""
+    ingestor = bulk_runs.get(run_id)
+    if ingestor is None:
+        raise HTTPException(status_code=404, detail=f"Unknown bulk ingest run: {run_id}")
+    return dict(ingestor.stats, run_id=run_id)
+
+
 app = gr.mount_gradio_app(app, gradio_app, path="/")
 
 
@@ -44,9 +262,6 @@ if __name__ == "__main__":
     config.VECTOR_DB_PATH.mkdir(exist_ok=True)
     
 
-    setup_sample_document()
-    
-
     port = int(os.environ.get("PORT", 8000))
     logger.info(f"Starting server on port {port}")
 
@@ -0,0 +1,275 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List
+import config
+from services.chunker import TextChunker
+from services.ingest_pipeline import IngestPipeline
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+class BulkIngestor:
+    """Pipelined ingestion of many PDFs.
+
+    Extraction, OCR, chunking, embedding and Chroma insertion run as
+    overlapping stages connected by bounded queues, so while one document
+    is being embedded the next is being OCR'd and a third is being parsed.
+    Each stage has its own worker count; the bounded queues keep memory flat
+    when a downstream stage is the bottleneck.
+    """
+
+    STAGES = ("extract", "ocr", "chunk", "embed", "index")
+
+    def __init__(self, document_processor, ocr_service, embedding_service,
+                 vector_db_service, ingest_cache, queue_size: int = None):
+        self.document_processor = document_processor
+        self.ocr_service = ocr_service
+        self.embedding_service = embedding_service
+        self.vector_db_service = vector_db_service
+        self.ingest_cache = ingest_cache
+        self.queue_size = queue_size or config.BULK_QUEUE_SIZE
+        self.workers = {
+            "extract": config.BULK_EXTRACT_WORKERS,
+            "ocr": config.BULK_OCR_WORKERS,
+            "chunk": 1,
+            "embed": 1,
+            "index": 1
+        }
+        self.stats = self._new_stats()
+        # Indexing and cache checks are shared with single-document ingestion
+        self.pipeline = IngestPipeline(
+            document_processor, ocr_service, embedding_service, vector_db_service, ingest_cache
+        )
+
+    @staticmethod
+    def _new_stats() -> Dict[str, Any]:
+        return {
+            "status": "pending",
+            "documents_total": 0,
+            "documents_done": 0,
+            "documents_cached": 0,
+            "documents_failed": 0,
+            "pages": 0,
+            "chunks": 0,
+            "elapsed_seconds": 0.0,
+            "documents_per_second": 0.0,
+            "pages_per_second": 0.0,
+            "stage_seconds": {},
+            "failures": []
+        }
+
+    @staticmethod
+    def find_pdfs(directory, pattern: str = "*.pdf", recursive: bool = True) -> List[Path]:
+        """List PDFs under a directory in a stable order."""
+        directory = Path(directory)
+        paths = directory.rglob(pattern) if recursive else directory.glob(pattern)
+        return sorted(p for p in paths if p.is_file())
+
+    async def run(self, paths: Iterable) -> Dict[str, Any]:
+        """
+        Ingest PDFs through the staged pipeline.
+
+        Args:
+            paths: PDF file paths
+
+        Returns:
+            Dict: Throughput statistics, also available live as ``self.stats``
+        """
+        paths = list(paths)
+        self.stats = self._new_stats()
+        self.stats["documents_total"] = len(paths)
+        self.stats["status"] = "running"
+        self.stats["stage_seconds"] = {stage: 0.0 for stage in self.STAGES}
+        started = time.perf_counter()
+
+        handlers = {
+            "extract": self._extract,
+            "ocr": self._ocr,
+            "chunk": self._chunk,
+            "embed": self._embed,
+            "index": self._index
+        }
+        queues = [asyncio.Queue(maxsize=self.queue_size) for _ in self.STAGES]
+        queues.append(None)  # the last stage has no output queue
+        for stage, queue in zip(self.STAGES, queues):
+            telemetry.track_queue(f"bulk_{stage}", queue.qsize)
+
+        tasks = []
+        for i, stage in enumerate(self.STAGES):
+            tasks.append(asyncio.ensure_future(
+                self._run_stage(stage, handlers[stage], queues[i], queues[i + 1])
+            ))
+
+        for path in paths:
+            await queues[0].put({"path": str(path)})
+        await queues[0].put(_DONE)
+
+        try:
+            await asyncio.gather(*tasks)
+        except BaseException:
+            self.stats["status"] = "failed"
+            raise
+        finally:
+            for task in tasks:
+                task.cancel()
+            self._update_rates(started)
+
+        self.stats["status"] = "done"
+        logger.info(
+            f"Bulk ingest: {self.stats['documents_done']}/{len(paths)} documents, "
+            f"{self.stats['documents_per_second']:.2f} docs/s, "
+            f"{self.stats['pages_per_second']:.2f} pages/s"
+        )
+        return self.stats
+
+    async def _run_stage(self, stage, handler, inbox, outbox):
+        """Run a stage's workers until its input is exhausted, then close its output."""
+        async def worker():
+            while True:
+                item = await inbox.get()
+                if item is _DONE:
+                    # Let sibling workers see the end marker too
+                    await inbox.put(_DONE)
+                    return
+                started = time.perf_counter()
+                try:
+                    result = await handler(item)
+                except Exception as e:
+                    logger.error(f"Bulk ingest {stage} failed for {item['path']}: {e}")
+                    self.stats["documents_failed"] += 1
+                    self.stats["failures"].append({"path": item["path"], "stage": stage, "error": str(e)})
+                    continue
+                finally:
+                    self.stats["stage_seconds"][stage] += time.perf_counter() - started
+                if result is not None and outbox is not None:
+                    await outbox.put(result)
+
+        await asyncio.gather(*[worker() for _ in range(self.workers[stage])])
+        if outbox is not None:
+            await outbox.put(_DONE)
+
+    def _update_rates(self, started):
+        elapsed = time.perf_counter() - started
+        self.stats["elapsed_seconds"] = elapsed
+        if elapsed > 0:
+            self.stats["documents_per_second"] = self.stats["documents_done"] / elapsed
+            self.stats["pages_per_second"] = self.stats["pages"] / elapsed
+
+    async def _extract(self, item):
+        path = item["path"]
+        item["cache_key"] = await asyncio.to_thread(self.ingest_cache.compute_key, path)
+        cached = await asyncio.to_thread(self.ingest_cache.get, item["cache_key"])
+        if cached and await asyncio.to_thread(self.pipeline.is_indexed, cached):
+            self.stats["documents_cached"] += 1
+            self.stats["documents_done"] += 1
+            return None
+
+        item["page_hashes"] = []
+        if config.INCREMENTAL_INGEST:
+            # Stored with the result, so a later revision can be updated in place
+            item["page_hashes"] = list((await asyncio.to_thread(
+                self.document_processor.fingerprint_pages, path
+            )).values())
+        item["processed"] = await self.document_processor.process_pdf(path)
+        return item
+
+    async def _ocr(self, item):
+        processed = item["processed"]
+        ocr_text = {}
+        if processed["ocr_pages"]:
+            with self.document_processor.job_scratch_dir() as job_dir:
+                page_images = self.document_processor.iter_page_images(
+                    item["path"], processed["ocr_pages"], job_dir
+                )
+                ocr_text = await self.ocr_service.process_images(page_images)
+        item["page_texts"] = self.document_processor.merge_page_text(
+            processed["extracted_text"], ocr_text
+        )
+        return item
+
+    async def _chunk(self, item):
+        item["chunks"] = await asyncio.to_thread(self.embedding_service.chunk_pages, item["page_texts"])
+        return item
+
+    async def _embed(self, item):
+        item["embeddings"] = await asyncio.to_thread(
+            self.embedding_service.create_embeddings, [c["text"] for c in item["chunks"]]
+        )
+        return item
+
+    async def _index(self, item):
+        filename = Path(item["path"]).stem
+        text = TextChunker.join_pages(item["page_texts"])
+
+        location = await asyncio.to_thread(
+            self.pipeline.index, filename, item["cache_key"], item["chunks"], item["embeddings"]
+        )
+
+        await asyncio.to_thread(self.ingest_cache.put, item["cache_key"], {
+            "collection_name": location["collection_name"],
+            "doc_id": location["doc_id"],
+            "filename": filename,
+            "text": text,
+            "chunks": item["chunks"],
+            "metadata": IngestPipeline.extract_title_metadata(text),
+            "page_hashes": item["page_hashes"]
+        })
+
+        self.stats["documents_done"] += 1
+        self.stats["pages"] += item["processed"]["page_count"]
+        self.stats["chunks"] += len(item["chunks"])
+        return None
+
+
+def main(argv=None):
+    """Command-line entry point: python -m services.bulk_ingest DIRECTORY"""
+    parser = argparse.ArgumentParser(description="Bulk-ingest a directory of PDFs")
+    parser.add_argument("directory", help="Directory containing PDF files")
+    parser.add_argument("--pattern", default="*.pdf", help="Glob pattern for PDF files")
+    parser.add_argument("--no-recursive", action="store_true", help="Do not descend into subdirectories")
+    parser.add_argument("--queue-size", type=int, default=None, help="Capacity of each inter-stage queue")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+
+    from services.document_processor import DocumentProcessor
+    from services.ocr_service import OCRService
+    from services.embedding_service import EmbeddingService
+    from services.vector_db_service import VectorDBService
+    from services.ingest_cache import IngestCache
+
+    embedding_service = EmbeddingService()
+    ocr_service = OCRService()
+    ingestor = BulkIngestor(
+        DocumentProcessor(),
+        ocr_service,
+        embedding_service,
+        VectorDBService(embedding_service),
+        IngestCache(),
+        queue_size=args.queue_size
+    )
+
+    paths = ingestor.find_pdfs(args.directory, args.pattern, recursive=not args.no_recursive)
+    logger.info(f"Found {len(paths)} PDFs under {args.directory}")
+    try:
+        stats = asyncio.run(ingestor.run(paths))
+    finally:
+        ocr_service.shutdown()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
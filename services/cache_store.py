@@ -0,0 +1,149 @@
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+class LRUStore:
+    """Persistent, size-bounded key/value store with least-recently-used eviction.
+
+    Values are raw bytes kept in a single SQLite file. Reads refresh an entry's
+    access time; once the store exceeds ``max_entries`` the least recently
+    used entries are evicted. Safe to share between threads.
+    """
+
+    def __init__(self, path, max_entries: int, name: str = "cache"):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.name = name
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entries ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+        self._conn.commit()
+        # Kept up to date by put_many/delete_many, so writes never count the table
+        self._entries = self._count()
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the value for a key, or None on a miss."""
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> Dict[str, bytes]:
+        """
+        Look up several keys at once.
+
+        Args:
+            keys: Keys to look up
+
+        Returns:
+            Dict[str, bytes]: The values that were found, by key
+        """
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        with self._lock:
+            # Stay well under SQLite's bound-parameter limit
+            for start in range(0, len(keys), 500):
+                batch = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, value FROM entries WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE entries SET accessed = ? WHERE key = ?",
+                    [(now, key) for key in found]
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        telemetry.count_cache(self.name, len(found), len(keys) - len(found))
+
+        return found
+
+    def put(self, key: str, value: bytes):
+        """Store a single value."""
+        self.put_many({key: value})
+
+    def put_many(self, items: Dict[str, bytes]):
+        """
+        Store several values and evict the least recently used overflow.
+
+        Args:
+            items: Values by key
+        """
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            existing = self._existing(list(items))
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO entries (key, value, accessed) VALUES (?, ?, ?)",
+                [(key, sqlite3.Binary(value), now) for key, value in items.items()]
+            )
+            self._entries += len(items) - existing
+            overflow = self._entries - self.max_entries
+            if overflow > 0:
+                evicted = self._conn.execute(
+                    "DELETE FROM entries WHERE key IN "
+                    "(SELECT key FROM entries ORDER BY accessed LIMIT ?)",
+                    (overflow,)
+                ).rowcount
+                self._entries -= evicted
+                logger.debug(f"Evicted {evicted} entries from {self.path}")
+            self._conn.commit()
+
+    def delete_many(self, keys: List[str]):
+        """Remove entries by key."""
+        keys = list(dict.fromkeys(keys))
+        with self._lock:
+            deleted = self._conn.executemany("DELETE FROM entries WHERE key = ?", [(k,) for k in keys]).rowcount
+            self._entries -= deleted
+            self._conn.commit()
+
+    def _existing(self, keys: List[str]) -> int:
+        """Count how many of the given keys are already stored (primary key lookups)."""
+        existing = 0
+        for start in range(0, len(keys), 500):
+            batch = keys[start:start + 500]
+            placeholders = ",".join("?" * len(batch))
+            existing += self._conn.execute(
+                f"SELECT COUNT(*) FROM entries WHERE key IN ({placeholders})", batch
+            ).fetchone()[0]
+        return existing
+
+    def _count(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> Dict[str, float]:
+        """Return entry count and hit/miss counters."""
+        entries = self._entries
+        lookups = self.hits + self.misses
+        return {
+            "entries": entries,
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,171 @@
+import logging
+import re
+from collections import deque
+from typing import Callable, Dict, List, Any, Optional
+import config
+
+logger = logging.getLogger(__name__)
+
+PARAGRAPH_RE = re.compile(r"\S(?:.*?\S)?(?=\s*\n\s*\n|\s*\Z)", re.S)
+SENTENCE_RE = re.compile(r"\S.*?(?:[.!?][\"')\]]*(?=\s)|\Z)", re.S)
+WORD_RE = re.compile(r"\S+")
+
+# Fraction of the budget after which a paragraph break ends the current chunk
+PARAGRAPH_BREAK_FILL = 0.75
+
+
+class TextChunker:
+    """Single-pass, token-budgeted chunker.
+
+    Text is split into sentence units (sentences longer than the budget are
+    split on words). Units are packed into chunks of at most ``chunk_size``
+    tokens, preferring to end chunks at paragraph breaks, and each new chunk
+    starts with up to ``chunk_overlap`` tokens of trailing units from the
+    previous one. Chunk text is an exact slice of the source, so character
+    offsets in the metadata can be used to locate or merge chunks.
+    """
+
+    def __init__(self, count_tokens: Callable[[List[str]], List[int]],
+                 chunk_size: int = None, chunk_overlap: int = None):
+        self.count_tokens = count_tokens
+        self.chunk_size = chunk_size or config.CHUNK_SIZE
+        self.chunk_overlap = min(
+            config.CHUNK_OVERLAP if chunk_overlap is None else chunk_overlap,
+            self.chunk_size // 2
+        )
+
+    @staticmethod
+    def join_pages(pages: Dict[int, str]) -> str:
+        """Join page texts the way chunk offsets are measured: non-empty pages, each followed by a blank line."""
+        return "".join(text + "\n\n" for _, text in sorted(pages.items()) if text and text.strip())
+
+    def chunk_text(self, text: str) -> List[Dict[str, Any]]:
+        """
+        Chunk a single text with no page information.
+
+        Args:
+            text: The text to chunk
+
+        Returns:
+            List[Dict]: Chunks with text and metadata; offsets index into ``text``
+        """
+        if not text or not text.strip():
+            return []
+        return self._chunk([(None, 0, text)], text)
+
+    def chunk_pages(self, pages: Dict[int, str]) -> List[Dict[str, Any]]:
+        """
+        Chunk a document given as page texts.
+
+        Args:
+            pages: Dictionary of page numbers and text
+
+        Returns:
+            List[Dict]: Chunks with text and metadata; offsets index into
+            ``join_pages(pages)``
+        """
+        sources = []
+        offset = 0
+        for page_num, text in sorted(pages.items()):
+            if not text or not text.strip():
+                continue
+            sources.append((page_num, offset, text))
+            offset += len(text) + 2
+        return self._chunk(sources, self.join_pages(pages)) if sources else []
+
+    def _split_units(self, sources):
+        """Split sources into sentence units: (start, end, page, starts_paragraph, text)."""
+        units = []
+        for page_num, base, text in sources:
+            for paragraph in PARAGRAPH_RE.finditer(text):
+                first = True
+                for sentence in SENTENCE_RE.finditer(paragraph.group()):
+                    start = base + paragraph.start() + sentence.start()
+                    units.append((start, start + len(sentence.group()), page_num, first, sentence.group()))
+                    first = False
+        return units
+
+    def _split_long_unit(self, unit, tokens):
+        """Split a unit that exceeds the budget into word windows that fit."""
+        start, _, page_num, starts_paragraph, text = unit
+        words = list(WORD_RE.finditer(text))
+        word_tokens = self.count_tokens([w.group() for w in words])
+        pieces = []
+        piece_start, piece_tokens = 0, 0
+
+        for i, count in enumerate(word_tokens):
+            if piece_tokens + count > self.chunk_size and i > piece_start:
+                pieces.append((piece_start, i, piece_tokens))
+                piece_start, piece_tokens = i, 0
+            piece_tokens += count
+        pieces.append((piece_start, len(words), piece_tokens))
+
+        result = []
+        for n, (first, last, count) in enumerate(pieces):
+            s = words[first].start()
+            e = words[last - 1].end()
+            result.append(((start + s, start + e, page_num, starts_paragraph and n == 0, text[s:e]), count))
+        return result
+
+    def _chunk(self, sources, full_text: str) -> List[Dict[str, Any]]:
+        units = self._split_units(sources)
+        if not units:
+            return []
+
+        token_counts = self.count_tokens([u[4] for u in units])
+
+        chunks = []
+        current = deque()
+        current_tokens = 0
+
+        def emit():
+            first, last = current[0][0], current[-1][0]
+            metadata = {
+                "chunk_id": len(chunks),
+                "start_idx": first[0],
+                "end_idx": last[1],
+                "token_count": current_tokens
+            }
+            if first[2] is not None:
+                metadata["page"] = first[2]
+                metadata["end_page"] = last[2]
+            chunks.append({"text": full_text[first[0]:last[1]], "metadata": metadata})
+
+        for unit, tokens in zip(units, token_counts):
+            pieces = [(unit, tokens)] if tokens <= self.chunk_size else self._split_long_unit(unit, tokens)
+
+            for piece, piece_tokens in pieces:
+                paragraph_break = piece[3] and current_tokens >= self.chunk_size * PARAGRAPH_BREAK_FILL
+                if current and (current_tokens + piece_tokens > self.chunk_size or paragraph_break):
+                    emit()
+                    # Keep trailing units, up to the overlap budget, as the next chunk's prefix
+                    while current and (current_tokens > self.chunk_overlap
+                                       or current_tokens + piece_tokens > self.chunk_size):
+                        current_tokens -= current.popleft()[1]
+
+                current.append((piece, piece_tokens))
+                current_tokens += piece_tokens
+
+        if current:
+            emit()
+
+        return chunks
+
+
+def whitespace_token_counter(texts: List[str]) -> List[int]:
+    """Approximate token counts when no tokenizer is available."""
+    return [max(1, round(len(WORD_RE.findall(t)) * 1.3)) for t in texts]
+
+
+def tokenizer_token_counter(tokenizer) -> Optional[Callable[[List[str]], List[int]]]:
+    """Build a batch token counter from a Hugging Face tokenizer."""
+    if tokenizer is None:
+        return None
+
+    def count(texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        encoded = tokenizer(texts, add_special_tokens=False)["input_ids"]
+        return [len(ids) for ids in encoded]
+
+    return count
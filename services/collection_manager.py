@@ -0,0 +1,345 @@
+import argparse
+import json
+import logging
+import re
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+import config
+from services.vector_store import ChromaVectorStore
+
+logger = logging.getLogger(__name__)
+
+# Chroma names each HNSW segment directory after the segment's UUID
+SEGMENT_DIR_RE = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}$")
+
+
+def _dir_size(path: Path) -> int:
+    return sum(f.stat().st_size for f in path.rglob("*") if f.is_file())
+
+
+class CollectionManager:
+    """Lifecycle management for vector store collections.
+
+    Keeps a small registry of when each collection was created and last
+    queried, lists collections with their vector counts and disk usage,
+    evicts collections by idle time (TTL) and total size, and compacts the
+    store by removing segment directories and side files that no longer
+    belong to any collection.
+    """
+
+    def __init__(self, vector_db_service, registry_path=None):
+        self.vector_db_service = vector_db_service
+        self.registry_path = str(registry_path or config.COLLECTION_REGISTRY_PATH)
+        self._lock = threading.Lock()
+        self._last_touch: Dict[str, float] = {}
+        self._conn = sqlite3.connect(self.registry_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS collections ("
+            "name TEXT PRIMARY KEY, created REAL NOT NULL, last_access REAL NOT NULL)"
+        )
+        self._conn.commit()
+
+    def register(self, name: str):
+        """Record a newly created collection."""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO collections (name, created, last_access) VALUES (?, ?, ?)",
+                (name, now, now)
+            )
+            self._conn.commit()
+            self._last_touch[name] = now
+
+    def touch(self, name: str):
+        """Record an access; writes are throttled to one per COLLECTION_TOUCH_INTERVAL."""
+        now = time.time()
+        if now - self._last_touch.get(name, 0) < config.COLLECTION_TOUCH_INTERVAL:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO collections (name, created, last_access) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_access = excluded.last_access",
+                (name, now, now)
+            )
+            self._conn.commit()
+            self._last_touch[name] = now
+
+    def forget(self, name: str):
+        """Drop a deleted collection from the registry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM collections WHERE name = ?", (name,))
+            self._conn.commit()
+            self._last_touch.pop(name, None)
+
+    def _registry(self, names: Optional[List[str]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Registry rows by collection name.
+
+        Collections in ``names`` that the registry has never seen (created
+        before it existed, or by another process) are adopted as accessed
+        now, so they get a full TTL rather than being evicted on sight.
+        """
+        with self._lock:
+            if names:
+                now = time.time()
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO collections (name, created, last_access) VALUES (?, ?, ?)",
+                    [(name, now, now) for name in names]
+                )
+                self._conn.commit()
+            rows = self._conn.execute("SELECT name, created, last_access FROM collections").fetchall()
+        return {name: {"created": created, "last_access": last_access} for name, created, last_access in rows}
+
+    def _segment_dirs(self) -> Dict[str, List[str]]:
+        """Map collection IDs to their segment IDs from Chroma's system database."""
+        db_path = config.VECTOR_DB_PATH / "chroma.sqlite3"
+        if not db_path.exists():
+            return {}
+        conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+        try:
+            rows = conn.execute("SELECT id, collection FROM segments").fetchall()
+        finally:
+            conn.close()
+        segments: Dict[str, List[str]] = {}
+        for segment_id, collection_id in rows:
+            segments.setdefault(str(collection_id), []).append(str(segment_id))
+        return segments
+
+    def list_collections(self) -> List[Dict[str, Any]]:
+        """
+        List collections with usage information.
+
+        Returns:
+            List[Dict]: name, backend, vectors, disk_bytes, created and
+            last_access for each collection, most recently used first
+        """
+        names = self.vector_db_service.list_collection_names()
+        registry = self._registry(names)
+        segments = self._segment_dirs()
+        listing = []
+
+        for name in names:
+            # Collections opened only to be listed are not kept in memory
+            was_open = name in self.vector_db_service.stores
+            store = self.vector_db_service.get_store(name)
+            disk_bytes = 0
+            if isinstance(store, ChromaVectorStore):
+                for segment_id in segments.get(str(store.collection.id), []):
+                    segment_dir = config.VECTOR_DB_PATH / segment_id
+                    if segment_dir.is_dir():
+                        disk_bytes += _dir_size(segment_dir)
+            elif store.path is not None and store.path.is_dir():
+                disk_bytes += _dir_size(store.path)
+            for lexical_path in (config.LEXICAL_INDEX_DIR / f"{name}.json",
+                                 config.LEXICAL_INDEX_DIR / f"{name}.json.log"):
+                if lexical_path.exists():
+                    disk_bytes += lexical_path.stat().st_size
+
+            entry = registry.get(name, {})
+            listing.append({
+                "name": name,
+                "backend": store.backend,
+                "vectors": store.count(),
+                "disk_bytes": disk_bytes,
+                "created": entry.get("created"),
+                "last_access": entry.get("last_access")
+            })
+            if not was_open:
+                self.vector_db_service.unload_collection(name)
+
+        return sorted(listing, key=lambda c: c["last_access"] or 0, reverse=True)
+
+    def evict(self, ttl_seconds: Optional[float] = None, max_total_bytes: Optional[int] = None,
+              max_collections: Optional[int] = None, dry_run: bool = False) -> List[str]:
+        """
+        Delete idle collections and trim the store to its size limits.
+
+        Collections not accessed within ``ttl_seconds`` are removed first;
+        then the least recently used are removed until the store is within
+        ``max_total_bytes`` and ``max_collections``. Collections the
+        registry has not seen before are adopted as just accessed. Surviving
+        collections idle for COLLECTION_UNLOAD_SECONDS are dropped from
+        memory but kept on disk.
+
+        Args:
+            ttl_seconds: Idle time after which a collection is evicted
+            max_total_bytes: Upper bound on total collection disk usage
+            max_collections: Upper bound on the number of collections
+            dry_run: Report what would be evicted without deleting
+
+        Returns:
+            List[str]: Names of evicted collections
+        """
+        ttl_seconds = config.COLLECTION_TTL_SECONDS if ttl_seconds is None else ttl_seconds
+        max_total_bytes = config.COLLECTION_MAX_TOTAL_BYTES if max_total_bytes is None else max_total_bytes
+        max_collections = config.COLLECTION_MAX_COUNT if max_collections is None else max_collections
+
+        # Least recently used first; the shared corpus is managed per document
+        collections = sorted(
+            (c for c in self.list_collections() if c["name"] != config.CORPUS_COLLECTION),
+            key=lambda c: c["last_access"] or 0
+        )
+        now = time.time()
+        evicted = []
+
+        if ttl_seconds:
+            for c in collections:
+                if c["last_access"] is not None and now - c["last_access"] > ttl_seconds:
+                    evicted.append(c)
+        remaining = [c for c in collections if c not in evicted]
+
+        total_bytes = sum(c["disk_bytes"] for c in remaining)
+        while remaining and (
+            (max_total_bytes and total_bytes > max_total_bytes)
+            or (max_collections and len(remaining) > max_collections)
+        ):
+            victim = remaining.pop(0)
+            evicted.append(victim)
+            total_bytes -= victim["disk_bytes"]
+
+        names = [c["name"] for c in evicted]
+        if not dry_run:
+            for name in names:
+                self.vector_db_service.delete_collection(name)
+            self.unload_idle(now)
+        if names:
+            logger.info(f"{'Would evict' if dry_run else 'Evicted'} {len(names)} collections: {names}")
+        return names
+
+    def unload_idle(self, now: Optional[float] = None) -> List[str]:
+        """
+        Drop collections idle for COLLECTION_UNLOAD_SECONDS from memory.
+
+        Returns:
+            List[str]: Names of the collections unloaded
+        """
+        if not config.COLLECTION_UNLOAD_SECONDS:
+            return []
+        now = time.time() if now is None else now
+        loaded = list(self.vector_db_service.stores)
+        registry = self._registry(loaded)
+        idle = [
+            name for name in loaded
+            if now - registry.get(name, {}).get("last_access", now) > config.COLLECTION_UNLOAD_SECONDS
+        ]
+        for name in idle:
+            self.vector_db_service.unload_collection(name)
+        if idle:
+            logger.info(f"Unloaded {len(idle)} idle collections from memory")
+        return idle
+
+    def compact(self) -> Dict[str, Any]:
+        """
+        Remove leftovers of deleted collections and reclaim database space.
+
+        Deletes HNSW segment directories and lexical indexes that no longer
+        belong to a live collection, prunes ingest cache entries that point
+        to missing collections, and vacuums the registry and Chroma's system
+        database.
+
+        Returns:
+            Dict: Counts of removed items and bytes reclaimed
+        """
+        report = {"segment_dirs_removed": 0, "lexical_indexes_removed": 0,
+                  "cache_entries_removed": 0, "bytes_reclaimed": 0}
+
+        # No collection may be created or promoted between listing and deleting
+        with self.vector_db_service.write_lock:
+            live_segments = {s for ids in self._segment_dirs().values() for s in ids}
+            live_names = set(self.vector_db_service.list_collection_names())
+
+            for path in config.VECTOR_DB_PATH.iterdir():
+                if path.is_dir() and SEGMENT_DIR_RE.match(path.name) and path.name not in live_segments:
+                    report["bytes_reclaimed"] += _dir_size(path)
+                    shutil.rmtree(path, ignore_errors=True)
+                    report["segment_dirs_removed"] += 1
+
+            # Snapshots are <name>.json, their change logs <name>.json.log
+            for path in config.LEXICAL_INDEX_DIR.glob("*.json*"):
+                if path.name.split(".json")[0] not in live_names:
+                    report["bytes_reclaimed"] += path.stat().st_size
+                    path.unlink(missing_ok=True)
+                    report["lexical_indexes_removed"] += 1
+
+            for path in config.INGEST_CACHE_DIR.glob("*.json"):
+                try:
+                    with open(path, "r", encoding="utf-8") as file:
+                        collection_name = json.load(file).get("collection_name")
+                except Exception:
+                    collection_name = None
+                if collection_name not in live_names:
+                    report["bytes_reclaimed"] += path.stat().st_size
+                    path.unlink(missing_ok=True)
+                    report["cache_entries_removed"] += 1
+
+        with self._lock:
+            known = [row[0] for row in self._conn.execute("SELECT name FROM collections")]
+            self._conn.executemany(
+                "DELETE FROM collections WHERE name = ?",
+                [(name,) for name in known if name not in live_names]
+            )
+            self._conn.commit()
+            self._conn.execute("VACUUM")
+
+        chroma_db = config.VECTOR_DB_PATH / "chroma.sqlite3"
+        if chroma_db.exists():
+            try:
+                before = chroma_db.stat().st_size
+                conn = sqlite3.connect(str(chroma_db))
+                conn.execute("VACUUM")
+                conn.close()
+                report["bytes_reclaimed"] += max(0, before - chroma_db.stat().st_size)
+            except Exception as e:
+                logger.warning(f"Could not vacuum Chroma database: {e}")
+
+        logger.info(f"Compacted vector store: {report}")
+        return report
+
+
+def main(argv=None):
+    """Command-line entry point: python -m services.collection_manager {list,evict,compact,quantization-report}"""
+    parser = argparse.ArgumentParser(description="Manage vector store collections")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List collections with vector counts and disk usage")
+    evict_parser = subparsers.add_parser("evict", help="Evict idle collections and enforce size limits")
+    evict_parser.add_argument("--ttl", type=float, default=None, help="Idle seconds before eviction")
+    evict_parser.add_argument("--max-bytes", type=int, default=None, help="Maximum total disk usage")
+    evict_parser.add_argument("--max-collections", type=int, default=None, help="Maximum number of collections")
+    evict_parser.add_argument("--dry-run", action="store_true", help="Only report what would be evicted")
+    subparsers.add_parser("compact", help="Remove orphaned segments and vacuum databases")
+    report_parser = subparsers.add_parser(
+        "quantization-report", help="Compare float16/int8 storage with float32 on a collection"
+    )
+    report_parser.add_argument("name", help="Collection name")
+    report_parser.add_argument("-k", type=int, default=10, help="Results per query")
+    report_parser.add_argument("--queries", type=int, default=100, help="Number of sampled queries")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[logging.StreamHandler(sys.stderr)]
+    )
+
+    from services.vector_db_service import VectorDBService
+
+    # Admin commands never embed text, so skip loading the embedding model
+    manager = VectorDBService(None).lifecycle
+    if args.command == "quantization-report":
+        result = manager.vector_db_service.quantization_report(args.name, k=args.k, n_queries=args.queries)
+    elif args.command == "list":
+        result = manager.list_collections()
+    elif args.command == "evict":
+        result = manager.evict(args.ttl, args.max_bytes, args.max_collections, dry_run=args.dry_run)
+    else:
+        result = manager.compact()
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+import logging
+from typing import Any, Callable, Dict, List, Tuple
+import config
+from services.lexical_index import tokenize
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough LLM token count (about 4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+class ContextPacker:
+    """Packs retrieved chunks into a bounded, non-redundant prompt context.
+
+    Chunks from the same document whose character ranges overlap or touch
+    are merged into one passage, near-duplicates are dropped, and the rest
+    are chosen with maximal marginal relevance (MMR) until the token budget
+    is full. A passage larger than the remaining budget is truncated around
+    its best-ranked chunk. Results are expected in relevance order, best first.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int] = None, token_budget: int = None,
+                 mmr_lambda: float = None, duplicate_threshold: float = None,
+                 min_passage_tokens: int = None):
+        self.count_tokens = count_tokens or estimate_tokens
+        self.token_budget = token_budget or config.CONTEXT_TOKEN_BUDGET
+        self.mmr_lambda = config.CONTEXT_MMR_LAMBDA if mmr_lambda is None else mmr_lambda
+        self.duplicate_threshold = (
+            config.CONTEXT_DUPLICATE_THRESHOLD if duplicate_threshold is None else duplicate_threshold
+        )
+        self.min_passage_tokens = (
+            config.CONTEXT_MIN_PASSAGE_TOKENS if min_passage_tokens is None else min_passage_tokens
+        )
+
+    @telemetry.timed("pack")
+    def pack(self, results: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """
+        Pack retrieval results into the context budget.
+
+        Args:
+            results: Retrieved chunks with text and metadata, best first
+
+        Returns:
+            Tuple[List[Dict], Dict]: The packed passages in relevance order,
+            and a report with input, packed and saved token counts
+        """
+        input_tokens = sum(self.count_tokens(r["text"]) for r in results)
+        passages = self._merge_overlapping(results)
+        merged = len(results) - len(passages)
+
+        selected, duplicates = self._select(passages)
+
+        packed, packed_tokens, over_budget, truncated = [], 0, 0, 0
+        for passage in selected:
+            tokens = self.count_tokens(passage["text"])
+            remaining = self.token_budget - packed_tokens
+            if tokens > remaining:
+                # Merged passages can outgrow the whole budget; keep the part that fits
+                fitted = None
+                if remaining >= min(self.min_passage_tokens, self.token_budget):
+                    fitted = self._truncate(passage, remaining)
+                if fitted is None:
+                    over_budget += 1
+                    continue
+                passage = fitted
+                truncated += 1
+                tokens = self.count_tokens(passage["text"])
+            packed.append(passage)
+            packed_tokens += tokens
+
+        report = {
+            "input_chunks": len(results),
+            "packed_passages": len(packed),
+            "merged": merged,
+            "duplicates_dropped": duplicates,
+            "over_budget_dropped": over_budget,
+            "truncated": truncated,
+            "input_tokens": input_tokens,
+            "packed_tokens": packed_tokens,
+            "saved_tokens": input_tokens - packed_tokens
+        }
+        logger.info(
+            f"Packed {len(results)} chunks into {len(packed)} passages: "
+            f"{packed_tokens} tokens, saved {report['saved_tokens']}"
+        )
+        return packed, report
+
+    @staticmethod
+    def _merge_overlapping(results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Merge chunks of the same document whose character ranges overlap or touch."""
+        passages = []
+        spans = {}  # doc key -> passages with offsets, for merging
+
+        for rank, result in enumerate(results):
+            metadata = result.get("metadata") or {}
+            start, end = metadata.get("start_idx"), metadata.get("end_idx")
+            passage = {
+                "text": result["text"],
+                "metadata": dict(metadata),
+                "rank": rank,
+                "anchor": 0  # offset in text of the best-ranked chunk
+            }
+            if start is None or end is None:
+                passages.append(passage)
+                continue
+
+            doc_key = metadata.get("doc_id")
+            candidates = spans.setdefault(doc_key, [])
+            merged_into = None
+            for existing in list(candidates):
+                if not ContextPacker._touches(existing, merged_into or passage):
+                    continue
+                if merged_into is None:
+                    ContextPacker._merge_into(existing, passage)
+                    merged_into = existing
+                else:
+                    # The chunk bridged two passages; fold the other one in too
+                    ContextPacker._merge_into(merged_into, existing)
+                    candidates.remove(existing)
+                    passages.remove(existing)
+            if merged_into is None:
+                candidates.append(passage)
+                passages.append(passage)
+
+        return sorted(passages, key=lambda p: p["rank"])
+
+    @staticmethod
+    def _touches(a: Dict[str, Any], b: Dict[str, Any]) -> bool:
+        a, b = a["metadata"], b["metadata"]
+        # Touching ranges are separated by at most a little whitespace
+        return b["start_idx"] <= a["end_idx"] + 2 and b["end_idx"] >= a["start_idx"] - 2
+
+    @staticmethod
+    def _merge_into(existing: Dict[str, Any], passage: Dict[str, Any]):
+        """Merge passage into existing, joining their texts along the offsets."""
+        a, b = existing, passage
+        if b["metadata"]["start_idx"] < a["metadata"]["start_idx"]:
+            a, b = b, a
+        a_start, a_end = a["metadata"]["start_idx"], a["metadata"]["end_idx"]
+        b_start, b_end = b["metadata"]["start_idx"], b["metadata"]["end_idx"]
+
+        if b_end <= a_end:
+            text = a["text"]
+        elif b_start <= a_end:
+            text = a["text"] + b["text"][a_end - b_start:]
+        else:
+            text = a["text"] + " " + b["text"]
+
+        metadata = dict(a["metadata"])
+        metadata["start_idx"] = a_start
+        metadata["end_idx"] = max(a_end, b_end)
+        if "end_page" in b["metadata"]:
+            metadata["end_page"] = max(metadata.get("end_page", 0), b["metadata"]["end_page"])
+
+        if a["rank"] <= b["rank"]:
+            anchor = a["anchor"]
+        else:
+            anchor = min(b_start - a_start + b["anchor"], len(text))
+
+        existing["text"] = text
+        existing["metadata"] = metadata
+        existing["rank"] = min(a["rank"], b["rank"])
+        existing["anchor"] = anchor
+
+    def _truncate(self, passage: Dict[str, Any], budget: int):
+        """
+        Cut a passage down to ``budget`` tokens at word boundaries.
+
+        The window starts at the passage's best-ranked chunk and extends
+        backwards only if the text after it is shorter than the budget.
+
+        Returns:
+            Optional[Dict]: The truncated passage, or None if nothing fits
+        """
+        text = passage["text"]
+        anchor = min(passage.get("anchor", 0), len(text))
+
+        def longest(fits, limit):
+            lo, hi = 0, limit
+            while lo < hi:
+                mid = (lo + hi + 1) // 2
+                if fits(mid):
+                    lo = mid
+                else:
+                    hi = mid - 1
+            return lo
+
+        end = anchor + longest(lambda n: self.count_tokens(text[anchor:anchor + n]) <= budget, len(text) - anchor)
+        start = anchor
+        if end == len(text):
+            start = anchor - longest(lambda n: self.count_tokens(text[anchor - n:end]) <= budget, anchor)
+
+        # Don't cut words in half
+        if end < len(text) and not text[end].isspace():
+            end = max(text.rfind(" ", start, end), start)
+        if start > 0 and not text[start - 1].isspace():
+            space = text.find(" ", start, end)
+            start = space + 1 if space != -1 else end
+
+        snippet = text[start:end].strip()
+        if not snippet:
+            return None
+        return dict(passage, text=snippet, metadata=dict(passage["metadata"], truncated=True))
+
+    def _select(self, passages: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], int]:
+        """Order passages by MMR, dropping near-duplicates of already chosen ones."""
+        terms = [set(tokenize(p["text"])) for p in passages]
+        relevance = [1.0 / (1 + p["rank"]) for p in passages]
+        remaining = list(range(len(passages)))
+        chosen, duplicates = [], 0
+
+        while remaining:
+            best, best_score = None, None
+            for i in list(remaining):
+                similarity = max((self._jaccard(terms[i], terms[j]) for j in chosen), default=0.0)
+                if similarity >= self.duplicate_threshold:
+                    remaining.remove(i)
+                    duplicates += 1
+                    continue
+                score = self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * similarity
+                if best_score is None or score > best_score:
+                    best, best_score = i, score
+            if best is None:
+                break
+            chosen.append(best)
+            remaining.remove(best)
+
+        return [passages[i] for i in chosen], duplicates
+
+    @staticmethod
+    def _jaccard(a: set, b: set) -> float:
+        if not a or not b:
+            return 0.0
+        return len(a & b) / len(a | b)
@@ -1,96 +1,336 @@
 import PyPDF2
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
 from PIL import Image
+from contextlib import contextmanager
+import asyncio
+import hashlib
 import io
 import logging
+import shutil
+import tempfile
 from pathlib import Path
 import config
+from services import telemetry
 
 logger = logging.getLogger(__name__)
 
 class DocumentProcessor:
     """Service for processing PDF documents."""
-    
+
     def __init__(self):
         self.temp_dir = config.TEMP_DIR
-        
+
+    @telemetry.timed("extract")
     async def process_pdf(self, file_path):
         """
-        Process a PDF file and convert it to images for OCR processing.
-        
+        Process a PDF file, routing each page to text extraction or OCR.
+
+        Pages whose embedded text passes the density/quality checks are kept
+        as-is; the remaining pages are listed for OCR and can be rendered
+        with ``iter_page_images``.
+
         Args:
             file_path: Path to the PDF file
-            
+
         Returns:
-            dict: Dictionary containing the PDF metadata and images
+            dict: Dictionary containing the PDF metadata, the text of the pages
+            that passed routing, and the page numbers that need OCR
         """
         logger.info(f"Processing PDF: {file_path}")
-        
+
         # Ensure file exists
         if not Path(file_path).exists():
             raise FileNotFoundError(f"PDF file not found: {file_path}")
-        
+
         try:
-            # Extract text with PyPDF2 first
-            extracted_text = self._extract_text_with_pypdf(file_path)
-            
-            # If text extraction is insufficient, convert to images
-            images = self._convert_pdf_to_images(file_path)
-            
+            # Extract text with PyPDF2 first; parsing is blocking, so keep it off the loop
+            text_by_page = await asyncio.to_thread(self._extract_text_with_pypdf, file_path)
+
+            if text_by_page:
+                page_count = len(text_by_page)
+            else:
+                page_count = await asyncio.to_thread(self._get_page_count, file_path)
+
+            # Only pages with insufficient text are rasterized later for OCR
+            text_pages, ocr_pages = self._route_pages(text_by_page, page_count)
+
+            logger.info(
+                f"Routed {page_count} pages: {len(text_pages)} text, {len(ocr_pages)} OCR"
+            )
+
             return {
                 "file_path": file_path,
-                "extracted_text": extracted_text,
-                "images": images
+                "page_count": page_count,
+                "extracted_text": text_pages,
+                "ocr_pages": ocr_pages
             }
         except Exception as e:
             logger.error(f"Error processing PDF: {e}")
             raise
-            
+
     def _extract_text_with_pypdf(self, file_path):
         """Extract text from PDF using PyPDF2."""
         text_by_page = {}
-        
+
         try:
             with open(file_path, 'rb') as file:
                 pdf_reader = PyPDF2.PdfReader(file)
-                
+
                 for i, page in enumerate(pdf_reader.pages):
                     text = page.extract_text() or ""
                     text_by_page[i] = text
-                    
+
             return text_by_page
         except Exception as e:
             logger.error(f"Error extracting text with PyPDF2: {e}")
             return {}
-            
-    def _convert_pdf_to_images(self, file_path):
-        """Convert PDF pages to images for OCR processing."""
-        images_by_page = {}
-        
+
+    def _get_page_count(self, file_path):
+        """Get the page count from poppler when PyPDF2 cannot read the file."""
         try:
-            # Convert PDF to images
-            pdf_images = convert_from_path(
-                file_path,
-                dpi=300,  # Higher DPI for better OCR
-                output_folder=self.temp_dir,
-                fmt="jpeg",
-                thread_count=2
-            )
-            
-            # Save and store images
-            for i, image in enumerate(pdf_images):
-                image_path = self.temp_dir / f"page_{i}.jpg"
-                image.save(image_path, "JPEG")
-                images_by_page[i] = str(image_path)
-                
-            return images_by_page
+            return int(pdfinfo_from_path(file_path).get("Pages", 0))
+        except Exception as e:
+            logger.error(f"Error reading PDF page count: {e}")
+            return 0
+
+    @telemetry.timed("fingerprint")
+    def fingerprint_pages(self, file_path):
+        """
+        Hash each page's drawing instructions and the resources they use.
+
+        Two pages with the same hash render identically (same content
+        stream, fonts and images), so the hash identifies a page across
+        versions of a document without rasterizing it.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Returns:
+            dict: Dictionary of page numbers and hex digests; empty if
+            PyPDF2 cannot read the file
+        """
+        # Digests of indirect objects; fonts and images are shared between pages
+        memo = {}
+
+        def digest_object(obj, digest, path):
+            if isinstance(obj, PyPDF2.generic.IndirectObject):
+                ref = (obj.idnum, obj.generation)
+                if ref in path:
+                    digest.update(b"cycle")
+                    return
+                if ref not in memo:
+                    sub = hashlib.sha256()
+                    digest_object(obj.get_object(), sub, path | {ref})
+                    memo[ref] = sub.digest()
+                digest.update(memo[ref])
+                return
+
+            if isinstance(obj, PyPDF2.generic.StreamObject):
+                # Raw (still encoded) bytes: decoding images would only cost time
+                digest.update(obj._data or b"")
+            if isinstance(obj, dict):
+                for key in sorted(obj):
+                    if key == "/Parent":
+                        continue
+                    digest.update(str(key).encode("utf-8"))
+                    digest_object(obj[key], digest, path)
+            elif isinstance(obj, list):
+                digest.update(b"[")
+                for item in obj:
+                    digest_object(item, digest, path)
+                digest.update(b"]")
+            elif not isinstance(obj, PyPDF2.generic.StreamObject):
+                digest.update(repr(obj).encode("utf-8"))
+
+        try:
+            hashes = {}
+            with open(file_path, 'rb') as file:
+                pdf_reader = PyPDF2.PdfReader(file)
+                for i, page in enumerate(pdf_reader.pages):
+                    digest = hashlib.sha256()
+                    for key in ("/Contents", "/Resources", "/MediaBox", "/CropBox", "/Rotate"):
+                        if key in page:
+                            digest.update(key.encode("utf-8"))
+                            digest_object(page.get(key), digest, frozenset())
+                    hashes[i] = digest.hexdigest()
+            return hashes
         except Exception as e:
-            logger.error(f"Error converting PDF to images: {e}")
+            logger.error(f"Error fingerprinting PDF pages: {e}")
             return {}
-            
-    def get_image_bytes(self, image_path):
-        """Convert image to bytes for OCR API."""
-        with Image.open(image_path) as img:
+
+    @staticmethod
+    def score_page_text(text):
+        """
+        Score the embedded text of a page.
+
+        Args:
+            text: Text extracted from the page
+
+        Returns:
+            tuple: (density, quality) where density is the number of
+            non-whitespace characters and quality is the fraction of those
+            characters that look like real text rather than extraction garbage
+        """
+        if not text:
+            return 0, 0.0
+
+        chars = [c for c in text if not c.isspace()]
+        density = len(chars)
+        if not density:
+            return 0, 0.0
+
+        # Alphanumerics and common punctuation count as good characters;
+        # replacement characters, control codes and stray glyphs do not
+        good = sum(1 for c in chars if c.isalnum() or c in ".,;:!?'\"()-–—/%&$@#*+=[]")
+        char_quality = good / density
+
+        # Broken font encodings often produce long runs without spaces or
+        # one-letter "words"; penalize pages where few tokens look like words
+        words = text.split()
+        wordlike = sum(1 for w in words if 2 <= len(w) <= 25 and any(c.isalpha() for c in w))
+        word_quality = wordlike / len(words) if words else 0.0
+
+        return density, min(char_quality, word_quality)
+
+    def _route_pages(self, text_by_page, page_count):
+        """
+        Split pages into those with usable embedded text and those needing OCR.
+
+        Args:
+            text_by_page: Dictionary of page numbers and PyPDF2 text
+            page_count: Total number of pages in the document
+
+        Returns:
+            tuple: (text_pages, ocr_pages) where text_pages maps page numbers
+            to accepted text and ocr_pages is a sorted list of page numbers
+        """
+        text_pages = {}
+        ocr_pages = []
+
+        for page_num in range(page_count):
+            text = text_by_page.get(page_num, "")
+            density, quality = self.score_page_text(text)
+
+            if density >= config.OCR_MIN_PAGE_CHARS and quality >= config.OCR_MIN_TEXT_QUALITY:
+                text_pages[page_num] = text
+            else:
+                logger.debug(f"Page {page_num} routed to OCR (chars={density}, quality={quality:.2f})")
+                ocr_pages.append(page_num)
+
+        return text_pages, ocr_pages
+
+    @staticmethod
+    def merge_page_text(text_pages, ocr_pages):
+        """
+        Merge text-layer and OCR results back into page order.
+
+        Args:
+            text_pages: Dictionary of page numbers and extracted text
+            ocr_pages: Dictionary of page numbers and OCR text
+
+        Returns:
+            dict: Dictionary of page numbers and text, sorted by page number
+        """
+        merged = dict(text_pages)
+        merged.update(ocr_pages)
+        return {page_num: merged[page_num] for page_num in sorted(merged)}
+
+    @contextmanager
+    def job_scratch_dir(self):
+        """
+        Create a private scratch directory for one ingestion job.
+
+        Concurrent jobs each get their own directory, so rendered pages never
+        collide. The directory and anything left in it are removed on exit,
+        unless ``config.OCR_DEBUG_PAGES`` is set, in which case it is kept for
+        inspection.
+        """
+        job_dir = Path(tempfile.mkdtemp(prefix="job_", dir=self.temp_dir))
+        try:
+            yield job_dir
+        finally:
+            if config.OCR_DEBUG_PAGES:
+                logger.info(f"Keeping debug page images in {job_dir}")
+            else:
+                shutil.rmtree(job_dir, ignore_errors=True)
+
+    def iter_page_images(self, file_path, pages, job_dir=None):
+        """
+        Rasterize the given pages in bounded windows, yielding one page at a time.
+
+        At most ``config.PDF_RENDER_WINDOW`` pages are rendered per poppler call.
+        Pages are rendered straight into memory as grayscale images, so
+        nothing touches disk unless ``config.OCR_DEBUG_PAGES`` is set, in which
+        case a lossless copy of each page is written to ``job_dir``. Peak
+        memory stays constant regardless of page count.
+
+        Args:
+            file_path: Path to the PDF file
+            pages: Page numbers (0-based) to render
+            job_dir: Scratch directory for this job, used for debug output
+
+        Yields:
+            tuple: (page_num, PIL.Image) in page order
+        """
+        for first, last in self._page_windows(pages):
+            try:
+                with telemetry.span("render", pages=last - first + 1):
+                    images = convert_from_path(
+                        file_path,
+                        dpi=config.OCR_DPI,  # Higher DPI for better OCR
+                        first_page=first + 1,
+                        last_page=last + 1,
+                        grayscale=True,
+                        thread_count=2
+                    )
+            except Exception as e:
+                logger.error(f"Error converting pages {first}-{last} to images: {e}")
+                continue
+
+            for offset, image in enumerate(images):
+                page_num = first + offset
+                try:
+                    if config.OCR_DEBUG_PAGES and job_dir is not None:
+                        image.save(Path(job_dir) / f"page_{page_num}.png", "PNG")
+                    yield page_num, image
+                finally:
+                    image.close()
+                    images[offset] = None
+
+    @classmethod
+    def _page_windows(cls, pages):
+        """Split page runs into windows of at most PDF_RENDER_WINDOW pages."""
+        window = max(1, config.PDF_RENDER_WINDOW)
+        for first, last in cls._page_ranges(pages):
+            for start in range(first, last + 1, window):
+                yield start, min(start + window - 1, last)
+
+    @staticmethod
+    def _page_ranges(pages):
+        """Group sorted page numbers into inclusive (first, last) runs."""
+        ranges = []
+        for page_num in sorted(pages):
+            if ranges and page_num == ranges[-1][1] + 1:
+                ranges[-1][1] = page_num
+            else:
+                ranges.append([page_num, page_num])
+        return [tuple(r) for r in ranges]
+
+    def get_image_bytes(self, image, format="PNG"):
+        """
+        Convert an image to bytes for OCR API.
+
+        Args:
+            image: A PIL image or a path to an image file
+            format: Output format; PNG is lossless and keeps OCR quality
+
+        Returns:
+            bytes: The encoded image
+        """
+        if isinstance(image, Image.Image):
             img_byte_arr = io.BytesIO()
-            img.save(img_byte_arr, format='JPEG')
+            image.save(img_byte_arr, format=format)
             return img_byte_arr.getvalue()
+
+        with Image.open(image) as img:
+            return self.get_image_bytes(img, format=format)
@@ -1,8 +1,11 @@
+import hashlib
 import logging
-from sentence_transformers import SentenceTransformer
 import numpy as np
 from typing import List, Dict, Any
 import config
+from services.cache_store import LRUStore
+from services import telemetry
+from services.chunker import TextChunker, tokenizer_token_counter, whitespace_token_counter
 
 logger = logging.getLogger(__name__)
 
@@ -10,11 +13,77 @@ class EmbeddingService:
     """Service for creating and managing text embeddings."""
     
     def __init__(self):
+        # Imported here: torch is only needed once the model is actually loaded
+        from sentence_transformers import SentenceTransformer
+        
         logger.info(f"Loading embedding model: {config.EMBEDDING_MODEL}")
         self.model = SentenceTransformer(config.EMBEDDING_MODEL)
         self.dimensions = self.model.get_sentence_embedding_dimension()
         logger.info(f"Embedding dimensions: {self.dimensions}")
         
+        # Persistent cache of float32 vectors keyed by (model, normalized text)
+        self.cache = None
+        if config.EMBEDDING_CACHE_ENABLED:
+            self.cache = LRUStore(config.EMBEDDING_CACHE_PATH, config.EMBEDDING_CACHE_MAX_ENTRIES, name="embedding")
+        
+        # Chunks are budgeted in the embedding model's own tokens
+        self.count_tokens = (
+            tokenizer_token_counter(getattr(self.model, "tokenizer", None))
+            or whitespace_token_counter
+        )
+        self.chunker = TextChunker(self.count_tokens)
+        
+    def _cache_key(self, text: str) -> str:
+        """Hash the model name and whitespace-normalized text."""
+        normalized = " ".join(text.split())
+        return hashlib.sha256(f"{config.EMBEDDING_MODEL}\0{normalized}".encode("utf-8")).hexdigest()
+        
+    def _encode_cached(self, texts: List[str]) -> np.ndarray:
+        """
+        Encode texts, reusing cached vectors and encoding only the misses.
+        
+        Args:
+            texts: Non-empty texts to embed
+            
+        Returns:
+            np.ndarray: float32 array of shape (len(texts), dimensions)
+        """
+        if self.cache is None:
+            return self.encode_batched(texts)
+            
+        keys = [self._cache_key(t) for t in texts]
+        cached = self.cache.get_many(keys)
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        
+        # First position of each distinct missing key, so duplicates encode once
+        misses = {}
+        for i, key in enumerate(keys):
+            blob = cached.get(key)
+            if blob is not None and len(blob) == self.dimensions * 4:
+                vectors[i] = np.frombuffer(blob, dtype=np.float32)
+            else:
+                misses.setdefault(key, i)
+                
+        if misses:
+            encoded = self.encode_batched([texts[i] for i in misses.values()])
+            by_key = dict(zip(misses.keys(), encoded))
+            for i, key in enumerate(keys):
+                if key in by_key:
+                    vectors[i] = by_key[key]
+            self.cache.put_many({key: vector.tobytes() for key, vector in by_key.items()})
+            
+        return vectors
+        
+    def cache_stats(self) -> Dict[str, Any]:
+        """
+        Get embedding cache counters.
+        
+        Returns:
+            Dict: Entry count, hits, misses and hit rate (empty if disabled)
+        """
+        return self.cache.stats() if self.cache is not None else {}
+        
+    @telemetry.timed("query_embed")
     def create_embedding(self, text: str) -> List[float]:
         """
         Create an embedding for a single text string.
@@ -24,6 +93,10 @@ class EmbeddingService:
             
         Returns:
             List[float]: The embedding vector
+            
+        Raises:
+            Exception: If encoding fails; a zero vector would be searched as
+                if it were the query's embedding
         """
         if not text or not text.strip():
             logger.warning("Attempted to create embedding for empty text")
@@ -31,14 +104,45 @@ class EmbeddingService:
             return [0.0] * self.dimensions
             
         try:
-            embedding = self.model.encode(text)
+            embedding = self._encode_cached([text])[0]
             return embedding.tolist()
         except Exception as e:
             logger.error(f"Error creating embedding: {e}")
-            # Return zero vector in case of error
-            return [0.0] * self.dimensions
+            raise
             
-    def create_embeddings(self, texts: List[str]) -> List[List[float]]:
+    def encode_batched(self, texts: List[str], batch_size: int = None) -> np.ndarray:
+        """
+        Encode texts in length-bucketed batches.
+        
+        Texts are sorted by length so each batch holds similarly sized inputs
+        and padding waste stays low; results are written back in input order.
+        
+        Args:
+            texts: Non-empty texts to embed
+            batch_size: Texts per forward pass (defaults to config.EMBEDDING_BATCH_SIZE)
+            
+        Returns:
+            np.ndarray: Contiguous float32 array of shape (len(texts), dimensions)
+        """
+        batch_size = batch_size or config.EMBEDDING_BATCH_SIZE
+        vectors = np.empty((len(texts), self.dimensions), dtype=np.float32)
+        telemetry.CHUNKS_EMBEDDED.inc(len(texts))
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        
+        for start in range(0, len(order), batch_size):
+            bucket = order[start:start + batch_size]
+            with telemetry.span("encode_batch", size=len(bucket)):
+                vectors[bucket] = self.model.encode(
+                    [texts[i] for i in bucket],
+                    batch_size=len(bucket),
+                    convert_to_numpy=True,
+                    show_progress_bar=False
+                )
+            
+        return vectors
+        
+    @telemetry.timed("embed")
+    def create_embeddings(self, texts: List[str]) -> np.ndarray:
         """
         Create embeddings for multiple texts.
         
@@ -46,25 +150,34 @@ class EmbeddingService:
             texts: List of texts to embed
             
         Returns:
-            List[List[float]]: List of embedding vectors
+            np.ndarray: Contiguous float32 array of shape (len(texts), dimensions),
+            aligned with ``texts``; empty texts get zero vectors
+            
+        Raises:
+            Exception: If encoding fails; a zero vector would be indexed or
+                searched as if it were a real embedding
         """
         if not texts:
             logger.warning("Attempted to create embeddings for empty text list")
-            return []
+            return np.empty((0, self.dimensions), dtype=np.float32)
             
-        # Filter out empty strings
-        filtered_texts = [t for t in texts if t and t.strip()]
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        
+        # Only non-empty texts are encoded; their rows keep their input position
+        positions = [i for i, t in enumerate(texts) if t and t.strip()]
         
-        if not filtered_texts:
-            return []
+        if not positions:
+            return embeddings
             
         try:
-            embeddings = self.model.encode(filtered_texts)
-            return embeddings.tolist()
+            embeddings[positions] = self._encode_cached([texts[i] for i in positions])
         except Exception as e:
             logger.error(f"Error creating embeddings batch: {e}")
-            return [[0.0] * self.dimensions] * len(filtered_texts)
+            raise
+            
+        return embeddings
     
+    @telemetry.timed("chunk")
     def chunk_text(self, text: str) -> List[Dict[str, Any]]:
         """
         Split text into chunks for embedding.
@@ -75,45 +188,18 @@ class EmbeddingService:
         Returns:
             List[Dict]: List of chunks with metadata
         """
-        if not text or not text.strip():
-            return []
-            
-        chunks = []
-        words = text.split()
-        current_chunk = []
-        current_size = 0
-        
-        for i, word in enumerate(words):
-            word_size = len(word) + 1  # +1 for space
-            
-            if current_size + word_size > config.CHUNK_SIZE and current_chunk:
-                # Save the current chunk
-                chunks.append({
-                    "text": " ".join(current_chunk),
-                    "metadata": {
-                        "chunk_id": len(chunks),
-                        "start_idx": i - len(current_chunk),
-                        "end_idx": i - 1
-                    }
-                })
-                
-                # Start a new chunk with overlap
-                overlap_start = max(0, len(current_chunk) - config.CHUNK_OVERLAP)
-                current_chunk = current_chunk[overlap_start:]
-                current_size = sum(len(word) + 1 for word in current_chunk)
-                
-            current_chunk.append(word)
-            current_size += word_size
-            
-        # Add the last chunk if it's not empty
-        if current_chunk:
-            chunks.append({
-                "text": " ".join(current_chunk),
-                "metadata": {
-                    "chunk_id": len(chunks),
-                    "start_idx": len(words) - len(current_chunk),
-                    "end_idx": len(words) - 1
-                }
-            })
-            
-        return chunks
+        return self.chunker.chunk_text(text)
+    
+    @telemetry.timed("chunk")
+    def chunk_pages(self, pages: Dict[int, str]) -> List[Dict[str, Any]]:
+        """
+        Split a document's pages into chunks for embedding.
+        
+        Args:
+            pages: Dictionary of page numbers and text
+            
+        Returns:
+            List[Dict]: List of chunks with page numbers and character offsets
+            into ``TextChunker.join_pages(pages)`` in their metadata
+        """
+        return self.chunker.chunk_pages(pages)
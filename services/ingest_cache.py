@@ -0,0 +1,143 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from typing import Dict, Any, Optional
+import config
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+class IngestCache:
+    """Content-addressed cache of ingestion results keyed on PDF bytes and pipeline config."""
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir or config.INGEST_CACHE_DIR
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @staticmethod
+    def pipeline_fingerprint() -> Dict[str, Any]:
+        """Settings that change extracted text, chunks or their embeddings."""
+        return {
+            "chunk_size": config.CHUNK_SIZE,
+            "chunk_overlap": config.CHUNK_OVERLAP,
+            "embedding_model": config.EMBEDDING_MODEL,
+            # Which pages are OCR'd, and what Tesseract reads from them
+            "ocr_min_page_chars": config.OCR_MIN_PAGE_CHARS,
+            "ocr_min_text_quality": config.OCR_MIN_TEXT_QUALITY,
+            "ocr_dpi": config.OCR_DPI,
+            "ocr_lang": config.OCR_LANG,
+            "ocr_tesseract_config": config.OCR_TESSERACT_CONFIG,
+            "ocr_clean_dpi": config.OCR_CLEAN_DPI,
+            "ocr_deskew": config.OCR_DESKEW,
+            "ocr_binarize": config.OCR_BINARIZE
+        }
+
+    @telemetry.timed("hash")
+    def compute_key(self, file_path) -> str:
+        """
+        Compute the cache key for a PDF.
+
+        Args:
+            file_path: Path to the PDF file
+
+        Returns:
+            str: Hex digest of the file bytes plus the pipeline fingerprint
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(1024 * 1024), b""):
+                digest.update(block)
+        digest.update(json.dumps(self.pipeline_fingerprint(), sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _entry_path(self, key: str):
+        return self.cache_dir / f"{key}.json"
+
+    def _location_path(self, collection_name: str, doc_id: Optional[str]):
+        location = f"{collection_name}\0{doc_id or ''}"
+        location_hash = hashlib.sha256(location.encode("utf-8")).hexdigest()[:32]
+        return self.cache_dir / "locations" / f"{location_hash}.key"
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a previous ingestion result.
+
+        Args:
+            key: Cache key from compute_key
+
+        Returns:
+            Optional[Dict]: The cached entry, or None on a miss
+        """
+        path = self._entry_path(key)
+        if not path.exists():
+            telemetry.count_cache("ingest", 0, 1)
+            return None
+
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+            logger.info(f"Ingest cache hit: {key[:12]} -> {entry.get('collection_name')}")
+            telemetry.count_cache("ingest", 1, 0)
+            return entry
+        except Exception as e:
+            logger.warning(f"Discarding unreadable ingest cache entry {key[:12]}: {e}")
+            self.invalidate(key)
+            return None
+
+    def put(self, key: str, entry: Dict[str, Any]):
+        """
+        Store an ingestion result.
+
+        Args:
+            key: Cache key from compute_key
+            entry: Extracted text, chunks, metadata and collection name
+        """
+        entry = dict(entry, created_at=time.time())
+        path = self._entry_path(key)
+        tmp_path = path.with_suffix(".tmp")
+
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(entry, file)
+            # Atomic replace so concurrent readers never see a partial entry
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error(f"Error writing ingest cache entry {key[:12]}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return
+
+        if entry.get("collection_name"):
+            try:
+                location_path = self._location_path(entry["collection_name"], entry.get("doc_id"))
+                location_path.parent.mkdir(exist_ok=True)
+                location_path.write_text(key)
+            except Exception as e:
+                logger.warning(f"Could not record the cache entry of {entry['collection_name']}: {e}")
+
+    def for_location(self, collection_name: str, doc_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """
+        Look up the ingestion result currently stored in a collection (or corpus document).
+
+        Args:
+            collection_name: Name of the collection
+            doc_id: Document ID within a shared collection, if any
+
+        Returns:
+            Optional[Dict]: The cached entry with its ``cache_key``, or None
+        """
+        if not collection_name:
+            return None
+        path = self._location_path(collection_name, doc_id)
+        if not path.exists():
+            return None
+        key = path.read_text().strip()
+        entry = self.get(key)
+        if entry is None:
+            return None
+        return dict(entry, cache_key=key)
+
+    def invalidate(self, key: str):
+        """Remove a cache entry, e.g. when its collection no longer exists."""
+        self._entry_path(key).unlink(missing_ok=True)
@@ -0,0 +1,239 @@
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, List, Optional
+import config
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATES = (DONE, FAILED, CANCELLED)
+
+
+class IngestQueueFull(Exception):
+    """Raised when a job is submitted while the ingestion queue is full."""
+
+
+class IngestJob:
+    """State and progress events of one background ingestion."""
+
+    def __init__(self, file_path, replace: Optional[Dict[str, Any]] = None):
+        self.id = uuid.uuid4().hex[:12]
+        self.file_path = file_path
+        self.replace = replace
+        self.status = QUEUED
+        self.stage = QUEUED
+        self.events: List[Dict[str, Any]] = []
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.trace_id: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+        self._changed = asyncio.Event()
+
+    @property
+    def finished(self) -> bool:
+        return self.status in TERMINAL_STATES
+
+    def record(self, stage, done=None, total=None, message=None):
+        """Append a progress event and wake up watchers."""
+        self.stage = stage
+        self.events.append({
+            "time": time.time(),
+            "status": self.status,
+            "stage": stage,
+            "done": done,
+            "total": total,
+            "message": message
+        })
+        self._changed.set()
+
+    def describe(self, event: Dict[str, Any] = None) -> str:
+        """Format a progress event (the latest by default) for display."""
+        event = event or (self.events[-1] if self.events else {"stage": self.stage})
+        text = f"[job {self.id}] {event['stage']}"
+        if event.get("total"):
+            text += f": {event['done']}/{event['total']}"
+        if event.get("message"):
+            text += f" - {event['message']}"
+        return text
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "file_path": str(self.file_path),
+            "status": self.status,
+            "stage": self.stage,
+            "error": self.error,
+            "created_at": self.created_at,
+            "trace_id": self.trace_id,
+            "events": self.events
+        }
+
+
+class IngestJobManager:
+    """Bounded background worker pool for document ingestion.
+
+    Submissions return immediately with a job; a fixed number of workers
+    take jobs from a bounded queue and run them through the ingest pipeline.
+    When the queue is full, ``submit`` raises ``IngestQueueFull`` so callers
+    can push back. Workers are started on the running event loop at first use.
+    """
+
+    def __init__(self, pipeline, workers: int = None, max_queue: int = None):
+        self.pipeline = pipeline
+        self.workers = workers or config.INGEST_WORKERS
+        self.max_queue = max_queue or config.INGEST_QUEUE_MAX_SIZE
+        self.jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker_tasks: List[asyncio.Task] = []
+        telemetry.track_queue("ingest", self.queue_depth)
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.max_queue)
+            self._worker_tasks = [
+                asyncio.ensure_future(self._worker(i)) for i in range(self.workers)
+            ]
+            logger.info(f"Started {self.workers} ingestion workers (queue size {self.max_queue})")
+
+    def submit(self, file_path, replace: Optional[Dict[str, Any]] = None) -> IngestJob:
+        """
+        Queue a PDF for ingestion.
+
+        Args:
+            file_path: Path to the PDF file
+            replace: collection_name and doc_id of a document this file is
+                a revision of, to update in place
+
+        Returns:
+            IngestJob: The queued job
+
+        Raises:
+            IngestQueueFull: If the queue has no free slot
+        """
+        self._ensure_started()
+        job = IngestJob(file_path, replace)
+        try:
+            self._queue.put_nowait(job)
+        except asyncio.QueueFull:
+            raise IngestQueueFull(
+                f"Ingestion queue is full ({self.max_queue} jobs waiting); try again later"
+            )
+
+        self.jobs[job.id] = job
+        self._prune()
+        job.record(QUEUED, message=f"position {self._queue.qsize()} in queue")
+        logger.info(f"Queued ingestion job {job.id} for {file_path}")
+        return job
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self.jobs.get(job_id)
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def cancel(self, job_id: str) -> bool:
+        """
+        Cancel a queued or running job.
+
+        Args:
+            job_id: ID of the job
+
+        Returns:
+            bool: True if the job was cancelled, False if unknown or finished
+        """
+        job = self.jobs.get(job_id)
+        if job is None or job.finished:
+            return False
+
+        if job._task is not None:
+            job._task.cancel()
+        else:
+            # Still queued; the worker skips it when dequeued
+            job.status = CANCELLED
+            job.record(CANCELLED)
+        logger.info(f"Cancelled ingestion job {job_id}")
+        return True
+
+    async def watch(self, job: IngestJob) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream a job's progress events until it finishes.
+
+        Args:
+            job: The job to watch
+
+        Yields:
+            Dict: Progress events, starting with those already recorded
+        """
+        seen = 0
+        while True:
+            job._changed.clear()
+            while seen < len(job.events):
+                yield job.events[seen]
+                seen += 1
+            if job.finished:
+                return
+            await job._changed.wait()
+
+    async def _worker(self, index: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                if job.status == CANCELLED:
+                    continue
+                job.status = RUNNING
+                job_trace = telemetry.Trace("ingest", job_id=job.id, file=str(job.file_path))
+                job.trace_id = job_trace.id
+                # The task copies the current context, so pipeline spans land in the trace
+                with telemetry.activate(job_trace):
+                    job._task = asyncio.ensure_future(
+                        self.pipeline.run(job.file_path, progress=job.record, replace=job.replace)
+                    )
+                try:
+                    job.result = await job._task
+                    job.status = DONE
+                    job.record(DONE)
+                except asyncio.CancelledError:
+                    if not job._task.cancelled():
+                        # The worker itself is being cancelled
+                        raise
+                    job.status = CANCELLED
+                    job.record(CANCELLED)
+                except Exception as e:
+                    logger.error(f"Ingestion job {job.id} failed: {e}")
+                    job.error = str(e)
+                    job.status = FAILED
+                    job.record(FAILED, message=str(e))
+                finally:
+                    job_trace.finish()
+            finally:
+                self._queue.task_done()
+
+    def _prune(self):
+        """Forget the oldest finished jobs beyond the retention limit."""
+        excess = len(self.jobs) - config.INGEST_JOB_RETENTION
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if self.jobs[job_id].finished:
+                del self.jobs[job_id]
+                excess -= 1
+
+    async def shutdown(self):
+        """Cancel running jobs and stop the workers."""
+        for job in self.jobs.values():
+            if not job.finished and job._task is not None:
+                job._task.cancel()
+        for task in self._worker_tasks:
+            task.cancel()
+        await asyncio.gather(*self._worker_tasks, return_exceptions=True)
+        self._worker_tasks = []
+        self._queue = None
@@ -0,0 +1,253 @@
+import asyncio
+import logging
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+import config
+from services.chunker import TextChunker
+
+logger = logging.getLogger(__name__)
+
+class IngestPipeline:
+    """Runs one PDF through extraction, OCR, chunking, embedding and indexing."""
+
+    def __init__(self, document_processor, ocr_service, embedding_service,
+                 vector_db_service, ingest_cache):
+        self.document_processor = document_processor
+        self.ocr_service = ocr_service
+        self.embedding_service = embedding_service
+        self.vector_db_service = vector_db_service
+        self.ingest_cache = ingest_cache
+
+    @staticmethod
+    def extract_title_metadata(text: str) -> Dict[str, str]:
+        """Take the first two non-empty lines as title and first line."""
+        lines = text.strip().splitlines()
+        non_empty_lines = [line.strip() for line in lines if line.strip()]
+        title_line = non_empty_lines[0] if non_empty_lines else "Unknown"
+        first_line = non_empty_lines[1] if len(non_empty_lines) > 1 else "Unknown"
+        return {
+            "title": title_line,
+            "first_line": first_line
+        }
+
+    @staticmethod
+    def make_doc_id(filename: str, cache_key: str) -> str:
+        """Corpus document ID: readable name plus a content hash prefix."""
+        return f"{filename}_{cache_key[:12]}"
+
+    def is_indexed(self, entry: Dict[str, Any]) -> bool:
+        """Whether a cached ingestion result is still present in the vector store."""
+        if entry.get("doc_id"):
+            return self.vector_db_service.document_exists(entry["doc_id"], entry["collection_name"])
+        return self.vector_db_service.collection_exists(entry["collection_name"])
+
+    def previous_version(self, replace: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Resolve the document an upload was explicitly asked to replace.
+
+        Only a version stored the same way as new ones (own collection or
+        corpus document) qualifies.
+
+        Args:
+            replace: collection_name and doc_id (None outside corpus mode)
+                of the document the caller chose to update
+
+        Returns:
+            Optional[Dict]: Its ingest cache entry with ``cache_key``, or None
+        """
+        previous = self.ingest_cache.for_location(replace.get("collection_name"), replace.get("doc_id"))
+        if not previous:
+            return None
+        if config.CORPUS_MODE:
+            if not previous.get("doc_id") or previous["collection_name"] != config.CORPUS_COLLECTION:
+                return None
+        elif previous.get("doc_id"):
+            return None
+        return previous if self.is_indexed(previous) else None
+
+    @staticmethod
+    def page_overlap(old_hashes: List[str], new_hashes: List[str]) -> float:
+        """Fraction of distinct pages shared by two versions, relative to the larger one."""
+        old, new = set(old_hashes or []), set(new_hashes or [])
+        if not old or not new:
+            return 0.0
+        return len(old & new) / max(len(old), len(new))
+
+    def index(self, filename: str, cache_key: str, chunks: List[Dict[str, Any]], embeddings) -> Dict[str, Any]:
+        """
+        Write a document's chunks to the vector store.
+
+        In corpus mode the chunks go into the shared collection under a
+        content-derived doc_id. Any earlier copy of the document is replaced
+        by adding the new chunks first and deleting stale ones afterwards, so
+        a failed add leaves the old copy searchable. Otherwise the document
+        gets a collection of its own.
+
+        Args:
+            filename: Document name without extension
+            cache_key: Ingest cache key of the document
+            chunks: Chunks with text and metadata
+            embeddings: Float32 array aligned with chunks
+
+        Returns:
+            Dict: collection_name and doc_id (None outside corpus mode)
+        """
+        if config.CORPUS_MODE:
+            collection_name = config.CORPUS_COLLECTION
+            doc_id = self.make_doc_id(filename, cache_key)
+            self.vector_db_service.create_collection(collection_name)
+            synced = self.vector_db_service.sync_document(
+                collection_name, chunks, doc_id=doc_id, embeddings=embeddings
+            )
+            if synced is None:
+                raise RuntimeError(f"Failed to index document into {collection_name}")
+            return {"collection_name": collection_name, "doc_id": doc_id}
+
+        # Suffix keeps names unique when many files are ingested in the same second
+        collection_name = f"doc_{filename}_{int(time.time())}_{cache_key[:6]}"
+        self.vector_db_service.create_collection(collection_name, overwrite=True)
+
+        added = self.vector_db_service.add_documents(collection_name, chunks, embeddings)
+        if not added:
+            raise RuntimeError(f"Failed to index document into {collection_name}")
+        return {"collection_name": collection_name, "doc_id": None}
+
+    async def run(self, file_path, progress: Optional[Callable[..., None]] = None,
+                  replace: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """
+        Ingest a PDF, reusing a cached result for identical files.
+
+        With incremental ingestion enabled and ``replace`` naming an indexed
+        document whose pages largely match, that document's vectors are
+        updated in place and only new chunks are embedded. Otherwise the
+        file is ingested as a new document.
+
+        Args:
+            file_path: Path to the PDF file
+            progress: Optional callback called as ``progress(stage, done, total)``
+                when a stage starts or advances
+            replace: collection_name and doc_id of the document this file
+                is a revision of, as chosen by the user
+
+        Returns:
+            Dict: collection_name, doc_id, filename, text, chunks, metadata
+            and from_cache; after an incremental update also ``incremental``
+            with the chunks reused, embedded and removed
+        """
+        def report(stage, done=None, total=None):
+            if progress is not None:
+                progress(stage, done, total)
+
+        report("hashing")
+        # Re-uploads of an identical file reuse the earlier ingestion
+        cache_key = await asyncio.to_thread(self.ingest_cache.compute_key, file_path)
+        # Cache files and the vector store lookup are blocking I/O
+        cached = await asyncio.to_thread(self.ingest_cache.get, cache_key)
+        if cached:
+            if await asyncio.to_thread(self.is_indexed, cached):
+                return {
+                    "collection_name": cached["collection_name"],
+                    "doc_id": cached.get("doc_id"),
+                    "filename": cached["filename"],
+                    "text": cached["text"],
+                    "chunks": cached["chunks"],
+                    "metadata": cached["metadata"],
+                    "from_cache": True
+                }
+            await asyncio.to_thread(self.ingest_cache.invalidate, cache_key)
+
+        filename = Path(file_path).stem
+        previous = None
+        page_hashes = []
+        if config.INCREMENTAL_INGEST:
+            # Stored with the result, so a later revision can be matched against this version
+            page_hashes = list((await asyncio.to_thread(
+                self.document_processor.fingerprint_pages, file_path
+            )).values())
+        if config.INCREMENTAL_INGEST and replace:
+            previous = await asyncio.to_thread(self.previous_version, replace)
+            # A different document picked by mistake would wipe most of the old vectors
+            overlap = self.page_overlap(previous.get("page_hashes"), page_hashes) if previous else 0.0
+            if previous and overlap < config.INCREMENTAL_MIN_PAGE_OVERLAP:
+                logger.info(
+                    f"Not updating {previous['collection_name']} in place: "
+                    f"only {overlap:.0%} of pages match; ingesting {filename} as a new document"
+                )
+                previous = None
+
+        report("extracting")
+        processed_doc = await self.document_processor.process_pdf(file_path)
+
+        # OCR only the pages that failed text routing, then merge in page order
+        ocr_text = {}
+        ocr_pages = processed_doc["ocr_pages"]
+        if ocr_pages:
+            done = 0
+            report("ocr", 0, len(ocr_pages))
+
+            def page_done(_page_num):
+                nonlocal done
+                done += 1
+                report("ocr", done, len(ocr_pages))
+
+            with self.document_processor.job_scratch_dir() as job_dir:
+                page_images = self.document_processor.iter_page_images(file_path, ocr_pages, job_dir)
+                ocr_text = await self.ocr_service.process_images(page_images, progress=page_done)
+
+        page_texts = self.document_processor.merge_page_text(
+            processed_doc["extracted_text"], ocr_text
+        )
+
+        # Chunk offsets index into this joined text
+        extracted_text = TextChunker.join_pages(page_texts)
+        metadata = self.extract_title_metadata(extracted_text)
+
+        # Chunking, embedding and Chroma writes are blocking; run them off the loop
+        report("chunking")
+        chunks = await asyncio.to_thread(self.embedding_service.chunk_pages, page_texts)
+
+        incremental = None
+        if previous:
+            # Embeds only the chunks the previous version doesn't have
+            report("updating", 0, len(chunks))
+            location = {"collection_name": previous["collection_name"], "doc_id": previous.get("doc_id")}
+            sync = await asyncio.to_thread(
+                self.vector_db_service.sync_document, location["collection_name"], chunks, location["doc_id"]
+            )
+            if sync is None:
+                raise RuntimeError(f"Failed to update {location['doc_id'] or location['collection_name']} in place")
+            report("updating", len(chunks), len(chunks))
+            # Its vectors now hold this version; a re-upload of the old file must re-ingest
+            await asyncio.to_thread(self.ingest_cache.invalidate, previous["cache_key"])
+            incremental = {
+                "previous_cache_key": previous["cache_key"],
+                "chunks_reused": sync["reused"],
+                "chunks_embedded": sync["added"],
+                "chunks_removed": sync["removed"]
+            }
+        else:
+            report("embedding", 0, len(chunks))
+            embeddings = await asyncio.to_thread(
+                self.embedding_service.create_embeddings, [c["text"] for c in chunks]
+            )
+            report("embedding", len(chunks), len(chunks))
+
+            report("indexing")
+            location = await asyncio.to_thread(self.index, filename, cache_key, chunks, embeddings)
+
+        result = {
+            "collection_name": location["collection_name"],
+            "doc_id": location["doc_id"],
+            "filename": filename,
+            "text": extracted_text,
+            "chunks": chunks,
+            "metadata": metadata,
+            "page_hashes": page_hashes
+        }
+        await asyncio.to_thread(self.ingest_cache.put, cache_key, result)
+
+        if incremental:
+            logger.info(f"Updated {filename} in place: {incremental}")
+        logger.info(f"Ingested {filename}: {processed_doc['page_count']} pages, {len(chunks)} chunks")
+        return dict(result, from_cache=False, page_count=processed_doc["page_count"], incremental=incremental)
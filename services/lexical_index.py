@@ -0,0 +1,239 @@
+import json
+import logging
+import math
+import os
+import re
+from collections import Counter, defaultdict
+from typing import Callable, Dict, List, Optional, Set, Tuple
+import config
+
+logger = logging.getLogger(__name__)
+
+# Keeps identifiers such as "4.2.1", "ISO-9001" or "A/B" together as one term
+TOKEN_RE = re.compile(r"\w+(?:[.\-/]\w+)*")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase word tokens, plus the parts of compound identifiers."""
+    tokens = []
+    for match in TOKEN_RE.finditer(text.lower()):
+        term = match.group()
+        tokens.append(term)
+        if not term.isalnum():
+            tokens.extend(part for part in re.split(r"[.\-/]", term) if part)
+    return tokens
+
+
+class BM25Index:
+    """In-memory BM25 inverted index over the chunks of one collection.
+
+    Removed chunks are tombstoned and skipped at search time; their postings
+    are dropped once tombstones make up a quarter of the index. On disk an
+    index is a JSON snapshot plus an append-only log of later changes, so
+    adding a document costs a write proportional to that document, not to
+    the whole collection.
+    """
+
+    # Tombstone share of the index that triggers a rebuild of the postings
+    COMPACT_RATIO = 0.25
+
+    def __init__(self, k1: float = None, b: float = None):
+        self.k1 = config.BM25_K1 if k1 is None else k1
+        self.b = config.BM25_B if b is None else b
+        self.ids: List[str] = []
+        self.doc_lengths: List[int] = []
+        self.postings: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+        self.removed: Set[int] = set()
+        self._positions: Dict[str, int] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self.ids) - len(self.removed)
+
+    def add(self, ids: List[str], texts: List[str]):
+        """
+        Index chunks; an ID that is already indexed is replaced.
+
+        Args:
+            ids: Chunk IDs, as stored in the vector collection
+            texts: Chunk texts aligned with ids
+        """
+        self.remove([chunk_id for chunk_id in ids if chunk_id in self._positions], compact=False)
+        for chunk_id, text in zip(ids, texts):
+            doc_index = len(self.ids)
+            terms = Counter(tokenize(text))
+            length = sum(terms.values())
+            self.ids.append(chunk_id)
+            self.doc_lengths.append(length)
+            self._positions[chunk_id] = doc_index
+            self._total_length += length
+            for term, tf in terms.items():
+                self.postings[term].append((doc_index, tf))
+
+    def remove(self, ids: List[str], compact: bool = True):
+        """
+        Drop chunks from the index.
+
+        Args:
+            ids: Chunk IDs to remove; unknown IDs are ignored
+            compact: Rebuild the postings if tombstones have piled up
+        """
+        for chunk_id in ids:
+            doc_index = self._positions.pop(chunk_id, None)
+            if doc_index is not None:
+                self.removed.add(doc_index)
+                self._total_length -= self.doc_lengths[doc_index]
+        if compact and len(self.removed) > self.COMPACT_RATIO * len(self.ids):
+            self.compact()
+
+    def compact(self):
+        """Physically drop tombstoned chunks and renumber the rest."""
+        if not self.removed:
+            return
+        keep = [i for i in range(len(self.ids)) if i not in self.removed]
+        remap = {old: new for new, old in enumerate(keep)}
+
+        self.ids = [self.ids[i] for i in keep]
+        self.doc_lengths = [self.doc_lengths[i] for i in keep]
+        postings = defaultdict(list)
+        for term, entries in self.postings.items():
+            kept = [(remap[doc_index], tf) for doc_index, tf in entries if doc_index in remap]
+            if kept:
+                postings[term] = kept
+        self.postings = postings
+        self.removed = set()
+        self._positions = {chunk_id: i for i, chunk_id in enumerate(self.ids)}
+
+    def search(self, query: str, n_results: int,
+               id_filter: Optional[Callable[[str], bool]] = None) -> List[Tuple[str, float]]:
+        """
+        Rank chunks against a query with BM25.
+
+        Args:
+            query: The query text
+            n_results: Maximum number of results
+            id_filter: Optional predicate on chunk IDs; chunks it rejects are
+                not scored
+
+        Returns:
+            List[Tuple[str, float]]: (chunk ID, score) pairs, best first
+        """
+        n_docs = len(self)
+        if not n_docs:
+            return []
+
+        avg_length = self._total_length / n_docs or 1.0
+        scores = defaultdict(float)
+
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            if self.removed:
+                postings = [p for p in postings if p[0] not in self.removed]
+                if not postings:
+                    continue
+            idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_index, tf in postings:
+                if id_filter is not None and not id_filter(self.ids[doc_index]):
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self.doc_lengths[doc_index] / avg_length)
+                scores[doc_index] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+        ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)[:n_results]
+        return [(self.ids[doc_index], score) for doc_index, score in ranked]
+
+    @staticmethod
+    def log_path(path) -> str:
+        return f"{path}.log"
+
+    @classmethod
+    def exists(cls, path) -> bool:
+        return os.path.exists(path) or os.path.exists(cls.log_path(path))
+
+    def save(self, path):
+        """Write a full snapshot atomically and clear the change log."""
+        self.compact()
+        data = {
+            "k1": self.k1,
+            "b": self.b,
+            "ids": self.ids,
+            "doc_lengths": self.doc_lengths,
+            "postings": self.postings
+        }
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+        # Replaying a log already in the snapshot is harmless: adds replace, removes are idempotent
+        try:
+            os.remove(self.log_path(path))
+        except FileNotFoundError:
+            pass
+
+    @classmethod
+    def append_changes(cls, path, ids: List[str], texts: List[str], removed: List[str] = None):
+        """Append one batch of changes, applied after removals in the same batch, to the change log."""
+        record = {"remove": list(removed or []), "ids": list(ids), "texts": list(texts)}
+        with open(cls.log_path(path), "a", encoding="utf-8") as file:
+            file.write(json.dumps(record) + "\n")
+
+    @classmethod
+    def needs_snapshot(cls, path) -> bool:
+        """Whether the change log has outgrown the snapshot and should be folded into it."""
+        try:
+            log_bytes = os.path.getsize(cls.log_path(path))
+        except FileNotFoundError:
+            return False
+        snapshot_bytes = os.path.getsize(path) if os.path.exists(path) else 0
+        return log_bytes > max(snapshot_bytes, config.LEXICAL_LOG_MIN_BYTES)
+
+    @classmethod
+    def load(cls, path) -> "BM25Index":
+        """Read an index written by save, then replay its change log."""
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+            index = cls(k1=data["k1"], b=data["b"])
+            index.ids = data["ids"]
+            index.doc_lengths = data["doc_lengths"]
+            index.postings = defaultdict(list, {
+                term: [tuple(p) for p in postings] for term, postings in data["postings"].items()
+            })
+            index._positions = {chunk_id: i for i, chunk_id in enumerate(index.ids)}
+            index._total_length = sum(index.doc_lengths)
+        else:
+            index = cls()
+
+        log_path = cls.log_path(path)
+        if os.path.exists(log_path):
+            with open(log_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:
+                        # A crash mid-append leaves a partial last line
+                        logger.warning(f"Skipping damaged change record in {log_path}")
+                        continue
+                    index.remove(record.get("remove", []))
+                    index.add(record.get("ids", []), record.get("texts", []))
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[Tuple[List[str], float]], k: int = None) -> List[Tuple[str, float]]:
+    """
+    Fuse ranked ID lists with weighted reciprocal rank fusion.
+
+    Args:
+        rankings: (ranked IDs, weight) pairs
+        k: RRF smoothing constant
+
+    Returns:
+        List[Tuple[str, float]]: (ID, fused score) pairs, best first
+    """
+    k = config.RRF_K if k is None else k
+    scores = defaultdict(float)
+    for ids, weight in rankings:
+        for rank, chunk_id in enumerate(ids):
+            scores[chunk_id] += weight / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
@@ -1,25 +1,84 @@
+import asyncio
+import hashlib
 import logging
-import requests
+import httpx
 import json
-from typing import Dict, Any, List
+import time
+import weakref
+from typing import Dict, Any, List, AsyncIterator, Optional
 import config
+from services.cache_store import LRUStore
+from services import telemetry
 
 logger = logging.getLogger(__name__)
 
+
+class LLMStreamError(RuntimeError):
+    """Generation failed; ``partial`` is the text streamed before the failure."""
+    
+    def __init__(self, message: str, partial: str = ""):
+        super().__init__(message)
+        self.partial = partial
+
+
 class LLMService:
     """Service for interacting with LLM models for summarization and RAG-based Q&A."""
     
     def __init__(self):
         self.model = config.LLM_MODEL
         self.endpoint = config.LLM_ENDPOINT
+        # One pool per event loop; dropped with its loop
+        self._clients = weakref.WeakKeyDictionary()
+        self.summary_cache = LRUStore(config.SUMMARY_CACHE_PATH, config.SUMMARY_CACHE_MAX_ENTRIES, name="summary")
         logger.info(f"Initialized LLM service with model: {self.model}")
         
-    async def generate_summary(self, text: str) -> str:
+    def _get_client(self) -> httpx.AsyncClient:
+        """
+        Get the pooled HTTP client for the running event loop.
+        
+        Connections are kept alive and reused across calls. httpx clients are
+        bound to the loop they were created on, so each loop the service is
+        used from gets its own pool; all of them are closed by aclose.
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                base_url=self.endpoint,
+                timeout=httpx.Timeout(config.LLM_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=config.LLM_MAX_CONNECTIONS,
+                    max_keepalive_connections=config.LLM_MAX_CONNECTIONS,
+                    keepalive_expiry=30.0
+                )
+            )
+            self._clients[loop] = client
+        return client
+        
+    async def aclose(self):
+        """Close pooled connections on every loop the service has used."""
+        current = asyncio.get_running_loop()
+        clients, self._clients = list(self._clients.items()), weakref.WeakKeyDictionary()
+        for loop, client in clients:
+            if loop is current:
+                await client.aclose()
+            elif loop.is_running():
+                # A client can only be closed on its own loop
+                await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+            else:
+                logger.warning("Dropping an HTTP client whose event loop is no longer running")
+        
+    async def generate_summary(self, text: str, chunks: Optional[List[Dict[str, Any]]] = None) -> str:
         """
         Generate a summary of the provided text.
         
+        Text that fits one context window is summarized in a single call;
+        longer text is summarized with map-reduce over its chunks.
+        
         Args:
             text: The text to summarize
+            chunks: Chunks of the text from EmbeddingService.chunk_text or
+                chunk_pages, used for map-reduce on long documents
             
         Returns:
             str: The generated summary
@@ -27,10 +86,14 @@ class LLMService:
         if not text or not text.strip():
             return "No text provided for summarization."
             
-        # Create the prompt for summarization
-        prompt = config.SUMMARIZATION_PROMPT_TEMPLATE.format(text=text)
-        
         try:
+            if self._estimate_tokens(text) > config.SUMMARY_CONTEXT_TOKENS:
+                chunk_texts = [c["text"] for c in chunks] if chunks else self._split_text(text)
+                return await self._map_reduce_summary(chunk_texts)
+                
+            # Create the prompt for summarization
+            prompt = config.SUMMARIZATION_PROMPT_TEMPLATE.format(text=text)
+            
             # Call the LLM API
             response = await self._generate_text(prompt)
             return response
@@ -38,6 +101,142 @@ class LLMService:
             logger.error(f"Error generating summary: {e}")
             return "Failed to generate summary due to an error."
     
+    @staticmethod
+    def _estimate_tokens(text: str) -> int:
+        """Rough token count for budgeting prompts (about 4 characters per token)."""
+        return len(text) // 4 + 1
+    
+    @classmethod
+    def _truncate_tokens(cls, text: str, tokens: int) -> str:
+        """Cut text to at most ``tokens`` estimated tokens, at a word boundary when possible."""
+        if cls._estimate_tokens(text) <= tokens:
+            return text
+        limit = max(0, tokens - 1) * 4
+        cut = text.rfind(" ", 0, limit)
+        return text[:cut if cut > limit // 2 else limit].rstrip()
+    
+    def _split_text(self, text: str) -> List[str]:
+        """Split text into pieces of about SUMMARY_MAP_TOKENS when no chunks are given."""
+        size = config.SUMMARY_MAP_TOKENS * 4
+        return [text[i:i + size] for i in range(0, len(text), size)]
+    
+    def _group_chunks(self, chunk_texts: List[str], budget: int) -> List[str]:
+        """
+        Join consecutive chunks into map groups with content-defined boundaries.
+        
+        Whether a group ends after a chunk depends only on that chunk's hash
+        (with a probability proportional to its size, so groups average
+        about half the budget), plus the hard ``budget`` limit. Editing or
+        inserting one chunk therefore changes only the group it lands in,
+        and the cached map summaries of every other group still apply.
+        """
+        groups, current, current_tokens = [], [], 0
+        for text in chunk_texts:
+            tokens = self._estimate_tokens(text)
+            if current and current_tokens + tokens > budget:
+                groups.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+            
+            digest = hashlib.sha256(text.encode("utf-8")).digest()
+            if int.from_bytes(digest[:8], "big") / 2 ** 64 < 2 * tokens / budget:
+                groups.append("\n\n".join(current))
+                current, current_tokens = [], 0
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+    
+    def _group_texts(self, texts: List[str], budget: int) -> List[str]:
+        """Greedily join consecutive texts into groups of at most ``budget`` tokens."""
+        groups, current, current_tokens = [], [], 0
+        for text in texts:
+            tokens = self._estimate_tokens(text)
+            if current and current_tokens + tokens > budget:
+                groups.append("\n\n".join(current))
+                current, current_tokens = [], 0
+            current.append(text)
+            current_tokens += tokens
+        if current:
+            groups.append("\n\n".join(current))
+        return groups
+    
+    async def _map_reduce_summary(self, chunk_texts: List[str]) -> str:
+        """
+        Summarize long text hierarchically.
+        
+        Consecutive chunks are grouped up to SUMMARY_MAP_TOKENS and summarized
+        concurrently (at most LLM_MAX_CONCURRENCY calls in flight). Partial
+        summaries are then combined in a tree until they fit one context, and
+        a final call produces the summary; partials too large to combine are
+        truncated, so no prompt exceeds SUMMARY_CONTEXT_TOKENS. Every
+        intermediate summary is cached by a hash of its input; map groups are
+        cut at content-defined boundaries so an edited document reuses the
+        summaries of the groups it left unchanged.
+        """
+        semaphore = asyncio.Semaphore(config.LLM_MAX_CONCURRENCY)
+        
+        groups = self._group_chunks(chunk_texts, config.SUMMARY_MAP_TOKENS)
+        logger.info(f"Map-reduce summary: {len(chunk_texts)} chunks in {len(groups)} map groups")
+        partials = await asyncio.gather(*[
+            self._cached_summary(config.SUMMARY_MAP_PROMPT_TEMPLATE, group, semaphore)
+            for group in groups
+        ])
+        
+        level = 0
+        while self._estimate_tokens("\n\n".join(partials)) > config.SUMMARY_CONTEXT_TOKENS:
+            groups = self._group_texts(partials, config.SUMMARY_CONTEXT_TOKENS)
+            if len(groups) >= len(partials):
+                # Partials are individually too large to pair up; cut each to half
+                # the context so every reduce call merges at least two of them
+                logger.warning(
+                    f"Map-reduce summary: truncating {len(partials)} partials to fit "
+                    f"{config.SUMMARY_CONTEXT_TOKENS} tokens"
+                )
+                partials = [self._truncate_tokens(p, config.SUMMARY_CONTEXT_TOKENS // 2) for p in partials]
+                if self._estimate_tokens("\n\n".join(partials)) <= config.SUMMARY_CONTEXT_TOKENS:
+                    break
+                groups = self._group_texts(partials, config.SUMMARY_CONTEXT_TOKENS)
+            level += 1
+            logger.info(f"Map-reduce summary: reducing {len(partials)} partials to {len(groups)} (level {level})")
+            partials = await asyncio.gather(*[
+                self._cached_summary(config.SUMMARY_REDUCE_PROMPT_TEMPLATE, group, semaphore)
+                for group in groups
+            ])
+            
+        return await self._cached_summary(
+            config.SUMMARIZATION_PROMPT_TEMPLATE, "\n\n".join(partials), semaphore
+        )
+    
+    async def _cached_summary(self, template: str, text: str, semaphore: asyncio.Semaphore) -> str:
+        """Summarize one piece of text with the given template, using the summary cache."""
+        key = hashlib.sha256(f"{self.model}\0{template}\0{text}".encode("utf-8")).hexdigest()
+        # SQLite lookups block; keep them off the event loop
+        cached = await asyncio.to_thread(self.summary_cache.get, key)
+        if cached is not None:
+            return cached.decode("utf-8")
+            
+        async with semaphore:
+            summary = await self._complete(template.format(text=text))
+            
+        # A failed or empty generation must be retried next time, not replayed from the cache
+        if not summary.strip():
+            raise RuntimeError("LLM returned no summary")
+        await asyncio.to_thread(self.summary_cache.put, key, summary.encode("utf-8"))
+        return summary
+    
+    @telemetry.timed("prompt_build")
+    def _build_rag_prompt(self, question: str, context: List[Dict[str, Any]]) -> str:
+        """Format retrieved chunks and the question into the RAG prompt."""
+        # Concatenate context chunks
+        context_text = "\n\n".join([f"Chunk {i+1}:\n{chunk['text']}" for i, chunk in enumerate(context)])
+        
+        # Create the prompt for Q&A
+        return config.RAG_PROMPT_TEMPLATE.format(
+            context=context_text,
+            question=question
+        )
+    
     async def answer_question(self, question: str, context: List[Dict[str, Any]]) -> str:
         """
         Answer a question based on the provided context.
@@ -55,14 +254,7 @@ class LLMService:
         if not context:
             return "I don't have enough information to answer this question based on the document."
             
-        # Concatenate context chunks
-        context_text = "\n\n".join([f"Chunk {i+1}:\n{chunk['text']}" for i, chunk in enumerate(context)])
-        
-        # Create the prompt for Q&A
-        prompt = config.RAG_PROMPT_TEMPLATE.format(
-            context=context_text,
-            question=question
-        )
+        prompt = self._build_rag_prompt(question, context)
         
         try:
             # Call the LLM API
@@ -72,6 +264,106 @@ class LLMService:
             logger.error(f"Error answering question: {e}")
             return "Failed to generate an answer due to an error."
     
+    async def answer_question_stream(self, question: str, context: List[Dict[str, Any]],
+                                     trace: Optional[telemetry.Trace] = None) -> AsyncIterator[str]:
+        """
+        Answer a question based on the provided context, yielding tokens as they arrive.
+        
+        Args:
+            question: The user's question
+            context: List of relevant text chunks
+            trace: Question trace to record LLM timings into
+            
+        Yields:
+            str: Pieces of the generated answer
+            
+        Raises:
+            LLMStreamError: If generation fails; carries any text already
+                yielded so callers can report the failure apart from it
+        """
+        if not question or not question.strip():
+            yield "No question provided."
+            return
+            
+        if not context:
+            yield "I don't have enough information to answer this question based on the document."
+            return
+            
+        prompt = self._build_rag_prompt(question, context)
+        
+        partial = []
+        try:
+            async for token in self.stream_text(prompt, trace=trace):
+                partial.append(token)
+                yield token
+        except Exception as e:
+            logger.error(f"Error answering question: {e}")
+            raise LLMStreamError(f"Failed to generate an answer: {e}", "".join(partial)) from e
+    
+    def _build_payload(self, prompt: str, stream: bool) -> Dict[str, Any]:
+        """Build the Ollama /api/generate request body."""
+        return {
+            "model": self.model.split('/')[-1] if '/' in self.model else self.model,
+            "prompt": prompt,
+            "stream": stream,
+            "options": {
+                "temperature": 0.7,
+                "top_p": 0.9,
+                "max_tokens": 1024
+            }
+        }
+    
+    async def stream_text(self, prompt: str, trace: Optional[telemetry.Trace] = None) -> AsyncIterator[str]:
+        """
+        Stream generated text from the LLM API.
+        
+        Ollama's streaming /api/generate returns one JSON object per line;
+        each non-empty "response" field is yielded as soon as it is read.
+        
+        Args:
+            prompt: The prompt for the LLM
+            trace: Trace to record llm_first_token and llm_generate into;
+                the current trace is not reliable across a generator's yields
+            
+        Yields:
+            str: Generated tokens
+        """
+        client = self._get_client()
+        logger.debug(f"Streaming from LLM API: {self.endpoint}/api/generate")
+        
+        started = time.perf_counter()
+        first_token_at, tokens = None, 0
+        try:
+            async with client.stream("POST", "/api/generate", json=self._build_payload(prompt, stream=True)) as response:
+                if response.status_code != 200:
+                    body = await response.aread()
+                    logger.error(f"LLM API error: {response.status_code} - {body.decode(errors='replace')}")
+                    raise RuntimeError(f"LLM API returned status code {response.status_code}")
+                    
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    data = json.loads(line)
+                    if data.get("error"):
+                        raise RuntimeError(f"LLM API error: {data['error']}")
+                    token = data.get("response", "")
+                    if token:
+                        if first_token_at is None:
+                            first_token_at = time.perf_counter()
+                            telemetry.record("llm_first_token", started, trace=trace)
+                        tokens += 1
+                        yield token
+                    if data.get("done"):
+                        break
+        finally:
+            # Each streamed chunk carries one token
+            telemetry.record("llm_generate", started, trace=trace, tokens=tokens)
+            if tokens:
+                telemetry.LLM_TOKENS.inc(tokens)
+                elapsed = time.perf_counter() - first_token_at
+                if tokens > 1 and elapsed > 0:
+                    telemetry.LLM_TOKENS_PER_SECOND.observe((tokens - 1) / elapsed)
+    
     async def _generate_text(self, prompt: str) -> str:
         """
         Generate text using the LLM API.
@@ -82,35 +374,14 @@ class LLMService:
         Returns:
             str: The generated text
         """
+        return await self._complete(prompt) or "No response from LLM"
+    
+    async def _complete(self, prompt: str) -> str:
+        """Collect the full generated text for a prompt; empty if the model returned nothing."""
         # For Ollama API
         try:
-            payload = {
-                "model": self.model.split('/')[-1] if '/' in self.model else self.model,
-                "prompt": prompt,
-                "stream": False,
-                "options": {
-                    "temperature": 0.7,
-                    "top_p": 0.9,
-                    "max_tokens": 1024
-                }
-            }
-            
-            logger.debug(f"Sending request to LLM API: {self.endpoint}/api/generate")
-            
-            response = requests.post(
-                f"{self.endpoint}/api/generate",
-                json=payload,
-                headers={"Content-Type": "application/json"},
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                result = response.json()
-                return result.get("response", "No response from LLM")
-            else:
-                logger.error(f"LLM API error: {response.status_code} - {response.text}")
-                return f"Error: LLM API returned status code {response.status_code}"
-                
+            tokens = [token async for token in self.stream_text(prompt)]
+            return "".join(tokens)
         except Exception as e:
             logger.error(f"Error calling LLM API: {e}")
             raise
@@ -1,55 +1,430 @@
+import asyncio
+import hashlib
+import json
 import logging
+import multiprocessing
+import os
+import time
 import pytesseract
-from pathlib import Path
-from PIL import Image
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from PIL import Image, ImageOps
+import config
+from services.cache_store import LRUStore
+from services import telemetry
 
 logger = logging.getLogger(__name__)
 
+# Raw, uncompressed page pixels handed to OCR workers; no encode/decode round-trip
+PageBuffer = namedtuple("PageBuffer", ["mode", "size", "data", "dpi"])
+
+
+def to_page_buffer(image, dpi):
+    """Convert a rendered page to a grayscale PageBuffer."""
+    if image.mode not in ("L", "1"):
+        image = image.convert("L")
+    return PageBuffer(image.mode, image.size, image.tobytes(), dpi)
+
+
+def _otsu_threshold(histogram):
+    """Compute Otsu's binarization threshold from a 256-bin histogram."""
+    total = sum(histogram)
+    weighted_total = sum(i * count for i, count in enumerate(histogram))
+    background, weighted_background = 0, 0
+    best_threshold, best_variance = 127, -1.0
+
+    for threshold, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += threshold * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = threshold, variance
+
+    return best_threshold
+
+
+def _binarize(image):
+    """Binarize a grayscale image with Otsu's threshold."""
+    threshold = _otsu_threshold(image.histogram())
+    return image.point(lambda p: 255 if p > threshold else 0)
+
+
+def _is_clean(image):
+    """Treat pages whose pixels are almost all near-black or near-white as clean."""
+    histogram = image.histogram()
+    extremes = sum(histogram[:64]) + sum(histogram[192:])
+    return extremes >= 0.98 * sum(histogram)
+
+
+def _deskew(image, max_angle=5.0, step=0.5):
+    """Straighten a page using the projection-profile method on a thumbnail."""
+    thumb = image.copy()
+    thumb.thumbnail((800, 800))
+    # Text becomes white on black so rotation fill does not add ink
+    thumb = ImageOps.invert(_binarize(thumb))
+
+    best_angle, best_score = 0.0, -1.0
+    steps = int(max_angle / step)
+    for i in range(-steps, steps + 1):
+        angle = i * step
+        rotated = thumb.rotate(angle, resample=Image.NEAREST, fillcolor=0)
+        # Averaging each row to one pixel gives the horizontal projection profile
+        profile = list(rotated.resize((1, rotated.height), Image.BOX).getdata())
+        mean = sum(profile) / len(profile)
+        score = sum((p - mean) ** 2 for p in profile)
+        if score > best_score:
+            best_angle, best_score = angle, score
+
+    if best_angle:
+        return image.rotate(best_angle, resample=Image.BICUBIC, expand=True, fillcolor=255)
+    return image
+
+
+def preprocess_page(image, dpi, options):
+    """
+    Prepare a page image for Tesseract.
+
+    Args:
+        image: The rendered page
+        dpi: Resolution the page was rendered at
+        options: Dictionary with clean_dpi, deskew and binarize settings
+
+    Returns:
+        PIL.Image: The grayscale, optionally downscaled/deskewed/binarized page
+    """
+    if image.mode != "L":
+        image = image.convert("L")
+
+    clean_dpi = options.get("clean_dpi")
+    if clean_dpi and dpi and dpi > clean_dpi and _is_clean(image):
+        scale = clean_dpi / dpi
+        image = image.resize(
+            (max(1, round(image.width * scale)), max(1, round(image.height * scale))),
+            Image.LANCZOS
+        )
+
+    if options.get("deskew"):
+        image = _deskew(image)
+
+    if options.get("binarize"):
+        image = _binarize(image)
+
+    return image
+
+
+def _ocr_page_buffer(buffer, lang, tesseract_config, timeout, options):
+    """Preprocess and OCR one page buffer. Executed in OCR worker processes."""
+    image = Image.frombytes(buffer.mode, buffer.size, buffer.data)
+    image = preprocess_page(image, buffer.dpi, options)
+    return pytesseract.image_to_string(
+        image, lang=lang, config=tesseract_config, timeout=timeout
+    )
+
+
+def _ocr_page_buffer_timed(buffer, lang, tesseract_config, timeout, options):
+    """
+    Run _ocr_page_buffer and time it inside the worker.
+
+    Returns:
+        tuple: (text, wall-clock time the worker picked the page up,
+        seconds spent on it)
+    """
+    picked_up = time.time()
+    started = time.perf_counter()
+    text = _ocr_page_buffer(buffer, lang, tesseract_config, timeout, options)
+    return text, picked_up, time.perf_counter() - started
+
+
+def _pool_context():
+    """
+    Start OCR workers with forkserver, or spawn where it is unavailable.
+
+    The pool is created lazily in a process that already runs threads (the
+    query batcher, torch, SQLite); forking it can copy a held lock into a
+    worker and deadlock it.
+    """
+    if "forkserver" in multiprocessing.get_all_start_methods():
+        return multiprocessing.get_context("forkserver")
+    return multiprocessing.get_context("spawn")
+
+
 class OCRService:
     """Service for performing OCR on document images using Tesseract."""
-    
+
     def __init__(self):
         # Optional: point to the Tesseract executable if it's not in PATH
         # pytesseract.pytesseract.tesseract_cmd = r'C:\Program Files\Tesseract-OCR\tesseract.exe'
-        pass
-        
-    async def process_images(self, images_by_page):
+        self.lang = config.OCR_LANG
+        self.tesseract_config = config.OCR_TESSERACT_CONFIG
+        self.parallel = config.OCR_PARALLEL
+        self.workers = config.OCR_WORKERS or os.cpu_count() or 1
+        self.page_timeout = config.OCR_PAGE_TIMEOUT
+        self.dpi = config.OCR_DPI
+        self.preprocess_options = {
+            "clean_dpi": config.OCR_CLEAN_DPI,
+            "deskew": config.OCR_DESKEW,
+            "binarize": config.OCR_BINARIZE
+        }
+        self._executor = None
+
+        # Identical pages (cover sheets, boilerplate) are OCR'd once
+        self.cache = None
+        self._settings_key = None
+        if config.OCR_CACHE_ENABLED:
+            self.cache = LRUStore(config.OCR_CACHE_PATH, config.OCR_CACHE_MAX_ENTRIES, name="ocr")
+
+    def _settings_fingerprint(self) -> bytes:
+        """Everything besides the pixels that changes Tesseract's output."""
+        if self._settings_key is None:
+            try:
+                version = str(pytesseract.get_tesseract_version())
+            except Exception:
+                version = "unknown"
+            self._settings_key = json.dumps({
+                "tesseract": version,
+                "lang": self.lang,
+                "config": self.tesseract_config,
+                "preprocess": self.preprocess_options
+            }, sort_keys=True).encode("utf-8")
+        return self._settings_key
+
+    def _cache_key(self, buffer: PageBuffer) -> str:
+        """Exact hash of the rendered page pixels plus the OCR settings."""
+        digest = hashlib.sha256(self._settings_fingerprint())
+        digest.update(f"{buffer.mode}:{buffer.size[0]}x{buffer.size[1]}@{buffer.dpi}".encode("utf-8"))
+        digest.update(buffer.data)
+        return digest.hexdigest()
+
+    def _cache_lookup(self, buffer: PageBuffer):
+        """
+        Look a page up in the OCR cache.
+
+        Returns:
+            tuple: (key, text) where text is None on a miss; (None, None)
+            when the cache is disabled
+        """
+        if self.cache is None:
+            return None, None
+        key = self._cache_key(buffer)
+        cached = self.cache.get(key)
+        return key, cached.decode("utf-8") if cached is not None else None
+
+    def _cache_store(self, key, text: str):
+        if key is not None:
+            self.cache.put(key, text.encode("utf-8"))
+
+    @telemetry.timed("ocr")
+    async def process_images(self, images_by_page, progress=None):
         """
         Process images and extract text using Tesseract OCR.
 
         Args:
-            images_by_page: Dictionary of page numbers and image paths
+            images_by_page: Dictionary of page numbers and images, or an
+                iterable of (page_num, image) pairs such as the stream
+                produced by ``DocumentProcessor.iter_page_images``. Images
+                may be PIL images or paths to image files.
+            progress: Optional callback called with the page number after
+                each page finishes
 
         Returns:
             dict: Dictionary of page numbers and extracted text
         """
-        logger.info(f"[OCR] Processing {len(images_by_page)} pages with Tesseract")
+        if isinstance(images_by_page, dict):
+            logger.info(f"[OCR] Processing {len(images_by_page)} pages with Tesseract")
+            images_by_page = images_by_page.items()
+        else:
+            logger.info("[OCR] Processing page stream with Tesseract")
+
+        if self.parallel:
+            return await self._process_images_parallel(images_by_page, progress)
 
         extracted_text = {}
+        pages = iter(images_by_page)
+
+        while True:
+            # Rendering, Tesseract and the cache all block; one page at a time in a thread
+            item = await asyncio.to_thread(next, pages, None)
+            if item is None:
+                break
 
-        for page_num, image_path in images_by_page.items():
+            page_num, image = item
             try:
-                text = self._extract_text_from_image(image_path)
+                text = await asyncio.to_thread(self._ocr_page_inline, page_num, image)
                 extracted_text[page_num] = text
                 logger.info(f"[OCR] Page {page_num} text length: {len(text)}")
             except Exception as e:
                 logger.error(f"[OCR] Error on page {page_num}: {e}")
                 extracted_text[page_num] = ""
+            if progress is not None:
+                progress(page_num)
 
         return extracted_text
 
-    def _extract_text_from_image(self, image_path):
-        """Extract text from a single image using Tesseract."""
-        image_path = Path(image_path)
-        
-        if not image_path.exists():
-            logger.error(f"[OCR] Image file not found: {image_path}")
-            return ""
+    def _ocr_page_inline(self, page_num, image):
+        """OCR one page in the calling thread, via the OCR cache."""
+        buffer = self._load_page_buffer(image)
+        key, text = self._cache_lookup(buffer)
+        if text is None:
+            with telemetry.span("ocr_page", page=page_num):
+                text = _ocr_page_buffer(
+                    buffer, self.lang, self.tesseract_config,
+                    self.page_timeout, self.preprocess_options
+                )
+            telemetry.PAGES_OCR.inc()
+            self._cache_store(key, text)
+        return text
+
+    async def _process_images_parallel(self, images_by_page, progress=None):
+        """
+        OCR pages on a bounded process pool without blocking the event loop.
+
+        Pages are pulled from the input one at a time and at most two pages
+        per worker are in flight, so a streaming input is never rendered far
+        ahead of OCR. Results are returned in page order and a failure or
+        timeout on one page yields empty text for that page only.
+        Cancelling the caller cancels the pages still queued in the pool.
+        """
+        loop = asyncio.get_running_loop()
+        slots = asyncio.Semaphore(self.workers * 2)
+        pages = iter(images_by_page)
+        tasks = {}
+
+        try:
+            while True:
+                await slots.acquire()
+                # Pulling from the page stream may render pages; keep it off the loop
+                item = await loop.run_in_executor(None, next, pages, None)
+                if item is None:
+                    slots.release()
+                    break
+
+                page_num, image = item
+                try:
+                    # Copy the pixels out before advancing the stream, which closes the page
+                    buffer = await loop.run_in_executor(None, self._load_page_buffer, image)
+                except Exception as e:
+                    logger.error(f"[OCR] Could not read image for page {page_num}: {e}")
+                    tasks[page_num] = None
+                    slots.release()
+                    if progress is not None:
+                        progress(page_num)
+                    continue
+
+                task = asyncio.ensure_future(self._ocr_page(page_num, buffer))
+                task.add_done_callback(lambda _: slots.release())
+                if progress is not None:
+                    task.add_done_callback(lambda _, page_num=page_num: progress(page_num))
+                tasks[page_num] = task
+
+            extracted_text = {}
+            for page_num in sorted(tasks):
+                task = tasks[page_num]
+                extracted_text[page_num] = await task if task is not None else ""
+
+            return extracted_text
+        except asyncio.CancelledError:
+            # The ingest job was cancelled: drop queued pages from the pool
+            # instead of letting them run on unobserved
+            pending = [task for task in tasks.values() if task is not None and not task.done()]
+            for task in pending:
+                task.cancel()
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.info(f"[OCR] Cancelled with {len(pending)} pages outstanding")
+            raise
 
+    def _load_page_buffer(self, image):
+        """Get a PageBuffer from a PIL image or an image file path."""
+        if isinstance(image, Image.Image):
+            return to_page_buffer(image, self.dpi)
+
+        with Image.open(image) as img:
+            dpi = img.info.get("dpi", (self.dpi,))[0]
+            return to_page_buffer(img, round(dpi))
+
+    async def _ocr_page(self, page_num, buffer):
+        """OCR one page in the worker pool, isolating failures and timeouts."""
+        future = None
         try:
-            with Image.open(image_path) as img:
-                text = pytesseract.image_to_string(img)
+            # Hashing the pixels and the SQLite lookup are blocking
+            key, text = await asyncio.to_thread(self._cache_lookup, buffer)
+            if text is not None:
+                logger.info(f"[OCR] Page {page_num} served from cache")
                 return text
+
+            submitted, submitted_at = time.perf_counter(), time.time()
+            future = self._get_executor().submit(
+                _ocr_page_buffer_timed, buffer, self.lang, self.tesseract_config,
+                self.page_timeout, self.preprocess_options
+            )
+            # Tesseract enforces the timeout itself; the extra grace covers
+            # time spent queued behind other pages
+            text, picked_up, seconds = await asyncio.wait_for(
+                asyncio.wrap_future(future), timeout=self.page_timeout * 2
+            )
+            logger.info(f"[OCR] Page {page_num} text length: {len(text)}")
+            # Waiting for a free worker and OCR itself are reported apart;
+            # the worker's own clock times the page
+            queue_wait = max(0.0, picked_up - submitted_at)
+            telemetry.record("ocr_queue_wait", submitted, duration=queue_wait, page=page_num)
+            telemetry.record("ocr_page", submitted + queue_wait, duration=seconds, page=page_num)
+            telemetry.PAGES_OCR.inc()
+            await asyncio.to_thread(self._cache_store, key, text)
+            return text
+        except asyncio.TimeoutError:
+            logger.error(f"[OCR] Timed out on page {page_num} after {self.page_timeout}s")
+        except BrokenProcessPool as e:
+            logger.error(f"[OCR] Worker pool failed on page {page_num}: {e}")
+            self._reset_executor()
+        except Exception as e:
+            logger.error(f"[OCR] Error on page {page_num}: {e}")
+        finally:
+            if future is not None and not future.done():
+                future.cancel()
+        return ""
+
+    def _get_executor(self):
+        """Create the OCR worker pool on first use."""
+        if self._executor is None:
+            logger.info(f"[OCR] Starting worker pool with {self.workers} processes")
+            self._executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=_pool_context())
+        return self._executor
+
+    def _reset_executor(self):
+        """Discard a broken worker pool so the next page starts a fresh one."""
+        executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self):
+        """Stop the OCR worker pool."""
+        self._reset_executor()
+
+    def _extract_text_from_image(self, image):
+        """Extract text from a single PIL image or image file using Tesseract, via the OCR cache."""
+        try:
+            buffer = self._load_page_buffer(image)
+        except FileNotFoundError:
+            logger.error(f"[OCR] Image file not found: {image}")
+            return ""
+
+        try:
+            key, text = self._cache_lookup(buffer)
+            if text is None:
+                text = _ocr_page_buffer(
+                    buffer, self.lang, self.tesseract_config,
+                    self.page_timeout, self.preprocess_options
+                )
+                telemetry.PAGES_OCR.inc()
+                self._cache_store(key, text)
+            return text
         except Exception as e:
             logger.error(f"[OCR] Failed to OCR image: {e}")
             return ""
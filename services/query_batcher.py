@@ -0,0 +1,96 @@
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from typing import List
+import numpy as np
+import config
+from services import telemetry
+
+logger = logging.getLogger(__name__)
+
+class QueryEmbeddingBatcher:
+    """Micro-batches concurrent query embeddings into single encode calls.
+
+    Callers submit one query text each; a background thread collects texts
+    until ``max_batch_size`` are waiting or ``window_ms`` has passed since the
+    first one arrived, embeds them with one ``create_embeddings`` call and
+    resolves each caller's future with its own vector.
+    """
+
+    def __init__(self, embedding_service, window_ms: float = None, max_batch_size: int = None):
+        self.embedding_service = embedding_service
+        self.window = (window_ms if window_ms is not None else config.QUERY_BATCH_WINDOW_MS) / 1000.0
+        self.max_batch_size = max_batch_size or config.QUERY_BATCH_MAX_SIZE
+        self._pending = []
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="query-embedding-batcher", daemon=True)
+        self._thread.start()
+        telemetry.track_queue("query_embedding", lambda: len(self._pending))
+
+    def submit(self, text: str) -> Future:
+        """
+        Queue a query text for embedding.
+
+        Args:
+            text: The query text
+
+        Returns:
+            Future: Resolves to the query's float32 embedding vector
+        """
+        future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Query embedding batcher is closed")
+            self._pending.append((text, future))
+            self._condition.notify()
+        return future
+
+    @telemetry.timed("query_embed")
+    def embed(self, text: str) -> List[float]:
+        """Embed one query text, blocking until its batch has been encoded."""
+        return self.submit(text).result().tolist()
+
+    def _next_batch(self):
+        """Wait for the first request, then hold the window open to collect more."""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return []
+
+            deadline = time.monotonic() + self.window
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            batch = self._pending[:self.max_batch_size]
+            del self._pending[:self.max_batch_size]
+            return batch
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if not batch:
+                return
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = self.embedding_service.create_embeddings(texts)
+                logger.debug(f"Encoded query batch of {len(texts)}")
+                for (_, future), vector in zip(batch, vectors):
+                    future.set_result(np.ascontiguousarray(vector))
+            except Exception as e:
+                logger.error(f"Error encoding query batch: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+
+    def close(self):
+        """Stop the batching thread after draining queued requests."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._thread.join()
@@ -0,0 +1,259 @@
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+import config
+
+logger = logging.getLogger(__name__)
+
+# Stage latencies range from sub-millisecond (packing) to minutes (OCR of a long scan)
+STAGE_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+STAGE_SECONDS = Histogram(
+    "docqa_stage_seconds", "Time spent in each pipeline stage", ["stage"], buckets=STAGE_BUCKETS
+)
+STAGE_ERRORS = Counter("docqa_stage_errors_total", "Pipeline stages that raised", ["stage"])
+PAGES_OCR = Counter("docqa_pages_ocr_total", "Pages run through Tesseract")
+CHUNKS_EMBEDDED = Counter("docqa_chunks_embedded_total", "Texts encoded by the embedding model")
+CACHE_LOOKUPS = Counter("docqa_cache_lookups_total", "Cache lookups by outcome", ["cache", "result"])
+LLM_TOKENS = Counter("docqa_llm_tokens_total", "Tokens streamed from the LLM")
+LLM_TOKENS_PER_SECOND = Histogram(
+    "docqa_llm_tokens_per_second", "LLM generation speed per request",
+    buckets=(1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+)
+QUEUE_DEPTH = Gauge("docqa_queue_depth", "Items waiting in internal queues", ["queue"])
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_recent_traces = deque(maxlen=config.TRACE_RECENT)
+_recent_lock = threading.Lock()
+
+
+class Trace:
+    """Timeline of the spans recorded while handling one request or job."""
+
+    def __init__(self, name: str, **attributes):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.attributes = attributes
+        self.started_at = time.time()
+        self.duration = None
+        self._t0 = time.perf_counter()
+        self._spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    def add_span(self, stage: str, started: float, duration: float, error: str = None, **attributes):
+        """Record a finished span; ``started`` is a time.perf_counter() value."""
+        entry = {
+            "stage": stage,
+            "start_ms": round((started - self._t0) * 1000, 3),
+            "duration_ms": round(duration * 1000, 3)
+        }
+        if error:
+            entry["error"] = error
+        if attributes:
+            entry["attributes"] = attributes
+        with self._lock:
+            self._spans.append(entry)
+
+    @contextmanager
+    def span(self, stage: str, **attributes):
+        """Time a block into this trace and the stage histogram, without relying on context."""
+        started = time.perf_counter()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            STAGE_ERRORS.labels(stage).inc()
+            raise
+        finally:
+            duration = time.perf_counter() - started
+            STAGE_SECONDS.labels(stage).observe(duration)
+            self.add_span(stage, started, duration, error, **attributes)
+
+    def finish(self):
+        """Close the trace, keep it among the recent traces and dump it if enabled."""
+        if self.duration is not None:
+            return
+        self.duration = time.perf_counter() - self._t0
+        with _recent_lock:
+            _recent_traces.append(self)
+
+        if self.duration >= config.TRACE_SLOW_SECONDS:
+            logger.warning(f"Slow {self.name} trace {self.id}: {self.duration:.2f}s {self.breakdown()}")
+        if config.TRACE_DUMP_ENABLED:
+            try:
+                config.TRACE_DUMP_DIR.mkdir(parents=True, exist_ok=True)
+                path = config.TRACE_DUMP_DIR / f"{self.name}-{self.id}.json"
+                path.write_text(json.dumps(self.to_dict(), indent=2))
+            except Exception as e:
+                logger.warning(f"Could not write trace {self.id}: {e}")
+
+    def breakdown(self) -> Dict[str, float]:
+        """Total milliseconds per stage."""
+        totals: Dict[str, float] = {}
+        with self._lock:
+            for entry in self._spans:
+                totals[entry["stage"]] = round(totals.get(entry["stage"], 0.0) + entry["duration_ms"], 3)
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self._spans, key=lambda s: s["start_ms"])
+        return {
+            "id": self.id,
+            "name": self.name,
+            "attributes": self.attributes,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 3) if self.duration is not None else None,
+            "stages_ms": self.breakdown(),
+            "spans": spans
+        }
+
+
+@contextmanager
+def activate(trace: Optional[Trace]):
+    """
+    Make a trace current, so spans in this context and in threads started
+    with asyncio.to_thread are recorded into it.
+
+    Do not hold this across a ``yield`` of an async generator: the generator
+    may be resumed from another task, whose context does not have the trace.
+    """
+    token = _current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        _current_trace.reset(token)
+
+
+@contextmanager
+def trace(name: str, **attributes):
+    """Start, activate and finish a trace around a block."""
+    current = Trace(name, **attributes)
+    try:
+        with activate(current):
+            yield current
+    finally:
+        current.finish()
+
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+
+@contextmanager
+def span(stage: str, **attributes):
+    """
+    Time a pipeline stage.
+
+    The duration is observed in the ``docqa_stage_seconds`` histogram and,
+    when a trace is active, added to its timeline.
+
+    Args:
+        stage: Stage name, used as the metric label
+        attributes: Extra fields stored on the trace span
+    """
+    active = _current_trace.get()
+    started = time.perf_counter()
+    error = None
+    try:
+        yield
+    except Exception as e:
+        error = type(e).__name__
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        duration = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(duration)
+        if active is not None:
+            active.add_span(stage, started, duration, error, **attributes)
+
+
+def timed(stage: str):
+    """Decorator form of span for functions and coroutine functions."""
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(stage):
+                    return await func(*args, **kwargs)
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def record(stage: str, started: float, duration: float = None, trace: Optional[Trace] = None, **attributes):
+    """
+    Record a stage that began at ``started`` (time.perf_counter()).
+
+    Args:
+        stage: Stage name, used as the metric label
+        started: Start of the stage
+        duration: Length of the stage in seconds; defaults to until now
+        trace: Trace to add the span to; defaults to the current trace.
+            Pass it explicitly from async generators, which may resume
+            outside the context that activated it.
+        attributes: Extra fields stored on the trace span
+    """
+    if duration is None:
+        duration = time.perf_counter() - started
+    STAGE_SECONDS.labels(stage).observe(duration)
+    active = trace if trace is not None else _current_trace.get()
+    if active is not None:
+        active.add_span(stage, started, duration, **attributes)
+
+
+def count_cache(cache: str, hits: int, misses: int):
+    if hits:
+        CACHE_LOOKUPS.labels(cache, "hit").inc(hits)
+    if misses:
+        CACHE_LOOKUPS.labels(cache, "miss").inc(misses)
+
+
+def track_queue(name: str, depth: Callable[[], int]):
+    """Report a queue's current depth on every scrape."""
+    QUEUE_DEPTH.labels(name).set_function(depth)
+
+
+def recent_traces(limit: int = 50) -> List[Dict[str, Any]]:
+    """Summaries of the most recent finished traces, newest first (at least one if any exist)."""
+    with _recent_lock:
+        # [-0:] would be the whole list
+        traces = list(_recent_traces)[-max(1, limit):]
+    return [
+        {
+            "id": t.id,
+            "name": t.name,
+            "started_at": t.started_at,
+            "duration_ms": round(t.duration * 1000, 3),
+            "stages_ms": t.breakdown()
+        }
+        for t in reversed(traces)
+    ]
+
+
+def get_trace(trace_id: str) -> Optional[Dict[str, Any]]:
+    with _recent_lock:
+        for t in _recent_traces:
+            if t.id == trace_id:
+                return t.to_dict()
+    return None
+
+
+def render_metrics():
+    """Prometheus exposition of all metrics, with its content type."""
+    return generate_latest(), CONTENT_TYPE_LATEST
@@ -1,17 +1,38 @@
+import contextvars
+import hashlib
 import logging
+import threading
 import chromadb
+import numpy as np
 from chromadb.config import Settings
-from typing import List, Dict, Any
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import List, Dict, Any, Optional
 import config
+from services.query_batcher import QueryEmbeddingBatcher
+from services.lexical_index import BM25Index, reciprocal_rank_fusion
+from services.collection_manager import CollectionManager
+from services import telemetry
+from services.vector_store import VectorStore, ChromaVectorStore, NumpyVectorStore, quantization_report
 
 logger = logging.getLogger(__name__)
 
 class VectorDBService:
-    """Service for managing vector database operations with Chroma."""
+    """Service for managing vector database operations.
+    
+    Each collection is held by a VectorStore backend: Chroma (HNSW) or an
+    exact NumPy store for small collections, chosen by config.VECTOR_BACKEND.
+    """
     
     def __init__(self, embedding_service):
         self.embedding_service = embedding_service
         
+        # Concurrent queries share encode calls through the micro-batcher
+        self.query_batcher = None
+        if config.QUERY_BATCHING_ENABLED:
+            self.query_batcher = QueryEmbeddingBatcher(embedding_service)
+        
         # Initialize Chroma client
         self.client = chromadb.PersistentClient(
             path=str(config.VECTOR_DB_PATH),
@@ -19,7 +40,75 @@ class VectorDBService:
         )
         logger.info(f"Initialized Chroma DB at {config.VECTOR_DB_PATH}")
         
-    def create_collection(self, collection_name: str, overwrite: bool = False):
+        # Open stores by collection name, whichever backend holds them
+        self.stores: Dict[str, VectorStore] = {}
+        self._stores_lock = threading.RLock()
+        self._document_locks: Dict[tuple, threading.Lock] = {}
+        # Held while collections are created, dropped or promoted; compaction
+        # takes it so it never mistakes a collection being created for an orphan
+        self.write_lock = self._stores_lock
+        
+        # Last-access tracking, eviction and compaction
+        self.lifecycle = CollectionManager(self)
+        
+        # BM25 indexes built at ingest time, stored next to each collection;
+        # each has its own lock, so searches only wait for writers of their index
+        self.lexical_indexes = {}
+        self._lexical_locks: Dict[str, threading.RLock] = {}
+        self._lexical_lock = threading.Lock()
+        self._search_executor = ThreadPoolExecutor(
+            max_workers=config.HYBRID_SEARCH_THREADS, thread_name_prefix="hybrid-search"
+        )
+        
+    def _exact_path(self, collection_name: str):
+        return config.EXACT_INDEX_DIR / collection_name
+        
+    def _choose_backend(self, collection_name: str) -> str:
+        """Pick a backend for a new collection."""
+        if config.VECTOR_BACKEND != "auto":
+            return config.VECTOR_BACKEND
+        # Per-document collections are small; the shared corpus grows without bound,
+        # so it goes to Chroma unless compressed storage keeps exact scans affordable
+        if collection_name == config.CORPUS_COLLECTION and config.VECTOR_STORAGE_DTYPE == "float32":
+            return "chroma"
+        return "numpy"
+        
+    def get_store(self, collection_name: str) -> VectorStore:
+        """
+        Open an existing collection.
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            VectorStore: The collection's store
+            
+        Raises:
+            ValueError: If the collection does not exist
+        """
+        with self._stores_lock:
+            store = self.stores.get(collection_name)
+            if store is not None:
+                return store
+            path = self._exact_path(collection_name)
+            if NumpyVectorStore.exists(path):
+                store = NumpyVectorStore.load(collection_name, path)
+            else:
+                # Raises ValueError for unknown collections
+                store = ChromaVectorStore(self.client.get_collection(collection_name))
+            self.stores[collection_name] = store
+            return store
+            
+    def list_collection_names(self) -> List[str]:
+        """Names of all collections across backends."""
+        names = {c.name for c in self.client.list_collections()}
+        names.update(
+            p.name for p in config.EXACT_INDEX_DIR.iterdir()
+            if p.is_dir() and NumpyVectorStore.exists(p)
+        )
+        return sorted(names)
+        
+    def create_collection(self, collection_name: str, overwrite: bool = False) -> VectorStore:
         """
         Create a new collection or get an existing one.
         
@@ -28,57 +117,295 @@ class VectorDBService:
             overwrite: If True, delete existing collection with the same name
             
         Returns:
-            chromadb.Collection: The collection object
+            VectorStore: The collection's store
         """
-        try:
+        with self._stores_lock:
             if overwrite:
+                self._drop_store(collection_name)
+                self._delete_lexical_index(collection_name)
+            else:
                 try:
-                    self.client.delete_collection(collection_name)
-                    logger.info(f"Deleted existing collection: {collection_name}")
+                    return self.get_store(collection_name)
                 except Exception:
-                    # Collection might not exist, which is fine
                     pass
                     
-            collection = self.client.create_collection(
-                name=collection_name,
-                metadata={"hnsw:space": "cosine"}  # Use cosine similarity
+            if self._choose_backend(collection_name) == "numpy":
+                store = NumpyVectorStore(collection_name, self._exact_path(collection_name))
+            else:
+                store = ChromaVectorStore(self.client.get_or_create_collection(
+                    name=collection_name,
+                    metadata={"hnsw:space": "cosine"}  # Use cosine similarity
+                ))
+            self.stores[collection_name] = store
+            logger.info(f"Created {store.backend} collection: {collection_name}")
+            self.lifecycle.register(collection_name)
+            return store
+            
+    def _drop_store(self, collection_name: str) -> bool:
+        """Delete a collection from every backend; True if anything was removed."""
+        with self._stores_lock:
+            self.stores.pop(collection_name, None)
+            removed = False
+            path = self._exact_path(collection_name)
+            if path.exists():
+                NumpyVectorStore(collection_name, path).destroy()
+                removed = True
+            try:
+                self.client.delete_collection(collection_name)
+                removed = True
+            except Exception:
+                # Collection might not exist, which is fine
+                pass
+            return removed
+            
+    def unload_collection(self, collection_name: str):
+        """
+        Drop a collection's open store, BM25 index and locks from memory.
+        
+        Nothing is deleted on disk; the next access loads the collection again.
+        
+        Args:
+            collection_name: Name of the collection
+        """
+        # Let an in-flight lexical write finish before its index is dropped
+        with self._lexical_index_lock(collection_name):
+            self.lexical_indexes.pop(collection_name, None)
+        with self._lexical_lock:
+            self._lexical_locks.pop(collection_name, None)
+        with self._stores_lock:
+            self.stores.pop(collection_name, None)
+            for key in [key for key in self._document_locks if key[0] == collection_name]:
+                del self._document_locks[key]
+            
+    def delete_collection(self, collection_name: str) -> bool:
+        """
+        Delete a collection and its lexical index.
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            bool: True if the collection existed and was deleted
+        """
+        self._delete_lexical_index(collection_name)
+        self.lifecycle.forget(collection_name)
+        removed = self._drop_store(collection_name)
+        self.unload_collection(collection_name)
+        if removed:
+            logger.info(f"Deleted collection: {collection_name}")
+            return True
+        logger.warning(f"Could not delete collection {collection_name}: not found")
+        return False
+        
+    def _promote(self, store: NumpyVectorStore) -> VectorStore:
+        """Move an exact store that outgrew config.EXACT_BACKEND_MAX_VECTORS into Chroma."""
+        with self._stores_lock:
+            collection = self.client.get_or_create_collection(
+                name=store.name,
+                metadata={"hnsw:space": "cosine"}
             )
-            logger.info(f"Created collection: {collection_name}")
-            return collection
-        except Exception as e:
-            # Collection might already exist
-            logger.info(f"Getting existing collection: {collection_name}")
-            return self.client.get_collection(collection_name)
+            chroma_store = ChromaVectorStore(collection)
+            for ids, vectors, texts, metadatas in store.iter_rows(batch_size=1000):
+                chroma_store.add(ids, vectors, texts, metadatas)
+            self.stores[store.name] = chroma_store
+            store.destroy()
+        logger.info(f"Moved {store.name} ({store.count()} vectors) from the exact backend to Chroma")
+        return chroma_store
+        
+    def delete_document(self, doc_id: str, collection_name: str = None) -> int:
+        """
+        Delete one document's chunks from a shared collection.
+        
+        Args:
+            doc_id: Document ID the chunks were added with
+            collection_name: Name of the collection (defaults to the corpus)
+            
+        Returns:
+            int: Number of chunks deleted
+        """
+        collection_name = collection_name or config.CORPUS_COLLECTION
+        try:
+            store = self.get_store(collection_name)
+        except Exception:
+            return 0
+            
+        with self._document_lock(collection_name, doc_id):
+            ids = [r["id"] for r in store.get(where={"doc_id": doc_id})]
+            if ids:
+                store.delete(ids)
+                self._update_lexical_index(collection_name, [], [], removed=ids)
+        with self._stores_lock:
+            self._document_locks.pop((collection_name, doc_id), None)
+            
+        if not ids:
+            return 0
+        if not store.count():
+            # Nothing left to search; don't keep an empty collection in memory
+            self.unload_collection(collection_name)
+                
+        logger.info(f"Deleted {len(ids)} chunks of document {doc_id} from {collection_name}")
+        return len(ids)
+        
+    def document_exists(self, doc_id: str, collection_name: str = None) -> bool:
+        """
+        Check whether a document has chunks in a shared collection.
+        
+        Args:
+            doc_id: Document ID
+            collection_name: Name of the collection (defaults to the corpus)
+            
+        Returns:
+            bool: True if the document is indexed
+        """
+        try:
+            store = self.get_store(collection_name or config.CORPUS_COLLECTION)
+            return bool(store.get(where={"doc_id": doc_id}, limit=1))
+        except Exception:
+            return False
+            
+    def collection_exists(self, collection_name: str) -> bool:
+        """
+        Check whether a collection exists.
+        
+        Args:
+            collection_name: Name of the collection
+            
+        Returns:
+            bool: True if the collection exists
+        """
+        try:
+            self.get_store(collection_name)
+            return True
+        except Exception:
+            return False
+            
+    def _lexical_index_path(self, collection_name: str):
+        return config.LEXICAL_INDEX_DIR / f"{collection_name}.json"
+        
+    def _lexical_index_lock(self, collection_name: str) -> threading.RLock:
+        """Lock guarding one collection's BM25 index against concurrent changes."""
+        with self._lexical_lock:
+            return self._lexical_locks.setdefault(collection_name, threading.RLock())
             
-    def add_documents(self, collection_name: str, documents: List[Dict[str, Any]]):
+    def _get_lexical_index(self, collection_name: str) -> Optional[BM25Index]:
+        """Load a collection's BM25 index, or None if it has none."""
+        with self._lexical_index_lock(collection_name):
+            index = self.lexical_indexes.get(collection_name)
+            if index is None:
+                path = self._lexical_index_path(collection_name)
+                if not BM25Index.exists(path):
+                    return None
+                index = BM25Index.load(path)
+                self.lexical_indexes[collection_name] = index
+            return index
+            
+    def _delete_lexical_index(self, collection_name: str):
+        with self._lexical_index_lock(collection_name):
+            self.lexical_indexes.pop(collection_name, None)
+            path = self._lexical_index_path(collection_name)
+            path.unlink(missing_ok=True)
+            Path(BM25Index.log_path(path)).unlink(missing_ok=True)
+            
+    def _update_lexical_index(self, collection_name: str, ids: List[str], texts: List[str],
+                              removed: List[str] = None):
+        """
+        Add (and optionally remove) chunks in a collection's BM25 index and persist it.
+        
+        Only the change itself is appended to the index's log; the full
+        snapshot is rewritten once the log outgrows it, so repeated adds to
+        the shared corpus stay linear in the corpus size.
+        """
+        with self._lexical_index_lock(collection_name):
+            # Shared collections get concurrent writers; load and update atomically
+            index = self._get_lexical_index(collection_name)
+            if index is None:
+                if not ids:
+                    return
+                index = BM25Index()
+            if removed:
+                index.remove(removed)
+            index.add(ids, texts)
+            self.lexical_indexes[collection_name] = index
+            
+            path = self._lexical_index_path(collection_name)
+            if not path.exists() or BM25Index.needs_snapshot(path):
+                index.save(path)
+            else:
+                BM25Index.append_changes(path, ids, texts, removed)
+            
+    @staticmethod
+    def content_hash(text: str) -> str:
+        return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        
+    def _prepare_chunks(self, documents: List[Dict[str, Any]], doc_id: str = None):
+        """
+        Derive IDs and stored metadata for a document's chunks.
+        
+        IDs follow chunk content rather than position, so a chunk that is
+        unchanged in a new version of the document keeps its ID; repeated
+        texts get an occurrence suffix.
+        
+        Returns:
+            tuple: (texts, ids, metadatas), aligned with documents
+        """
+        texts = [doc["text"] for doc in documents]
+        ids, metadatas = [], []
+        occurrences = Counter()
+        for doc, text in zip(documents, texts):
+            digest = self.content_hash(text)
+            occurrences[digest] += 1
+            chunk_key = f"chunk_{digest}" if occurrences[digest] == 1 else f"chunk_{digest}_{occurrences[digest] - 1}"
+            metadata = dict(doc["metadata"], content_hash=digest)
+            if doc_id is None:
+                ids.append(chunk_key)
+            else:
+                # IDs must be unique across every document in the collection
+                ids.append(f"{doc_id}:{chunk_key}")
+                metadata["doc_id"] = doc_id
+            metadatas.append(metadata)
+        return texts, ids, metadatas
+        
+    def _promote_if_full(self, store: VectorStore) -> VectorStore:
+        """Move a float32 exact store that outgrew its capacity to Chroma; returns the store now in use.
+
+        Compressed stores stay on the NumPy backend, where their storage dtype applies.
+        """
+        if (config.VECTOR_BACKEND == "auto" and isinstance(store, NumpyVectorStore)
+                and store.dtype == "float32" and store.count() > config.EXACT_BACKEND_MAX_VECTORS):
+            return self._promote(store)
+        return store
+            
+    @telemetry.timed("index")
+    def add_documents(self, collection_name: str, documents: List[Dict[str, Any]], embeddings=None,
+                      doc_id: str = None):
         """
         Add documents to a collection.
         
         Args:
             collection_name: Name of the collection
             documents: List of document chunks with text and metadata
+            embeddings: Optional precomputed float32 array aligned with
+                documents; created here if not given
+            doc_id: Document the chunks belong to, for shared collections;
+                stored in each chunk's metadata and prefixed to its ID
             
         Returns:
             bool: Success status
         """
         try:
-            collection = self.client.get_collection(collection_name)
+            store = self.get_store(collection_name)
             
             # Prepare data for batch insertion
-            texts = [doc["text"] for doc in documents]
-            ids = [f"chunk_{doc['metadata']['chunk_id']}" for doc in documents]
-            metadatas = [doc["metadata"] for doc in documents]
-            
-            # Create embeddings
-            embeddings = self.embedding_service.create_embeddings(texts)
-            
-            # Add to collection
-            collection.add(
-                embeddings=embeddings,
-                documents=texts,
-                ids=ids,
-                metadatas=metadatas
-            )
+            texts, ids, metadatas = self._prepare_chunks(documents, doc_id)
+            
+            # Create embeddings (float32 array aligned with ids)
+            if embeddings is None:
+                embeddings = self.embedding_service.create_embeddings(texts)
+            
+            store.add(ids, embeddings, texts, metadatas)
+            self._promote_if_full(store)
+            
+            self._update_lexical_index(collection_name, ids, texts)
             
             logger.info(f"Added {len(documents)} documents to collection {collection_name}")
             return True
@@ -86,43 +413,228 @@ class VectorDBService:
             logger.error(f"Error adding documents to collection: {e}")
             return False
             
-    def query_collection(self, collection_name: str, query_text: str, n_results: int = 5):
+    def _document_lock(self, collection_name: str, doc_id: str = None) -> threading.Lock:
+        """Lock serializing in-place updates of one document (or single-document collection)."""
+        with self._stores_lock:
+            return self._document_locks.setdefault((collection_name, doc_id), threading.Lock())
+            
+    @telemetry.timed("index")
+    def sync_document(self, collection_name: str, documents: List[Dict[str, Any]],
+                      doc_id: str = None, embeddings=None) -> Optional[Dict[str, int]]:
+        """
+        Replace a document's stored chunks with a new version, touching only what changed.
+        
+        Chunks whose content is already stored keep their vectors (their
+        metadata is refreshed if offsets or pages moved); only new chunks
+        are embedded and added, and chunks no longer present are deleted.
+        New chunks are stored before anything old is touched and stale ones
+        are deleted last, so a failure leaves the previous version intact.
+        
+        Args:
+            collection_name: Name of the collection holding the previous version
+            documents: Chunks of the new version with text and metadata
+            doc_id: Document ID in a shared collection; None when the
+                collection holds only this document
+            embeddings: Optional precomputed embeddings aligned with
+                documents; when omitted, only new chunks are embedded
+            
+        Returns:
+            Optional[Dict]: Counts of chunks reused, updated, added and
+            removed, or None if the update failed
+        """
+        with self._document_lock(collection_name, doc_id):
+            added_ids = []
+            try:
+                store = self.get_store(collection_name)
+                texts, ids, metadatas = self._prepare_chunks(documents, doc_id)
+                
+                where = {"doc_id": doc_id} if doc_id is not None else None
+                stored = {entry["id"]: entry["metadata"] for entry in store.get(where=where)}
+                
+                wanted = set(ids)
+                removed = [chunk_id for chunk_id in stored if chunk_id not in wanted]
+                added = [i for i, chunk_id in enumerate(ids) if chunk_id not in stored]
+                updated = [
+                    i for i, chunk_id in enumerate(ids)
+                    if chunk_id in stored and stored[chunk_id] != metadatas[i]
+                ]
+                
+                if added:
+                    if embeddings is not None:
+                        added_embeddings = np.asarray(embeddings)[added]
+                    else:
+                        added_embeddings = self.embedding_service.create_embeddings([texts[i] for i in added])
+                    added_ids = [ids[i] for i in added]
+                    store.add(added_ids, added_embeddings, [texts[i] for i in added], [metadatas[i] for i in added])
+                    store = self._promote_if_full(store)
+                store.update_metadata([ids[i] for i in updated], [metadatas[i] for i in updated])
+                
+                if added or removed:
+                    self._update_lexical_index(
+                        collection_name, added_ids, [texts[i] for i in added], removed
+                    )
+                    
+                # Only now is the new version complete; drop what it no longer has
+                store.delete(removed)
+            except Exception as e:
+                logger.error(f"Error updating {doc_id or collection_name} in {collection_name}: {e}")
+                self._rollback_added(collection_name, added_ids)
+                return None
+                
+        stats = {
+            "chunks": len(ids),
+            "reused": len(ids) - len(added),
+            "updated": len(updated),
+            "added": len(added),
+            "removed": len(removed)
+        }
+        logger.info(f"Synced {doc_id or collection_name} in {collection_name}: {stats}")
+        return stats
+        
+    def _rollback_added(self, collection_name: str, added_ids: List[str]):
+        """Remove chunks staged by a failed sync_document."""
+        if not added_ids:
+            return
+        try:
+            self.get_store(collection_name).delete(added_ids)
+            self._update_lexical_index(collection_name, [], [], removed=added_ids)
+        except Exception as e:
+            logger.error(f"Could not roll back {len(added_ids)} staged chunks in {collection_name}: {e}")
+            
+    @telemetry.timed("retrieve")
+    def query_collection(self, collection_name: str, query_text: str, n_results: int = 5,
+                         hybrid: bool = None, doc_ids: Optional[List[str]] = None):
         """
         Query the collection for relevant documents.
         
+        In hybrid mode, BM25 and vector search run in parallel and their
+        rankings are merged with weighted reciprocal rank fusion. Collections
+        without a lexical index fall back to vector search.
+        
         Args:
             collection_name: Name of the collection
             query_text: The query text
             n_results: Number of results to return
+            hybrid: Use hybrid retrieval (defaults to config.HYBRID_SEARCH_ENABLED)
+            doc_ids: Restrict a shared collection to these documents; None
+                searches the whole collection
             
         Returns:
             List[Dict]: List of matching documents with their metadata
         """
+        hybrid = config.HYBRID_SEARCH_ENABLED if hybrid is None else hybrid
+        
+        where, id_filter = None, None
+        if doc_ids is not None:
+            if not doc_ids:
+                return []
+            doc_ids = list(doc_ids)
+            where = {"doc_id": doc_ids[0]} if len(doc_ids) == 1 else {"doc_id": {"$in": doc_ids}}
+            allowed = set(doc_ids)
+            id_filter = lambda chunk_id: chunk_id.rpartition(":")[0] in allowed
+        
         try:
-            collection = self.client.get_collection(collection_name)
+            store = self.get_store(collection_name)
+            self.lifecycle.touch(collection_name)
+            lexical_index = self._get_lexical_index(collection_name) if hybrid else None
             
-            # Create query embedding
-            query_embedding = self.embedding_service.create_embedding(query_text)
-            
-            # Query the collection
-            results = collection.query(
-                query_embeddings=[query_embedding],
-                n_results=n_results,
-                include=["documents", "metadatas", "distances"]
-            )
-            
-            # Format results
-            formatted_results = []
-            if results and "documents" in results and results["documents"]:
-                for i, doc in enumerate(results["documents"][0]):
-                    formatted_results.append({
-                        "text": doc,
-                        "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
-                        "distance": results["distances"][0][i] if results["distances"] else 1.0
-                    })
+            if lexical_index is None:
+                formatted_results = self._vector_search(store, query_text, n_results, where)
+            else:
+                formatted_results = self._hybrid_search(
+                    store, collection_name, lexical_index, query_text, n_results, where, id_filter
+                )
                     
             logger.info(f"Found {len(formatted_results)} results for query: {query_text[:50]}...")
             return formatted_results
         except Exception as e:
             logger.error(f"Error querying collection: {e}")
             return []
+            
+    def _vector_search(self, store: VectorStore, query_text: str, n_results: int,
+                       where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Dense retrieval against a collection's store."""
+        # Create query embedding
+        if self.query_batcher is not None:
+            query_embedding = self.query_batcher.embed(query_text)
+        else:
+            query_embedding = self.embedding_service.create_embedding(query_text)
+        
+        with telemetry.span("vector_search", backend=store.backend):
+            return store.query(query_embedding, n_results, where)
+        
+    @telemetry.timed("lexical_search")
+    def _lexical_search(self, collection_name: str, lexical_index: BM25Index, query_text: str,
+                        n_results: int, id_filter=None):
+        # Writers mutate the index in place; don't score against a half-applied change
+        with self._lexical_index_lock(collection_name):
+            return lexical_index.search(query_text, n_results, id_filter)
+        
+    def _hybrid_search(self, store: VectorStore, collection_name: str, lexical_index: BM25Index,
+                       query_text: str, n_results: int, where: Optional[Dict[str, Any]] = None,
+                       id_filter=None) -> List[Dict[str, Any]]:
+        """Run BM25 and vector search in parallel and fuse them with RRF."""
+        # Each branch gets a copy of the caller's context so its spans join the trace
+        vector_future = self._search_executor.submit(
+            contextvars.copy_context().run,
+            self._vector_search, store, query_text, config.HYBRID_VECTOR_CANDIDATES, where
+        )
+        lexical_future = self._search_executor.submit(
+            contextvars.copy_context().run,
+            self._lexical_search, collection_name, lexical_index, query_text,
+            config.HYBRID_LEXICAL_CANDIDATES, id_filter
+        )
+        vector_results = vector_future.result()
+        lexical_results = lexical_future.result()
+        
+        fused = reciprocal_rank_fusion([
+            ([r["id"] for r in vector_results], config.HYBRID_VECTOR_WEIGHT),
+            ([chunk_id for chunk_id, _ in lexical_results], config.HYBRID_LEXICAL_WEIGHT)
+        ])[:n_results]
+        
+        by_id = {r["id"]: r for r in vector_results}
+        
+        # Lexical-only hits still need their text and metadata from the store
+        missing = [chunk_id for chunk_id, _ in fused if chunk_id not in by_id]
+        if missing:
+            for fetched in store.get(ids=missing):
+                by_id[fetched["id"]] = dict(fetched, distance=1.0)
+                
+        return [
+            dict(by_id[chunk_id], score=score)
+            for chunk_id, score in fused
+            if chunk_id in by_id
+        ]
+        
+    def quantization_report(self, collection_name: str, query_texts: Optional[List[str]] = None,
+                            k: int = 10, n_queries: int = 100) -> Dict[str, Any]:
+        """
+        Measure recall@k and latency of float16/int8 storage against float32 on a collection.
+        
+        Args:
+            collection_name: Name of the collection
+            query_texts: Queries to embed; if not given, perturbed copies of
+                sampled stored vectors are used
+            k: Results per query
+            n_queries: Number of sampled queries when query_texts is not given
+            
+        Returns:
+            Dict: Report from vector_store.quantization_report
+        """
+        ids, vectors = self.get_store(collection_name).all_vectors()
+        if not ids:
+            return {"vectors": 0, "k": k, "queries": 0, "results": []}
+            
+        if query_texts:
+            queries = self.embedding_service.create_embeddings(query_texts)
+        else:
+            rng = np.random.default_rng(0)
+            sample = rng.choice(len(ids), size=min(n_queries, len(ids)), replace=False)
+            norms = np.linalg.norm(vectors[sample], axis=1, keepdims=True)
+            # Noise of about the vectors' own magnitude moves queries off the stored points
+            noise = rng.normal(scale=1.0 / np.sqrt(vectors.shape[1]), size=(len(sample), vectors.shape[1]))
+            queries = (vectors[sample] / np.maximum(norms, 1e-12) + noise).astype(np.float32)
+            
+        report = quantization_report(ids, vectors, queries, k=k)
+        report["collection"] = collection_name
+        return report
@@ -0,0 +1,779 @@
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from array import array
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Set, Tuple
+import numpy as np
+import config
+
+logger = logging.getLogger(__name__)
+
+
+class VectorStore(ABC):
+    """Storage and nearest-neighbour search for the chunks of one collection.
+
+    Results are dicts with id, text, metadata and, for queries, a cosine
+    distance (0 = identical direction).
+    """
+
+    name: str
+    path: Optional[Path] = None
+
+    @abstractmethod
+    def count(self) -> int:
+        """Number of stored vectors."""
+
+    @abstractmethod
+    def add(self, ids: List[str], embeddings, documents: List[str], metadatas: List[Dict[str, Any]]):
+        """Store vectors with their texts and metadata."""
+
+    @abstractmethod
+    def query(self, embedding, n_results: int, where: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """Return the n_results nearest vectors, closest first."""
+
+    @abstractmethod
+    def get(self, ids: Optional[List[str]] = None, where: Optional[Dict[str, Any]] = None,
+            limit: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Fetch stored entries by ID and/or metadata filter."""
+
+    @abstractmethod
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]):
+        """Replace the metadata of existing entries, keeping their vectors."""
+
+    @abstractmethod
+    def delete(self, ids: List[str]):
+        """Remove entries by ID."""
+
+    @abstractmethod
+    def all_vectors(self) -> Tuple[List[str], np.ndarray]:
+        """All IDs with their float32 vectors, row-aligned."""
+
+
+class ChromaVectorStore(VectorStore):
+    """Approximate (HNSW) search backed by a Chroma collection."""
+
+    backend = "chroma"
+
+    def __init__(self, collection):
+        self.collection = collection
+        self.name = collection.name
+
+    def count(self) -> int:
+        return self.collection.count()
+
+    def add(self, ids, embeddings, documents, metadatas):
+        # Chroma's API only accepts nested lists
+        self.collection.add(
+            embeddings=np.asarray(embeddings, dtype=np.float32).tolist(),
+            documents=documents,
+            ids=ids,
+            metadatas=metadatas
+        )
+
+    def query(self, embedding, n_results, where=None):
+        results = self.collection.query(
+            query_embeddings=[np.asarray(embedding, dtype=np.float32).tolist()],
+            n_results=n_results,
+            where=where,
+            include=["documents", "metadatas", "distances"]
+        )
+
+        formatted_results = []
+        if results and "documents" in results and results["documents"]:
+            for i, doc in enumerate(results["documents"][0]):
+                formatted_results.append({
+                    "id": results["ids"][0][i],
+                    "text": doc,
+                    "metadata": results["metadatas"][0][i] if results["metadatas"] else {},
+                    "distance": results["distances"][0][i] if results["distances"] else 1.0
+                })
+        return formatted_results
+
+    def get(self, ids=None, where=None, limit=None):
+        fetched = self.collection.get(ids=ids, where=where, limit=limit, include=["documents", "metadatas"])
+        return [
+            {
+                "id": chunk_id,
+                "text": fetched["documents"][i],
+                "metadata": fetched["metadatas"][i] if fetched["metadatas"] else {}
+            }
+            for i, chunk_id in enumerate(fetched["ids"])
+        ]
+
+    def update_metadata(self, ids, metadatas):
+        if ids:
+            self.collection.update(ids=ids, metadatas=metadatas)
+
+    def delete(self, ids):
+        if ids:
+            self.collection.delete(ids=ids)
+
+    def all_vectors(self):
+        fetched = self.collection.get(include=["embeddings"])
+        return fetched["ids"], np.asarray(fetched["embeddings"], dtype=np.float32)
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate the subset of Chroma's where syntax the service uses: equality, $eq and $in."""
+    if not where:
+        return True
+    for key, condition in where.items():
+        value = metadata.get(key)
+        if isinstance(condition, dict):
+            for op, operand in condition.items():
+                if op == "$eq":
+                    if value != operand:
+                        return False
+                elif op == "$in":
+                    if value not in operand:
+                        return False
+                else:
+                    raise ValueError(f"Unsupported filter operator: {op}")
+        elif value != condition:
+            return False
+    return True
+
+
+def quantize(vectors: np.ndarray, dtype: str,
+             scales: Optional[np.ndarray] = None) -> Tuple[Optional[np.ndarray], Optional[np.ndarray]]:
+    """
+    Compress float32 vectors for scanning.
+
+    Args:
+        vectors: Float32 matrix, one vector per row
+        dtype: "float32" (no compression), "float16" or "int8"
+        scales: Existing int8 scales to encode with; fitted to vectors when None
+
+    Returns:
+        Tuple: The compressed matrix (None for float32) and, for int8, the
+        per-dimension scales that map codes back to floats
+    """
+    if dtype == "float32":
+        return None, None
+    if dtype == "float16":
+        return np.ascontiguousarray(vectors, dtype=np.float16), None
+    if dtype == "int8":
+        if scales is None:
+            # Symmetric scalar quantization with one scale per dimension
+            scales = np.abs(vectors).max(axis=0) / 127.0 if len(vectors) else np.ones(vectors.shape[1])
+            scales = np.maximum(scales, 1e-12).astype(np.float32)
+        # Values beyond fixed scales saturate; rescoring corrects the ranking
+        codes = np.clip(np.rint(vectors / scales), -127, 127).astype(np.int8)
+        return codes, scales
+    raise ValueError(f"Unsupported storage dtype: {dtype}")
+
+
+CODE_DTYPES = {"float32": None, "float16": np.float16, "int8": np.int8}
+
+
+class NumpyVectorStore(VectorStore):
+    """Exact search over a contiguous float32 matrix of normalized vectors.
+
+    Queries are one matrix-vector product plus ``argpartition``, so results
+    are exact and deterministic. With a float16 or int8 storage dtype,
+    queries scan a compressed copy of the matrix and rescore only the best
+    candidates against the float32 rows.
+
+    Persisted stores are append-only. Float32 rows, compressed rows and one
+    JSON line per row (ID, text, metadata) are appended to per-generation
+    files; metadata updates and deletions append further lines, so a write
+    costs the size of the change, not of the store. Both matrices are
+    memory-mapped, and texts and metadata are read from disk only for the
+    rows a call returns: the heap holds IDs, record offsets and a
+    doc_id -> rows index. Once deleted rows make up COMPACT_RATIO of the
+    store, the live rows are rewritten into a new generation, which
+    ``manifest.json`` switches to atomically.
+
+    int8 scales are refitted while the store is below CALIBRATION_ROWS
+    rows and fixed after that, so appends never re-encode existing rows;
+    compaction refits them.
+    """
+
+    backend = "numpy"
+
+    MANIFEST_FILE = "manifest.json"
+    # Single-snapshot layout of earlier versions, migrated on load
+    LEGACY_FILES = ("records.json", "vectors.npy", "quantized.npy", "scales.npy")
+
+    # Rows converted to float32 at a time while scanning compressed vectors
+    SCAN_BLOCK = 65536
+    # int8 scales are refitted on each write until the store has this many rows
+    CALIBRATION_ROWS = 4096
+    # Share of deleted rows that triggers a compaction
+    COMPACT_RATIO = 0.25
+
+    _GENERATION_FILE = re.compile(r"^(vectors|codes|records)\.(\d+)\.")
+
+    def __init__(self, name: str, path=None, dim: int = None, dtype: str = None,
+                 rescore_factor: int = None):
+        self.name = name
+        self.path = Path(path) if path is not None else None
+        self.dtype = dtype or config.VECTOR_STORAGE_DTYPE
+        if self.dtype not in CODE_DTYPES:
+            raise ValueError(f"Unsupported storage dtype: {self.dtype}")
+        self.rescore_factor = config.QUANTIZED_RESCORE_FACTOR if rescore_factor is None else rescore_factor
+        self.dim = dim
+        self.generation = 0
+        self.vectors = np.zeros((0, dim or 0), dtype=np.float32)
+        self.quantized: Optional[np.ndarray] = None
+        self.scales: Optional[np.ndarray] = None
+        # Per row, deleted rows included until the next compaction
+        self.ids: List[str] = []
+        self._offsets = array("q")
+        self._row_docs: List[Optional[str]] = []
+        # Live rows only
+        self._positions: Dict[str, int] = {}
+        self._doc_rows: Dict[str, Set[int]] = {}
+        self._deleted: Set[int] = set()
+        # Record lines of a store without a path
+        self._lines: List[str] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, name: str, path, dtype: str = None) -> "NumpyVectorStore":
+        """Open a store written by an earlier session, memory-mapping its vectors."""
+        store = cls(name, path, dtype=dtype)
+        manifest_path = store.path / cls.MANIFEST_FILE
+        if not manifest_path.exists():
+            return cls._migrate_legacy(store)
+
+        with open(manifest_path, "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        store.generation = manifest["generation"]
+        store.dim = manifest["dim"]
+        store._replay_records()
+        rows = len(store.ids)
+        store.vectors = store._map("vectors", np.float32, rows)
+
+        scales = manifest.get("scales")
+        if manifest["dtype"] != store.dtype or (store.dtype == "int8" and scales is None):
+            # Storage dtype changed since the store was written, or int8 scales were never fitted
+            store._compact()
+        elif store.dtype != "float32":
+            store.quantized = store._map("codes", CODE_DTYPES[store.dtype], rows)
+            store.scales = np.asarray(scales, dtype=np.float32) if scales is not None else None
+        store._remove_stale_files()
+        return store
+
+    @classmethod
+    def _migrate_legacy(cls, store: "NumpyVectorStore") -> "NumpyVectorStore":
+        """Convert a store written in the single-snapshot layout."""
+        with open(store.path / "records.json", "r", encoding="utf-8") as file:
+            records = json.load(file)
+        vectors = np.load(store.path / "vectors.npy", mmap_mode="r")
+        logger.info(f"Migrating vector store {store.name} ({len(records['ids'])} rows) to the append-only layout")
+        store.dim = vectors.shape[1]
+        store._write_manifest(store.generation, None)
+        store.add(records["ids"], vectors, records["documents"], records["metadatas"])
+        for filename in cls.LEGACY_FILES:
+            (store.path / filename).unlink(missing_ok=True)
+        return store
+
+    @staticmethod
+    def exists(path) -> bool:
+        path = Path(path)
+        return (path / NumpyVectorStore.MANIFEST_FILE).exists() or (path / "records.json").exists()
+
+    @staticmethod
+    def _normalize(vectors: np.ndarray) -> np.ndarray:
+        norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def _file(self, kind: str, generation: int = None) -> Path:
+        suffix = {"vectors": "f32", "codes": "bin", "records": "jsonl"}[kind]
+        return self.path / f"{kind}.{self.generation if generation is None else generation}.{suffix}"
+
+    def _map(self, kind: str, dtype, rows: int) -> np.ndarray:
+        """Memory-map the first rows of a matrix file of the current generation."""
+        if rows == 0:
+            return np.zeros((0, self.dim or 0), dtype=dtype)
+        return np.memmap(self._file(kind), dtype=dtype, mode="r", shape=(rows, self.dim))
+
+    def _write_manifest(self, generation: int, scales: Optional[np.ndarray]):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path / f"{self.MANIFEST_FILE}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({
+                "generation": generation,
+                "dim": self.dim,
+                "dtype": self.dtype,
+                "scales": scales.tolist() if scales is not None else None
+            }, file)
+        os.replace(tmp_path, self.path / self.MANIFEST_FILE)
+
+    def _remove_stale_files(self):
+        """Delete files of other generations left by a compaction or a crash."""
+        for file_path in self.path.iterdir():
+            match = self._GENERATION_FILE.match(file_path.name)
+            if match and int(match.group(2)) != self.generation:
+                try:
+                    file_path.unlink()
+                except OSError:
+                    # Still mapped by a reader on platforms that lock mapped files
+                    pass
+
+    # Row bookkeeping
+
+    def _index_row(self, chunk_id: str, offset: int, doc_id: Optional[str]):
+        row = len(self.ids)
+        self.ids.append(chunk_id)
+        self._offsets.append(offset)
+        self._row_docs.append(doc_id)
+        self._positions[chunk_id] = row
+        if doc_id is not None:
+            self._doc_rows.setdefault(doc_id, set()).add(row)
+
+    def _set_doc(self, row: int, doc_id: Optional[str]):
+        self._unlink_doc(row)
+        self._row_docs[row] = doc_id
+        if doc_id is not None:
+            self._doc_rows.setdefault(doc_id, set()).add(row)
+
+    def _unlink_doc(self, row: int):
+        doc_id = self._row_docs[row]
+        rows = self._doc_rows.get(doc_id)
+        if rows is not None:
+            rows.discard(row)
+            if not rows:
+                del self._doc_rows[doc_id]
+
+    def _drop_row(self, row: int):
+        self._unlink_doc(row)
+        self._row_docs[row] = None
+        self._deleted.add(row)
+
+    def _replay_records(self):
+        """Rebuild the in-memory index from the records file, cutting off a torn last line."""
+        records_path = self._file("records")
+        if not records_path.exists():
+            return
+        offset = 0
+        with open(records_path, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                if "delete" in record:
+                    for chunk_id in record["delete"]:
+                        row = self._positions.pop(chunk_id, None)
+                        if row is not None:
+                            self._drop_row(row)
+                else:
+                    doc_id = (record.get("metadata") or {}).get("doc_id")
+                    row = record["row"]
+                    if row == len(self.ids):
+                        self._index_row(record["id"], offset, doc_id)
+                    else:
+                        self._offsets[row] = offset
+                        self._set_doc(row, doc_id)
+                offset += len(line)
+
+        if offset < records_path.stat().st_size:
+            logger.warning(f"Discarding an incomplete write at the end of {records_path}")
+            with open(records_path, "r+b") as file:
+                file.truncate(offset)
+
+    # Storage
+
+    def _append_rows(self, kind: str, matrix: np.ndarray, start_row: int):
+        """Write rows at start_row, overwriting rows a crashed write left past the committed end."""
+        file_path = self._file(kind)
+        with open(file_path, "r+b" if file_path.exists() else "wb") as file:
+            file.seek(start_row * matrix.shape[1] * matrix.itemsize)
+            file.truncate()
+            file.write(np.ascontiguousarray(matrix).tobytes())
+
+    def _append_lines(self, lines: List[str]) -> List[int]:
+        """Append record lines and return where each one starts."""
+        if self.path is None:
+            offsets = list(range(len(self._lines), len(self._lines) + len(lines)))
+            self._lines.extend(lines)
+            return offsets
+        offsets = []
+        with open(self._file("records"), "ab") as file:
+            offset = file.tell()
+            for line in lines:
+                data = (line + "\n").encode("utf-8")
+                offsets.append(offset)
+                file.write(data)
+                offset += len(data)
+        return offsets
+
+    def _iter_records(self, rows) -> Iterator[Dict[str, Any]]:
+        """Stored {row, id, text, metadata} records of the given rows."""
+        if self.path is None:
+            for row in rows:
+                yield json.loads(self._lines[self._offsets[row]])
+            return
+        if len(rows) == 0:
+            return
+        with open(self._file("records"), "rb") as file:
+            for row in rows:
+                file.seek(self._offsets[row])
+                yield json.loads(file.readline())
+
+    def _read_entries(self, rows) -> List[Dict[str, Any]]:
+        return [
+            {"id": record["id"], "text": record["text"], "metadata": record.get("metadata") or {}}
+            for record in self._iter_records(rows)
+        ]
+
+    def _live_rows(self) -> np.ndarray:
+        return np.asarray(sorted(self._positions.values()), dtype=np.int64)
+
+    def _fit_scales(self, rows: np.ndarray) -> np.ndarray:
+        """int8 scales covering the given rows, computed block by block."""
+        peak = np.zeros(self.dim or 0, dtype=np.float32)
+        for start in range(0, len(rows), self.SCAN_BLOCK):
+            block = np.asarray(self.vectors[rows[start:start + self.SCAN_BLOCK]], dtype=np.float32)
+            peak = np.maximum(peak, np.abs(block).max(axis=0))
+        return np.maximum(peak / 127.0, 1e-12).astype(np.float32)
+
+    def _compact(self):
+        """Rewrite the live rows contiguously, dropping deleted rows and refitting int8 scales."""
+        live = self._live_rows()
+        scales = self._fit_scales(live) if self.dtype == "int8" and len(live) else None
+        code_dtype = CODE_DTYPES[self.dtype]
+        generation = self.generation + 1
+
+        if self.path is None:
+            self.vectors = np.ascontiguousarray(self.vectors[live])
+            self.quantized, self.scales = quantize(self.vectors, self.dtype, scales)
+            self._lines = [self._lines[self._offsets[row]] for row in live]
+            offsets = range(len(live))
+        else:
+            self.path.mkdir(parents=True, exist_ok=True)
+            codes_path = self._file("codes", generation) if code_dtype is not None else None
+            with open(self._file("vectors", generation), "wb") as vectors_file, \
+                    (open(codes_path, "wb") if codes_path else nullcontext()) as codes_file:
+                for start in range(0, len(live), self.SCAN_BLOCK):
+                    block = np.asarray(self.vectors[live[start:start + self.SCAN_BLOCK]], dtype=np.float32)
+                    vectors_file.write(block.tobytes())
+                    if codes_file is not None:
+                        codes_file.write(quantize(block, self.dtype, scales)[0].tobytes())
+            offsets = []
+            with open(self._file("records", generation), "wb") as records_file:
+                for new_row, record in enumerate(self._iter_records(live)):
+                    record["row"] = new_row
+                    offsets.append(records_file.tell())
+                    records_file.write((json.dumps(record) + "\n").encode("utf-8"))
+
+            # The manifest switch is the commit point
+            self._write_manifest(generation, scales)
+            self.generation = generation
+            self._remove_stale_files()
+            self.vectors = self._map("vectors", np.float32, len(live))
+            self.quantized = self._map("codes", code_dtype, len(live)) if code_dtype is not None else None
+            self.scales = scales
+
+        ids = [self.ids[row] for row in live]
+        row_docs = [self._row_docs[row] for row in live]
+        self.generation = generation
+        self.ids, self._offsets, self._row_docs = [], array("q"), []
+        self._positions, self._doc_rows, self._deleted = {}, {}, set()
+        for chunk_id, offset, doc_id in zip(ids, offsets, row_docs):
+            self._index_row(chunk_id, offset, doc_id)
+
+    # VectorStore API
+
+    def count(self) -> int:
+        return len(self._positions)
+
+    def add(self, ids, embeddings, documents, metadatas):
+        if not ids:
+            return
+        vectors = self._normalize(np.asarray(embeddings, dtype=np.float32).reshape(len(ids), -1))
+        with self._lock:
+            duplicates = [chunk_id for chunk_id in ids if chunk_id in self._positions]
+            if duplicates or len(set(ids)) != len(ids):
+                raise ValueError(f"IDs already exist in {self.name}: {duplicates[:5] or ids[:5]}")
+            if self.dim is None or not self.ids:
+                self.dim = vectors.shape[1]
+            elif vectors.shape[1] != self.dim:
+                raise ValueError(f"Expected {self.dim}-dimensional vectors in {self.name}, got {vectors.shape[1]}")
+
+            start = len(self.ids)
+            # int8 scales are still being fitted: the compaction below encodes every row
+            calibrating = self.dtype == "int8" and (self.scales is None or start < self.CALIBRATION_ROWS)
+            codes = None if calibrating else quantize(vectors, self.dtype, self.scales)[0]
+            lines = [
+                json.dumps({"row": start + i, "id": chunk_id, "text": text, "metadata": metadata})
+                for i, (chunk_id, text, metadata) in enumerate(zip(ids, documents, metadatas))
+            ]
+
+            if self.path is None:
+                self.vectors = np.concatenate([self.vectors, vectors]) if start else np.ascontiguousarray(vectors)
+                if codes is not None:
+                    self.quantized = np.concatenate([self.quantized, codes]) if start else codes
+            else:
+                if start == 0:
+                    # Empty store: the manifest records the dimension
+                    self._write_manifest(self.generation, self.scales)
+                # Matrices first, records last: a row exists once its record line does
+                self._append_rows("vectors", vectors, start)
+                if codes is not None:
+                    self._append_rows("codes", codes, start)
+            offsets = self._append_lines(lines)
+            for chunk_id, offset, metadata in zip(ids, offsets, metadatas):
+                self._index_row(chunk_id, offset, (metadata or {}).get("doc_id"))
+
+            if self.path is not None:
+                # Keep resident memory flat: the page cache holds the matrices, not the heap
+                self.vectors = self._map("vectors", np.float32, len(self.ids))
+                if codes is not None:
+                    self.quantized = self._map("codes", CODE_DTYPES[self.dtype], len(self.ids))
+            if calibrating:
+                self._compact()
+
+    def _doc_filter(self, where) -> Optional[List[str]]:
+        """doc_ids selected by a filter on doc_id alone, or None for any other filter."""
+        if set(where) != {"doc_id"}:
+            return None
+        condition = where["doc_id"]
+        if not isinstance(condition, dict):
+            return [condition]
+        if set(condition) == {"$eq"}:
+            return [condition["$eq"]]
+        if set(condition) == {"$in"}:
+            return list(condition["$in"])
+        return None
+
+    def _candidates(self, where) -> Optional[np.ndarray]:
+        """Live row indices passing the filter, or None for all rows."""
+        if not where:
+            return None
+        doc_ids = self._doc_filter(where)
+        if doc_ids is not None:
+            rows = set()
+            for doc_id in doc_ids:
+                rows.update(self._doc_rows.get(doc_id, ()))
+            return np.asarray(sorted(rows), dtype=np.int64)
+        # Other filters read the stored metadata
+        live = self._live_rows()
+        return np.fromiter(
+            (row for row, record in zip(live, self._iter_records(live))
+             if matches_where(record.get("metadata") or {}, where)),
+            dtype=np.int64
+        )
+
+    def _scan(self, matrix: np.ndarray, query: np.ndarray, rows: Optional[np.ndarray]) -> np.ndarray:
+        """Dot products of query with matrix rows (all rows if rows is None)."""
+        if matrix.dtype == np.float32:
+            return matrix @ query if rows is None else matrix[rows] @ query
+
+        n = len(matrix) if rows is None else len(rows)
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.SCAN_BLOCK):
+            end = min(start + self.SCAN_BLOCK, n)
+            block = matrix[start:end] if rows is None else matrix[rows[start:end]]
+            scores[start:end] = block.astype(np.float32) @ query
+        return scores
+
+    def query(self, embedding, n_results, where=None):
+        query = self._normalize(np.asarray(embedding, dtype=np.float32).ravel())
+        while True:
+            with self._lock:
+                generation = self.generation
+                vectors, quantized, scales = self.vectors, self.quantized, self.scales
+                rows = self._candidates(where)
+                deleted = None
+                if rows is None and self._deleted:
+                    deleted = np.fromiter(self._deleted, dtype=np.int64, count=len(self._deleted))
+            if len(vectors) == 0:
+                return []
+
+            if rows is None:
+                rows = np.arange(len(vectors))
+                scan_rows = None
+            else:
+                scan_rows = rows
+
+            if quantized is None:
+                scores = self._scan(vectors, query, scan_rows)
+            else:
+                # int8 codes times per-dimension scales approximate the float32 rows
+                scan_query = query * scales if scales is not None else query
+                scores = self._scan(quantized, scan_query, scan_rows)
+            if deleted is not None:
+                scores[deleted] = -np.inf
+            live_count = len(scores) - (len(deleted) if deleted is not None else 0)
+
+            if quantized is not None and self.rescore_factor:
+                # Rescore the best candidates against the full-precision rows
+                n_candidates = min(live_count, n_results * self.rescore_factor)
+                if 0 < n_candidates < len(scores):
+                    candidates = np.argpartition(-scores, n_candidates - 1)[:n_candidates]
+                elif n_candidates > 0:
+                    candidates = np.flatnonzero(np.isfinite(scores))
+                else:
+                    candidates = np.zeros(0, dtype=np.int64)
+                # Ascending row order keeps reads from the memory-mapped file sequential
+                rows = np.sort(rows[candidates])
+                scores = self._scan(vectors, query, rows)
+
+            k = min(n_results, live_count)
+            if k <= 0:
+                return []
+            if k < len(scores):
+                top = np.argpartition(-scores, k - 1)[:k]
+            else:
+                top = np.arange(len(scores))
+            # Stable order: best score first, ties broken by insertion order
+            top = top[np.lexsort((rows[top], -scores[top]))]
+
+            with self._lock:
+                if self.generation != generation:
+                    # A compaction renumbered the rows while scanning
+                    continue
+                entries = self._read_entries(rows[top])
+            for entry, i in zip(entries, top):
+                entry["distance"] = float(1.0 - scores[i])
+            return entries
+
+    def get(self, ids=None, where=None, limit=None):
+        with self._lock:
+            if ids is not None:
+                rows = [self._positions[chunk_id] for chunk_id in ids if chunk_id in self._positions]
+            else:
+                candidates = self._candidates(where)
+                rows = self._live_rows() if candidates is None else candidates
+                where = None
+                if limit is not None:
+                    rows = rows[:limit]
+            results = []
+            for entry in self._read_entries(rows):
+                if not matches_where(entry["metadata"], where):
+                    continue
+                results.append(entry)
+                if limit is not None and len(results) >= limit:
+                    break
+            return results
+
+    def update_metadata(self, ids, metadatas):
+        if not ids:
+            return
+        with self._lock:
+            rows = [self._positions[chunk_id] for chunk_id in ids]
+            lines = [
+                json.dumps({"row": row, "id": record["id"], "text": record["text"], "metadata": metadata})
+                for row, record, metadata in zip(rows, self._iter_records(rows), metadatas)
+            ]
+            offsets = self._append_lines(lines)
+            for row, offset, metadata in zip(rows, offsets, metadatas):
+                self._offsets[row] = offset
+                self._set_doc(row, (metadata or {}).get("doc_id"))
+
+    def delete(self, ids):
+        with self._lock:
+            drop = [chunk_id for chunk_id in dict.fromkeys(ids) if chunk_id in self._positions]
+            if not drop:
+                return
+            if self.path is not None:
+                self._append_lines([json.dumps({"delete": drop})])
+            for chunk_id in drop:
+                self._drop_row(self._positions.pop(chunk_id))
+            if len(self._deleted) > self.COMPACT_RATIO * len(self.ids):
+                self._compact()
+
+    def all_vectors(self):
+        with self._lock:
+            live = self._live_rows()
+            return [self.ids[row] for row in live], np.asarray(self.vectors[live], dtype=np.float32)
+
+    def iter_rows(self, batch_size: int = 1000) -> Iterator[Tuple[List[str], np.ndarray, List[str], List[Dict[str, Any]]]]:
+        """Yield (ids, vectors, texts, metadatas) batches of the live rows.
+
+        Holds the store's lock until the iteration finishes.
+        """
+        with self._lock:
+            live = self._live_rows()
+            for start in range(0, len(live), batch_size):
+                rows = live[start:start + batch_size]
+                entries = self._read_entries(rows)
+                yield (
+                    [entry["id"] for entry in entries],
+                    np.asarray(self.vectors[rows], dtype=np.float32),
+                    [entry["text"] for entry in entries],
+                    [entry["metadata"] for entry in entries]
+                )
+
+    def index_bytes(self) -> int:
+        """Bytes scanned per query: the compressed matrix, or the float32 one."""
+        if self.quantized is not None:
+            return int(self.quantized.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+        return int(self.vectors.nbytes)
+
+    def destroy(self):
+        """Delete the store's files."""
+        if self.path is not None:
+            shutil.rmtree(self.path, ignore_errors=True)
+
+
+def quantization_report(ids: List[str], vectors: np.ndarray, queries: np.ndarray, k: int = 10,
+                        dtypes: Sequence[str] = ("float32", "float16", "int8")) -> Dict[str, Any]:
+    """
+    Compare recall@k, latency and memory of storage dtypes against exact float32 search.
+
+    Each quantized dtype is measured with and without full-precision
+    rescoring.
+
+    Args:
+        ids: Vector IDs
+        vectors: Float32 matrix aligned with ids
+        queries: Float32 query matrix, one query per row
+        k: Results per query
+        dtypes: Storage dtypes to compare
+
+    Returns:
+        Dict: Collection size, k, query count and one result row per
+        (dtype, rescore) setting
+    """
+    placeholders = [""] * len(ids)
+    metadatas = [{} for _ in ids]
+
+    def run(store):
+        results, latencies = [], []
+        for query in queries:
+            started = time.perf_counter()
+            hits = store.query(query, k)
+            latencies.append((time.perf_counter() - started) * 1000)
+            results.append({hit["id"] for hit in hits})
+        return results, np.asarray(latencies)
+
+    baseline_store = NumpyVectorStore("report-float32", dtype="float32")
+    baseline_store.add(ids, vectors, placeholders, metadatas)
+    baseline, _ = run(baseline_store)
+    baseline_bytes = baseline_store.index_bytes()
+
+    rows = []
+    for dtype in dtypes:
+        settings = [0] if dtype == "float32" else [0, config.QUANTIZED_RESCORE_FACTOR]
+        for rescore_factor in settings:
+            store = NumpyVectorStore(f"report-{dtype}", dtype=dtype, rescore_factor=rescore_factor)
+            store.add(ids, vectors, placeholders, metadatas)
+            results, latencies = run(store)
+            recall = [
+                len(found & expected) / len(expected) if expected else 1.0
+                for found, expected in zip(results, baseline)
+            ]
+            rows.append({
+                "dtype": dtype,
+                "rescore_factor": rescore_factor,
+                "recall_at_k": float(np.mean(recall)) if recall else 1.0,
+                "latency_ms_mean": float(latencies.mean()) if len(latencies) else 0.0,
+                "latency_ms_p95": float(np.percentile(latencies, 95)) if len(latencies) else 0.0,
+                "index_bytes": store.index_bytes(),
+                "compression": baseline_bytes / max(store.index_bytes(), 1)
+            })
+
+    return {"vectors": len(ids), "k": k, "queries": len(queries), "results": rows}
@@ -0,0 +1,68 @@
+import hashlib
+import sys
+from pathlib import Path
+import numpy as np
+import pytest
+
+# The app is run from the repository root and imports config and services from there
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import config
+
+
+class FakeEmbeddingService:
+    """Deterministic hashed bag-of-words vectors; no model download."""
+
+    dimensions = 32
+
+    def __init__(self):
+        self.calls = []
+
+    def create_embeddings(self, texts):
+        self.calls.append(list(texts))
+        vectors = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in text.lower().split():
+                vectors[row, int(hashlib.md5(word.encode()).hexdigest(), 16) % self.dimensions] += 1.0
+            norm = np.linalg.norm(vectors[row])
+            if norm:
+                vectors[row] /= norm
+        return vectors
+
+    def create_embedding(self, text):
+        return self.create_embeddings([text])[0].tolist()
+
+
+@pytest.fixture
+def isolated_storage(tmp_path, monkeypatch):
+    """Point every persistent store at a temporary directory."""
+    vector_db = tmp_path / "vectordb"
+    paths = {
+        "VECTOR_DB_PATH": vector_db,
+        "LEXICAL_INDEX_DIR": vector_db / "lexical",
+        "EXACT_INDEX_DIR": vector_db / "exact",
+        "COLLECTION_REGISTRY_PATH": vector_db / "collections.sqlite3",
+        "INGEST_CACHE_DIR": tmp_path / "ingest_cache",
+        "EMBEDDING_CACHE_PATH": tmp_path / "embedding_cache.sqlite3",
+        "SUMMARY_CACHE_PATH": tmp_path / "summary_cache.sqlite3",
+        "OCR_CACHE_PATH": tmp_path / "ocr_cache.sqlite3",
+        "TRACE_DUMP_DIR": tmp_path / "traces",
+    }
+    for name, path in paths.items():
+        monkeypatch.setattr(config, name, path)
+    for name in ("LEXICAL_INDEX_DIR", "EXACT_INDEX_DIR", "INGEST_CACHE_DIR"):
+        paths[name].mkdir(parents=True, exist_ok=True)
+    return tmp_path
+
+
+@pytest.fixture
+def fake_embeddings():
+    return FakeEmbeddingService()
+
+
+@pytest.fixture
+def vector_db(isolated_storage, fake_embeddings, monkeypatch):
+    """A VectorDBService on isolated storage with the fake embedding service."""
+    monkeypatch.setattr(config, "QUERY_BATCHING_ENABLED", False)
+    from services.vector_db_service import VectorDBService
+    return VectorDBService(fake_embeddings)
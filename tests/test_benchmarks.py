@@ -0,0 +1,65 @@
+import asyncio
+import time
+from PyPDF2 import PdfReader
+from benchmarks.fake_ollama import FakeOllamaServer
+from benchmarks.run import compare, percentiles
+from benchmarks.synthetic_pdfs import write_digital_pdf
+from services import telemetry
+from services.llm_service import LLMService
+
+
+def test_fake_ollama_streams_through_the_llm_service(isolated_storage):
+    server = FakeOllamaServer(tokens=5, token_latency=0.01, first_token_latency=0.05).start()
+    llm = LLMService()
+    llm.endpoint = server.url
+    trace = telemetry.Trace("question")
+
+    async def collect():
+        try:
+            started = time.perf_counter()
+            tokens = [token async for token in llm.stream_text("question", trace=trace)]
+            return tokens, time.perf_counter() - started, await llm._complete("question")
+        finally:
+            await llm.aclose()
+
+    try:
+        tokens, elapsed, complete = asyncio.run(collect())
+    finally:
+        server.stop()
+
+    assert tokens == [f"token{i} " for i in range(5)]
+    assert complete == "".join(tokens)
+    assert server.requests == 2
+    # First-token delay plus four gaps between tokens
+    assert elapsed >= 0.05 + 4 * 0.01
+    assert trace.breakdown()["llm_first_token"] >= 50.0
+
+
+def test_compare_flags_only_regressions_beyond_tolerance():
+    def results(p95_ms, throughput, rss):
+        return {
+            "stages": {"embed": {"p95_ms": p95_ms, "throughput": throughput}},
+            "memory": {"peak_rss_mb": rss}
+        }
+
+    baseline = results(p95_ms=100.0, throughput=50.0, rss=500.0)
+
+    regressions = compare(results(p95_ms=130.0, throughput=30.0, rss=510.0), baseline, tolerance=0.2)
+
+    assert [line.split(":")[0] for line in regressions] == ["stages.embed.p95_ms", "stages.embed.throughput"]
+    # Faster and higher-throughput runs are improvements, not regressions
+    assert compare(results(p95_ms=50.0, throughput=90.0, rss=400.0), baseline, tolerance=0.2) == []
+
+
+def test_percentiles_of_no_samples_are_zero():
+    assert percentiles([]) == {"p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    assert percentiles([0.001, 0.002, 0.003])["p50_ms"] == 2.0
+
+
+def test_synthetic_digital_pdf_has_a_text_layer(tmp_path):
+    path = write_digital_pdf(tmp_path / "doc.pdf", pages=3, seed=1)
+
+    reader = PdfReader(str(path))
+
+    assert len(reader.pages) == 3
+    assert all(len(page.extract_text().split()) > 50 for page in reader.pages)
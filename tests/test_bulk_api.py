@@ -0,0 +1,74 @@
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+import config
+import main_app
+from main_app import resolve_bulk_directory
+
+
+@pytest.fixture
+def root(tmp_path, monkeypatch):
+    root = tmp_path / "incoming"
+    (root / "batch" / "inner").mkdir(parents=True)
+    (tmp_path / "private").mkdir()
+    monkeypatch.setattr(config, "BULK_INGEST_ROOT", root)
+    return root
+
+
+def status_of(directory):
+    with pytest.raises(HTTPException) as error:
+        resolve_bulk_directory(directory)
+    return error.value.status_code
+
+
+def test_directories_inside_the_root_resolve(root):
+    assert resolve_bulk_directory("batch") == (root / "batch").resolve()
+    assert resolve_bulk_directory("batch/inner/..") == (root / "batch").resolve()
+    assert resolve_bulk_directory(".") == root.resolve()
+
+
+@pytest.mark.parametrize("directory", ["..", "../private", "batch/../../private", "/etc", "/"])
+def test_directories_outside_the_root_are_refused(root, directory):
+    assert status_of(directory) == 400
+
+
+def test_symlink_out_of_the_root_is_refused(root, tmp_path):
+    (root / "escape").symlink_to(tmp_path / "private", target_is_directory=True)
+    assert status_of("escape") == 400
+
+
+def test_missing_directory_is_refused(root):
+    assert status_of("nope") == 400
+
+
+def test_bulk_ingest_is_disabled_without_a_root(monkeypatch):
+    monkeypatch.setattr(config, "BULK_INGEST_ROOT", None)
+    assert status_of("batch") == 403
+
+
+def test_bulk_routes_require_the_admin_token(root, monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    client = TestClient(main_app.app)
+
+    assert client.post("/ingest/bulk", json={"directory": "batch"}).status_code == 401
+    wrong = client.post("/ingest/bulk", json={"directory": "batch"}, headers={"X-Admin-Token": "guess"})
+    assert wrong.status_code == 401
+    assert client.get("/ingest/bulk/abc").status_code == 401
+    # Path checks run before any service is loaded
+    outside = client.post("/ingest/bulk", json={"directory": "../private"}, headers={"X-Admin-Token": "secret"})
+    assert outside.status_code == 400
+    assert client.get("/ingest/bulk/abc", headers={"X-Admin-Token": "secret"}).status_code == 404
+
+
+def test_finished_runs_beyond_retention_are_pruned(monkeypatch):
+    class Run:
+        def __init__(self, status):
+            self.stats = {"status": status}
+
+    monkeypatch.setattr(config, "BULK_RUN_RETENTION", 2)
+    runs = {"a": Run("done"), "b": Run("running"), "c": Run("failed"), "d": Run("done"), "e": Run("done")}
+    monkeypatch.setattr(main_app, "bulk_runs", dict(runs))
+
+    main_app.prune_bulk_runs()
+
+    assert list(main_app.bulk_runs) == ["b", "d", "e"]
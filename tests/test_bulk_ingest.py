@@ -0,0 +1,150 @@
+import asyncio
+from contextlib import contextmanager
+import pytest
+import config
+from services.bulk_ingest import BulkIngestor
+from services.chunker import TextChunker, whitespace_token_counter
+from services.document_processor import DocumentProcessor
+from services.ingest_cache import IngestCache
+from services.ingest_pipeline import IngestPipeline
+
+
+class FakeProcessor:
+    """Pages are the lines of the file; lines starting with "scan" need OCR."""
+
+    def __init__(self, fail_on=()):
+        self.fail_on = fail_on
+        self.processed = []
+
+    def _pages(self, file_path):
+        with open(file_path, encoding="utf-8") as file:
+            return dict(enumerate(file.read().splitlines()))
+
+    async def process_pdf(self, file_path):
+        if any(name in str(file_path) for name in self.fail_on):
+            raise RuntimeError("corrupt PDF")
+        self.processed.append(str(file_path))
+        pages = self._pages(file_path)
+        return {
+            "file_path": file_path,
+            "page_count": len(pages),
+            "extracted_text": {n: t for n, t in pages.items() if not t.startswith("scan")},
+            "ocr_pages": [n for n, t in pages.items() if t.startswith("scan")]
+        }
+
+    def fingerprint_pages(self, file_path):
+        return {n: f"hash of {t}" for n, t in self._pages(file_path).items()}
+
+    merge_page_text = staticmethod(DocumentProcessor.merge_page_text)
+
+    @contextmanager
+    def job_scratch_dir(self):
+        yield None
+
+    def iter_page_images(self, file_path, pages, job_dir=None):
+        lines = self._pages(file_path)
+        for page_num in pages:
+            yield page_num, lines[page_num]
+
+
+class FakeOCR:
+    async def process_images(self, images_by_page, progress=None):
+        text = {}
+        for page_num, line in images_by_page:
+            text[page_num] = line.replace("scan", "ocr text", 1)
+            if progress is not None:
+                progress(page_num)
+        return text
+
+
+@pytest.fixture
+def embeddings(fake_embeddings):
+    chunker = TextChunker(whitespace_token_counter)
+    fake_embeddings.chunk_pages = chunker.chunk_pages
+    return fake_embeddings
+
+
+@pytest.fixture
+def make_ingestor(vector_db, embeddings, monkeypatch):
+    monkeypatch.setattr(config, "CORPUS_MODE", False)
+
+    def make(processor=None):
+        return BulkIngestor(processor or FakeProcessor(), FakeOCR(), embeddings, vector_db, IngestCache())
+    return make
+
+
+@pytest.fixture
+def pdf_dir(tmp_path):
+    directory = tmp_path / "pdfs"
+    (directory / "nested").mkdir(parents=True)
+    (directory / "alpha.pdf").write_text("alpha page one about rivers\nscan alpha page two about lakes\n")
+    (directory / "nested" / "beta.pdf").write_text("beta page one about mountains\nbeta page two about hills\n")
+    (directory / "gamma.pdf").write_text("gamma page one about deserts\n")
+    (directory / "notes.txt").write_text("not a pdf")
+    return directory
+
+
+def test_find_pdfs_is_sorted_and_optionally_recursive(pdf_dir):
+    assert [p.name for p in BulkIngestor.find_pdfs(pdf_dir)] == ["alpha.pdf", "gamma.pdf", "beta.pdf"]
+    assert [p.name for p in BulkIngestor.find_pdfs(pdf_dir, recursive=False)] == ["alpha.pdf", "gamma.pdf"]
+
+
+def test_run_ingests_every_document_through_all_stages(make_ingestor, vector_db, pdf_dir):
+    ingestor = make_ingestor()
+
+    stats = asyncio.run(ingestor.run(BulkIngestor.find_pdfs(pdf_dir)))
+
+    assert stats["status"] == "done"
+    assert (stats["documents_total"], stats["documents_done"], stats["documents_failed"]) == (3, 3, 0)
+    assert stats["pages"] == 5
+    assert set(stats["stage_seconds"]) == set(BulkIngestor.STAGES)
+
+    entry = ingestor.ingest_cache.get(ingestor.ingest_cache.compute_key(pdf_dir / "alpha.pdf"))
+    assert "ocr text alpha page two" in entry["text"]
+    assert vector_db.collection_exists(entry["collection_name"])
+    results = vector_db.query_collection(entry["collection_name"], "lakes", n_results=2)
+    assert any("lakes" in r["text"] for r in results)
+
+
+def test_one_failing_document_does_not_stop_the_run(make_ingestor, pdf_dir):
+    ingestor = make_ingestor(FakeProcessor(fail_on=("gamma",)))
+
+    stats = asyncio.run(ingestor.run(BulkIngestor.find_pdfs(pdf_dir)))
+
+    assert stats["documents_done"] == 2
+    assert stats["documents_failed"] == 1
+    assert stats["failures"][0]["stage"] == "extract"
+    assert stats["failures"][0]["path"].endswith("gamma.pdf")
+
+
+def test_second_run_reuses_indexed_documents(make_ingestor, pdf_dir):
+    paths = BulkIngestor.find_pdfs(pdf_dir)
+    asyncio.run(make_ingestor().run(paths))
+    processor = FakeProcessor()
+
+    stats = asyncio.run(make_ingestor(processor).run(paths))
+
+    assert stats["documents_cached"] == stats["documents_done"] == 3
+    assert processor.processed == []
+
+
+def test_bulk_ingested_document_can_be_updated_in_place(make_ingestor, embeddings, vector_db, pdf_dir, monkeypatch):
+    monkeypatch.setattr(config, "INCREMENTAL_INGEST", True)
+    ingestor = make_ingestor()
+    path = pdf_dir / "nested" / "beta.pdf"
+    asyncio.run(ingestor.run([path]))
+    entry = ingestor.ingest_cache.get(ingestor.ingest_cache.compute_key(path))
+    assert entry["page_hashes"] == ["hash of beta page one about mountains", "hash of beta page two about hills"]
+
+    # A revision with one of its two pages unchanged
+    revision = pdf_dir / "beta-v2.pdf"
+    revision.write_text("beta page one about mountains\nbeta page two about valleys\nbeta page three\n")
+    monkeypatch.setattr(config, "INCREMENTAL_MIN_PAGE_OVERLAP", 0.3)
+    pipeline = IngestPipeline(FakeProcessor(), FakeOCR(), embeddings, vector_db, ingestor.ingest_cache)
+
+    result = asyncio.run(pipeline.run(
+        str(revision), replace={"collection_name": entry["collection_name"], "doc_id": None}
+    ))
+
+    assert result["collection_name"] == entry["collection_name"]
+    assert result["incremental"] is not None
@@ -0,0 +1,93 @@
+import itertools
+import types
+import pytest
+from services import cache_store
+from services.cache_store import LRUStore
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Strictly increasing timestamps, so access order is never a tie."""
+    ticks = itertools.count(1)
+    monkeypatch.setattr(cache_store, "time", types.SimpleNamespace(time=lambda: float(next(ticks))))
+
+
+@pytest.fixture
+def store(tmp_path, clock):
+    store = LRUStore(tmp_path / "cache.sqlite3", max_entries=3, name="test")
+    yield store
+    store.close()
+
+
+def test_get_and_put_round_trip(store):
+    store.put("a", b"\x00\x01")
+
+    assert store.get("a") == b"\x00\x01"
+    assert store.get("missing") is None
+    assert store.stats()["hits"] == 1
+    assert store.stats()["misses"] == 1
+
+
+def test_least_recently_used_entry_is_evicted(store):
+    store.put_many({"a": b"1", "b": b"2", "c": b"3"})
+    # Reading "a" makes "b" the least recently used
+    store.get("a")
+
+    store.put("d", b"4")
+
+    assert store.get("b") is None
+    assert store.get_many(["a", "c", "d"]) == {"a": b"1", "c": b"3", "d": b"4"}
+    assert store.stats()["entries"] == 3
+
+
+def test_get_many_handles_duplicates_and_large_batches(store):
+    store.max_entries = 2000
+    store.put_many({f"k{i}": str(i).encode() for i in range(1200)})
+
+    found = store.get_many([f"k{i}" for i in range(1200)] + ["k1", "absent"])
+
+    assert len(found) == 1200
+    assert found["k1"] == b"1"
+
+
+def test_entries_persist_across_instances(tmp_path, clock):
+    path = tmp_path / "cache.sqlite3"
+    first = LRUStore(path, max_entries=10)
+    first.put("key", b"value")
+    first.close()
+
+    second = LRUStore(path, max_entries=10)
+    assert second.get("key") == b"value"
+    second.close()
+
+
+def test_delete_many_removes_entries(store):
+    store.put_many({"a": b"1", "b": b"2"})
+
+    store.delete_many(["a"])
+
+    assert store.get("a") is None
+    assert store.get("b") == b"2"
+
+
+def test_entry_count_tracks_replacements_deletes_and_eviction(store):
+    store.put_many({"a": b"1", "b": b"2"})
+    store.put_many({"a": b"updated", "c": b"3"})
+    assert store.stats()["entries"] == 3
+
+    store.delete_many(["b", "b", "missing"])
+    assert store.stats()["entries"] == 2
+
+    store.put_many({"d": b"4", "e": b"5"})
+    assert store.stats()["entries"] == store._count() == 3
+
+
+def test_puts_do_not_count_the_whole_table(store):
+    store.put_many({"a": b"1", "b": b"2"})
+    statements = []
+    store._conn.set_trace_callback(statements.append)
+
+    store.put_many({"c": b"3", "d": b"4"})
+
+    assert not [s for s in statements if "COUNT(*) FROM entries" in s and "WHERE" not in s]
+    assert store.get("a") is None
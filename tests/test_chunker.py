@@ -0,0 +1,66 @@
+from services.chunker import TextChunker, whitespace_token_counter
+
+
+def word_counter(texts):
+    return [len(text.split()) for text in texts]
+
+
+def sentences(n, words=8):
+    return " ".join(f"Sentence {i} " + "word " * (words - 3) + "end." for i in range(n))
+
+
+def test_chunk_text_is_an_exact_slice_of_the_source():
+    text = sentences(40) + "\n\n" + sentences(20)
+    chunks = TextChunker(word_counter, chunk_size=50, chunk_overlap=10).chunk_text(text)
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        assert text[meta["start_idx"]:meta["end_idx"]] == chunk["text"]
+
+
+def test_chunks_respect_the_token_budget():
+    text = sentences(60)
+    chunks = TextChunker(word_counter, chunk_size=50, chunk_overlap=10).chunk_text(text)
+
+    assert all(chunk["metadata"]["token_count"] <= 50 for chunk in chunks)
+    assert all(word_counter([chunk["text"]])[0] <= 50 for chunk in chunks)
+
+
+def test_consecutive_chunks_overlap_by_trailing_sentences():
+    chunks = TextChunker(word_counter, chunk_size=50, chunk_overlap=10).chunk_text(sentences(30))
+
+    for previous, current in zip(chunks, chunks[1:]):
+        assert current["metadata"]["start_idx"] < previous["metadata"]["end_idx"]
+        overlap = previous["metadata"]["end_idx"] - current["metadata"]["start_idx"]
+        assert word_counter([previous["text"][-overlap:]])[0] <= 10
+
+
+def test_sentence_longer_than_budget_is_split_on_words():
+    text = "word " * 120 + "end."
+    chunks = TextChunker(word_counter, chunk_size=50, chunk_overlap=0).chunk_text(text)
+
+    assert len(chunks) == 3
+    assert all(chunk["metadata"]["token_count"] <= 50 for chunk in chunks)
+    assert " ".join(chunk["text"] for chunk in chunks).split() == text.split()
+
+
+def test_page_offsets_index_into_joined_pages():
+    pages = {1: sentences(10), 2: "", 3: sentences(10)}
+    chunker = TextChunker(word_counter, chunk_size=30, chunk_overlap=5)
+    joined = TextChunker.join_pages(pages)
+
+    chunks = chunker.chunk_pages(pages)
+
+    assert {chunk["metadata"]["page"] for chunk in chunks} == {1, 3}
+    for chunk in chunks:
+        meta = chunk["metadata"]
+        assert joined[meta["start_idx"]:meta["end_idx"]] == chunk["text"]
+        assert meta["page"] <= meta["end_page"]
+
+
+def test_empty_input_yields_no_chunks():
+    chunker = TextChunker(whitespace_token_counter, chunk_size=50)
+
+    assert chunker.chunk_text("   \n ") == []
+    assert chunker.chunk_pages({1: "", 2: "  "}) == []
@@ -0,0 +1,104 @@
+import time
+import config
+
+
+def make_collection(vector_db, name, text="some text"):
+    vector_db.create_collection(name)
+    vector_db.add_documents(name, [{"text": text, "metadata": {"start_idx": 0, "end_idx": len(text)}}])
+
+
+def set_last_access(vector_db, name, when):
+    lifecycle = vector_db.lifecycle
+    lifecycle._conn.execute("UPDATE collections SET last_access = ? WHERE name = ?", (when, name))
+    lifecycle._conn.commit()
+
+
+def test_idle_collections_are_evicted_after_the_ttl(vector_db):
+    make_collection(vector_db, "old")
+    make_collection(vector_db, "fresh")
+    set_last_access(vector_db, "old", time.time() - 3600)
+
+    evicted = vector_db.lifecycle.evict(ttl_seconds=600)
+
+    assert evicted == ["old"]
+    assert vector_db.list_collection_names() == ["fresh"]
+
+
+def test_dry_run_reports_without_deleting(vector_db):
+    make_collection(vector_db, "old")
+    set_last_access(vector_db, "old", time.time() - 3600)
+
+    assert vector_db.lifecycle.evict(ttl_seconds=600, dry_run=True) == ["old"]
+    assert vector_db.list_collection_names() == ["old"]
+
+
+def test_unregistered_collections_are_adopted_not_evicted(vector_db):
+    make_collection(vector_db, "legacy")
+    vector_db.lifecycle.forget("legacy")
+
+    assert vector_db.lifecycle.evict(ttl_seconds=600) == []
+    listing = vector_db.lifecycle.list_collections()
+    assert listing[0]["name"] == "legacy"
+    assert listing[0]["last_access"] >= time.time() - 60
+
+
+def test_count_limit_evicts_least_recently_used_first(vector_db):
+    for i, name in enumerate(["a", "b", "c"]):
+        make_collection(vector_db, name)
+        set_last_access(vector_db, name, time.time() - 100 + i)
+
+    evicted = vector_db.lifecycle.evict(ttl_seconds=0, max_collections=1)
+
+    assert evicted == ["a", "b"]
+
+
+def test_corpus_collection_is_never_evicted(vector_db):
+    make_collection(vector_db, config.CORPUS_COLLECTION)
+    set_last_access(vector_db, config.CORPUS_COLLECTION, 0)
+
+    assert vector_db.lifecycle.evict(ttl_seconds=1, max_collections=0) == []
+
+
+def test_compact_removes_orphaned_lexical_indexes(vector_db):
+    make_collection(vector_db, "live")
+    orphan = config.LEXICAL_INDEX_DIR / "gone.json"
+    orphan.write_text("{}")
+    (config.LEXICAL_INDEX_DIR / "gone.json.log").write_text("")
+
+    report = vector_db.lifecycle.compact()
+
+    assert report["lexical_indexes_removed"] == 2
+    assert not orphan.exists()
+    assert (config.LEXICAL_INDEX_DIR / "live.json").exists()
+
+
+def test_eviction_drops_the_collection_from_memory(vector_db):
+    make_collection(vector_db, "old")
+    vector_db.query_collection("old", "some", 1, True)
+    set_last_access(vector_db, "old", time.time() - 3600)
+
+    vector_db.lifecycle.evict(ttl_seconds=600)
+
+    assert "old" not in vector_db.stores
+    assert "old" not in vector_db.lexical_indexes
+    assert "old" not in vector_db._lexical_locks
+
+
+def test_listing_does_not_keep_collections_in_memory(vector_db):
+    make_collection(vector_db, "cold")
+    vector_db.unload_collection("cold")
+
+    assert [c["name"] for c in vector_db.lifecycle.list_collections()] == ["cold"]
+    assert "cold" not in vector_db.stores
+
+
+def test_idle_collections_are_unloaded_but_kept_on_disk(vector_db, monkeypatch):
+    monkeypatch.setattr(config, "COLLECTION_UNLOAD_SECONDS", 600)
+    make_collection(vector_db, "idle", "rivers and lakes")
+    make_collection(vector_db, "busy")
+    set_last_access(vector_db, "idle", time.time() - 3600)
+
+    assert vector_db.lifecycle.evict(ttl_seconds=7200) == []
+
+    assert "idle" not in vector_db.stores and "busy" in vector_db.stores
+    assert vector_db.query_collection("idle", "lakes", 1)[0]["text"] == "rivers and lakes"
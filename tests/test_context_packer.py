@@ -0,0 +1,94 @@
+from services.context_packer import ContextPacker, estimate_tokens
+
+
+def chunk(text, start, doc_id="doc", **metadata):
+    return {"text": text, "metadata": dict(metadata, doc_id=doc_id, start_idx=start, end_idx=start + len(text))}
+
+
+def test_overlapping_chunks_are_merged_along_offsets():
+    text = "alpha beta gamma delta epsilon zeta eta theta"
+    results = [chunk(text[10:30], 10), chunk(text[0:20], 0)]
+
+    packed, report = ContextPacker(token_budget=1000).pack(results)
+
+    assert report["merged"] == 1
+    assert packed[0]["text"] == text[0:30]
+    assert packed[0]["metadata"]["start_idx"] == 0
+    assert packed[0]["metadata"]["end_idx"] == 30
+
+
+def test_chunks_of_different_documents_are_not_merged():
+    results = [chunk("same words here", 0, doc_id="a"), chunk("other words there", 0, doc_id="b")]
+
+    packed, report = ContextPacker(token_budget=1000, duplicate_threshold=1.1).pack(results)
+
+    assert report["merged"] == 0
+    assert len(packed) == 2
+
+
+def test_near_duplicates_are_dropped():
+    results = [
+        {"text": "the quick brown fox jumps over the lazy dog", "metadata": {}},
+        {"text": "the quick brown fox jumps over the lazy dog again", "metadata": {}},
+    ]
+
+    packed, report = ContextPacker(token_budget=1000, duplicate_threshold=0.8).pack(results)
+
+    assert report["duplicates_dropped"] == 1
+    assert [p["text"] for p in packed] == [results[0]["text"]]
+
+
+def test_packed_tokens_never_exceed_budget():
+    results = [{"text": f"passage {i} " + "word " * 60, "metadata": {}} for i in range(10)]
+
+    packed, report = ContextPacker(token_budget=200, duplicate_threshold=1.1).pack(results)
+
+    assert report["packed_tokens"] <= 200
+    assert sum(estimate_tokens(p["text"]) for p in packed) == report["packed_tokens"]
+
+
+def test_oversized_merged_passage_is_truncated_around_best_chunk():
+    # Six adjacent chunks merge into one passage far larger than the budget
+    words = [f"w{i:04d}" for i in range(1300)]
+    text = " ".join(words)
+    size = len(text) // 6
+    results = [chunk(text[i * size:(i + 1) * size], i * size) for i in range(6)]
+    # The fourth chunk is the best match
+    results.insert(0, results.pop(3))
+
+    packed, report = ContextPacker(token_budget=500).pack(results)
+
+    assert report["truncated"] == 1
+    assert report["over_budget_dropped"] == 0
+    assert len(packed) == 1
+    passage = packed[0]
+    assert passage["metadata"]["truncated"] is True
+    assert 450 <= estimate_tokens(passage["text"]) <= 500
+    # The window starts at the best-ranked chunk, on a word boundary
+    first_word = passage["text"].split()[0]
+    assert first_word in words
+    assert 0 <= text.index(first_word) - 3 * size <= len(first_word)
+    assert text[text.index(first_word):].startswith(passage["text"])
+
+
+def test_remainder_below_minimum_is_not_filled():
+    results = [
+        {"text": "first " * 150, "metadata": {}},
+        {"text": "second " * 150, "metadata": {}},
+    ]
+
+    packed, report = ContextPacker(token_budget=250, min_passage_tokens=64).pack(results)
+
+    # 250 - 226 leaves 24 tokens, below the minimum passage size
+    assert len(packed) == 1
+    assert report["over_budget_dropped"] == 1
+
+
+def test_chunk_bridging_two_passages_merges_them():
+    text = "one two three four five six seven eight nine ten eleven twelve"
+    left, middle, right = chunk(text[0:20], 0), chunk(text[20:40], 20), chunk(text[40:], 40)
+
+    packed, report = ContextPacker(token_budget=1000).pack([left, right, middle])
+
+    assert report["merged"] == 2
+    assert [p["text"] for p in packed] == [text]
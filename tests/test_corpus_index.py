@@ -0,0 +1,55 @@
+import pytest
+import config
+from services.ingest_cache import IngestCache
+from services.ingest_pipeline import IngestPipeline
+
+
+@pytest.fixture
+def pipeline(vector_db, fake_embeddings, monkeypatch):
+    monkeypatch.setattr(config, "CORPUS_MODE", True)
+    return IngestPipeline(None, None, fake_embeddings, vector_db, IngestCache())
+
+
+def chunks(*texts):
+    return [{"text": t, "metadata": {"start_idx": i * 100, "end_idx": i * 100 + len(t)}} for i, t in enumerate(texts)]
+
+
+def index(pipeline, fake_embeddings, filename, cache_key, texts):
+    new = chunks(*texts)
+    embeddings = fake_embeddings.create_embeddings(texts)
+    return pipeline.index(filename, cache_key, new, embeddings)
+
+
+def corpus_texts(vector_db, doc_id):
+    return sorted(e["text"] for e in vector_db.get_store(config.CORPUS_COLLECTION).get(where={"doc_id": doc_id}))
+
+
+def test_documents_share_the_corpus_and_search_filters_by_doc_id(pipeline, vector_db, fake_embeddings):
+    a = index(pipeline, fake_embeddings, "a", "k" * 64, ["apples grow on trees"])
+    b = index(pipeline, fake_embeddings, "b", "j" * 64, ["apples are red fruit"])
+
+    assert a["collection_name"] == b["collection_name"] == config.CORPUS_COLLECTION
+    results = vector_db.query_collection(config.CORPUS_COLLECTION, "apples", n_results=5, doc_ids=[b["doc_id"]])
+    assert [r["text"] for r in results] == ["apples are red fruit"]
+
+
+def test_reindexing_replaces_the_old_copy(pipeline, vector_db, fake_embeddings):
+    location = index(pipeline, fake_embeddings, "a", "k" * 64, ["old text", "kept text"])
+
+    index(pipeline, fake_embeddings, "a", "k" * 64, ["kept text", "new text"])
+
+    assert corpus_texts(vector_db, location["doc_id"]) == ["kept text", "new text"]
+
+
+def test_failed_reindex_keeps_the_old_copy(pipeline, vector_db, fake_embeddings, monkeypatch):
+    location = index(pipeline, fake_embeddings, "a", "k" * 64, ["old text", "kept text"])
+    store = vector_db.get_store(config.CORPUS_COLLECTION)
+
+    def fail(*args, **kwargs):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(store, "add", fail)
+
+    with pytest.raises(RuntimeError):
+        index(pipeline, fake_embeddings, "a", "k" * 64, ["kept text", "new text"])
+    assert corpus_texts(vector_db, location["doc_id"]) == ["kept text", "old text"]
@@ -0,0 +1,132 @@
+import asyncio
+from pathlib import Path
+import pytest
+from PIL import Image
+import config
+from services import document_processor
+from services.document_processor import DocumentProcessor
+
+CLEAN_TEXT = (
+    "The committee reviewed the quarterly results and agreed to extend the pilot programme "
+    "for another six months, subject to the budget review in March."
+)
+# Typical output of a broken font encoding: glyph soup and run-together tokens
+GARBAGE_TEXT = "ÿþ\x0c\x0e\x0f ¤¤¤ ¦§¨ ��� x y z " + "\x10\x11\x12" * 20
+RUN_TOGETHER_TEXT = "Thecommitteereviewedthequarterlyresultsandagreedtoextendthepilotprogrammefurther " * 3
+
+
+@pytest.fixture
+def processor(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "TEMP_DIR", tmp_path)
+    return DocumentProcessor()
+
+
+def test_clean_text_scores_high():
+    density, quality = DocumentProcessor.score_page_text(CLEAN_TEXT)
+    assert density == len("".join(CLEAN_TEXT.split()))
+    assert quality >= config.OCR_MIN_TEXT_QUALITY
+
+
+@pytest.mark.parametrize("text", [GARBAGE_TEXT, RUN_TOGETHER_TEXT])
+def test_garbage_text_scores_low(text):
+    _, quality = DocumentProcessor.score_page_text(text)
+    assert quality < config.OCR_MIN_TEXT_QUALITY
+
+
+def test_empty_text_scores_zero():
+    assert DocumentProcessor.score_page_text("") == (0, 0.0)
+    assert DocumentProcessor.score_page_text(" \n\t ") == (0, 0.0)
+
+
+def test_pages_are_routed_individually(processor):
+    text_by_page = {0: CLEAN_TEXT, 1: GARBAGE_TEXT, 2: "Page 3", 4: CLEAN_TEXT}
+
+    text_pages, ocr_pages = processor._route_pages(text_by_page, page_count=5)
+
+    # Garbage, too-short and missing pages go to OCR; clean pages keep their text layer
+    assert text_pages == {0: CLEAN_TEXT, 4: CLEAN_TEXT}
+    assert ocr_pages == [1, 2, 3]
+
+
+def test_process_pdf_reports_only_failing_pages_for_ocr(processor, tmp_path, monkeypatch):
+    pdf = tmp_path / "doc.pdf"
+    pdf.write_bytes(b"%PDF-1.4")
+    monkeypatch.setattr(processor, "_extract_text_with_pypdf", lambda path: {0: CLEAN_TEXT, 1: RUN_TOGETHER_TEXT})
+
+    result = asyncio.run(processor.process_pdf(str(pdf)))
+
+    assert result["page_count"] == 2
+    assert result["extracted_text"] == {0: CLEAN_TEXT}
+    assert result["ocr_pages"] == [1]
+
+
+def test_image_only_pdf_routes_every_page_to_ocr(processor, tmp_path):
+    pdf = tmp_path / "scan.pdf"
+    pages = [Image.new("RGB", (100, 100), "white") for _ in range(3)]
+    pages[0].save(pdf, save_all=True, append_images=pages[1:])
+
+    result = asyncio.run(processor.process_pdf(str(pdf)))
+
+    assert result["page_count"] == 3
+    assert result["extracted_text"] == {}
+    assert result["ocr_pages"] == [0, 1, 2]
+
+
+def test_merge_page_text_restores_page_order():
+    merged = DocumentProcessor.merge_page_text({0: "a", 3: "d"}, {2: "c", 1: "b"})
+    assert list(merged.items()) == [(0, "a"), (1, "b"), (2, "c"), (3, "d")]
+
+
+def test_windows_split_non_contiguous_runs(monkeypatch):
+    monkeypatch.setattr(config, "PDF_RENDER_WINDOW", 3)
+
+    windows = list(DocumentProcessor._page_windows([12, 0, 1, 2, 3, 4, 7, 10, 11]))
+
+    # Windows never bridge a gap, so no page outside the list is rendered
+    assert windows == [(0, 2), (3, 4), (7, 7), (10, 12)]
+
+
+def test_iter_page_images_renders_windows_in_page_order(processor, monkeypatch):
+    monkeypatch.setattr(config, "PDF_RENDER_WINDOW", 2)
+    calls = []
+
+    def fake_convert(path, dpi, first_page, last_page, **kwargs):
+        calls.append((first_page, last_page))
+        return [Image.new("L", (10, 10), page) for page in range(first_page, last_page + 1)]
+
+    monkeypatch.setattr(document_processor, "convert_from_path", fake_convert)
+
+    rendered = [(page_num, image.getpixel((0, 0))) for page_num, image in
+                processor.iter_page_images("doc.pdf", [5, 1, 2, 3])]
+
+    # poppler pages are 1-based; the page images yielded are 0-based
+    assert calls == [(2, 3), (4, 4), (6, 6)]
+    assert rendered == [(1, 2), (2, 3), (3, 4), (5, 6)]
+
+
+def test_failed_window_is_skipped(processor, monkeypatch):
+    monkeypatch.setattr(config, "PDF_RENDER_WINDOW", 1)
+
+    def fake_convert(path, dpi, first_page, last_page, **kwargs):
+        if first_page == 2:
+            raise RuntimeError("poppler crashed")
+        return [Image.new("L", (10, 10))]
+
+    monkeypatch.setattr(document_processor, "convert_from_path", fake_convert)
+
+    assert [page_num for page_num, _ in processor.iter_page_images("doc.pdf", [0, 1, 2])] == [0, 2]
+
+
+def test_job_scratch_dirs_are_private_and_removed(processor, monkeypatch):
+    monkeypatch.setattr(config, "OCR_DEBUG_PAGES", False)
+    with processor.job_scratch_dir() as first, processor.job_scratch_dir() as second:
+        assert first != second
+        (first / "page_0.png").write_bytes(b"x")
+    assert not first.exists() and not second.exists()
+
+
+def test_debug_pages_keep_the_scratch_dir(processor, monkeypatch):
+    monkeypatch.setattr(config, "OCR_DEBUG_PAGES", True)
+    with processor.job_scratch_dir() as job_dir:
+        pass
+    assert Path(job_dir).is_dir()
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+import config
+from services.cache_store import LRUStore
+from services.chunker import TextChunker, whitespace_token_counter
+from services.embedding_service import EmbeddingService
+
+
+class FakeModel:
+    """Stands in for SentenceTransformer: the vector is the text length, repeated."""
+
+    def __init__(self, dimensions=4, fail=False):
+        self.dimensions = dimensions
+        self.fail = fail
+        self.batches = []
+
+    def encode(self, texts, batch_size, convert_to_numpy, show_progress_bar):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("CUDA out of memory")
+        return np.array([[len(t)] * self.dimensions for t in texts], dtype=np.float32)
+
+
+@pytest.fixture
+def make_service(isolated_storage):
+    def make(cache=False, fail=False):
+        # Skips model loading; everything else is the real service
+        service = object.__new__(EmbeddingService)
+        service.model = FakeModel(fail=fail)
+        service.dimensions = service.model.dimensions
+        service.cache = LRUStore(config.EMBEDDING_CACHE_PATH, 100, name="embedding") if cache else None
+        service.count_tokens = whitespace_token_counter
+        service.chunker = TextChunker(whitespace_token_counter)
+        return service
+    return make
+
+
+def test_batches_are_length_bucketed_and_results_keep_input_order(make_service):
+    service = make_service()
+    texts = ["ccc", "a", "dddd", "bb"]
+
+    vectors = service.encode_batched(texts, batch_size=2)
+
+    assert service.model.batches == [["a", "bb"], ["ccc", "dddd"]]
+    assert vectors.dtype == np.float32
+    assert vectors[:, 0].tolist() == [3, 1, 4, 2]
+
+
+def test_empty_texts_get_zero_rows_without_encoding(make_service):
+    service = make_service()
+
+    vectors = service.create_embeddings(["", "abc", "  "])
+
+    assert service.model.batches == [["abc"]]
+    assert vectors[0].tolist() == [0, 0, 0, 0]
+    assert vectors[1, 0] == 3
+
+
+def test_encoding_errors_propagate(make_service):
+    service = make_service(fail=True)
+
+    with pytest.raises(RuntimeError, match="out of memory"):
+        service.create_embeddings(["abc"])
+    # Unbatched queries too: a zero vector would be searched as the query
+    with pytest.raises(RuntimeError, match="out of memory"):
+        service.create_embedding("abc")
+
+
+def test_cache_encodes_only_misses_once(make_service):
+    service = make_service(cache=True)
+    service.create_embeddings(["one", "two"])
+    service.model.batches.clear()
+
+    vectors = service.create_embeddings(["two", "three", "three"])
+
+    assert service.model.batches == [["three"]]
+    assert vectors[:, 0].tolist() == [3, 5, 5]
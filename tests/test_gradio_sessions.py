@@ -0,0 +1,137 @@
+import asyncio
+import types
+import pytest
+from services.ingest_jobs import IngestJobManager
+from ui import gradio_app
+from ui.gradio_app import GradioInterface, new_session_state
+
+
+class FakePipeline:
+    """Ingests instantly; each file gets its own collection."""
+
+    async def run(self, file_path, progress=None, replace=None):
+        progress("extract", 1, 1)
+        await asyncio.sleep(0.01)
+        name = file_path.rsplit("/", 1)[-1].removesuffix(".pdf")
+        return {
+            "collection_name": f"doc_{name}",
+            "doc_id": None,
+            "filename": name,
+            "text": f"text of {name}",
+            "chunks": [{"text": f"text of {name}"}],
+            "metadata": {"title": name.title()}
+        }
+
+
+class FakeVectorDB:
+    def __init__(self):
+        self.queries = []
+
+    def query_collection(self, collection_name, question, n_results, doc_ids=None):
+        self.queries.append(collection_name)
+        return [{"text": f"context from {collection_name}"}]
+
+
+class FakePacker:
+    def pack(self, results):
+        return results, {}
+
+
+class FakeLLM:
+    async def answer_question_stream(self, question, context, trace=None):
+        for word in context[0]["text"].split():
+            # Yield control so concurrent sessions interleave
+            await asyncio.sleep(0.001)
+            yield word + " "
+
+
+@pytest.fixture
+def interface():
+    interface = GradioInterface()
+    interface.ingest_jobs = IngestJobManager(FakePipeline(), workers=2)
+    interface.vector_db_service = FakeVectorDB()
+    interface.context_packer = FakePacker()
+    interface.llm_service = FakeLLM()
+    interface.warmup["status"] = gradio_app.READY
+    return interface
+
+
+async def last(stream):
+    item = None
+    async for item in stream:
+        pass
+    return item
+
+
+def upload(path):
+    return types.SimpleNamespace(name=path)
+
+
+def test_new_session_states_share_nothing():
+    first, second = new_session_state(), new_session_state()
+    first["metadata"]["title"] = "Mine"
+    assert second["metadata"] == {}
+
+
+def test_concurrent_sessions_keep_their_own_documents(interface):
+    async def run():
+        return await asyncio.gather(
+            last(interface.process_document(upload("/tmp/alpha.pdf"), new_session_state())),
+            last(interface.process_document(upload("/tmp/beta.pdf"), new_session_state()))
+        )
+
+    (status_a, session_a), (status_b, session_b) = asyncio.run(run())
+
+    assert "successfully" in status_a and "successfully" in status_b
+    assert session_a["collection_name"] == "doc_alpha"
+    assert session_b["collection_name"] == "doc_beta"
+    assert session_a["metadata"] == {"title": "Alpha"}
+    assert session_a["job_id"] != session_b["job_id"]
+    # Nothing about either document is stored on the shared interface
+    assert "collection_name" not in vars(interface)
+
+
+def test_concurrent_questions_are_answered_from_each_sessions_document(interface):
+    session_a = dict(new_session_state(), collection_name="doc_alpha")
+    session_b = dict(new_session_state(), collection_name="doc_beta")
+
+    async def run():
+        return await asyncio.gather(
+            last(interface.answer_question("what?", [], session_a)),
+            last(interface.answer_question("what?", [], session_b))
+        )
+
+    (history_a, _), (history_b, _) = asyncio.run(run())
+
+    assert history_a[-1][1].strip() == "context from doc_alpha"
+    assert history_b[-1][1].strip() == "context from doc_beta"
+    assert sorted(interface.vector_db_service.queries) == ["doc_alpha", "doc_beta"]
+
+
+def test_session_without_a_document_is_asked_to_upload_one(interface):
+    history, _ = asyncio.run(last(interface.answer_question("what?", [], new_session_state())))
+    assert "upload and process a document first" in history[-1][1]
+
+
+def test_cancel_only_affects_the_sessions_own_job(interface):
+    async def run():
+        session = new_session_state()
+        stream = interface.process_document(upload("/tmp/gamma.pdf"), session)
+        await stream.__anext__()
+        other = await interface.cancel_processing(new_session_state())
+        mine = await interface.cancel_processing(session)
+        status, _ = await last(stream)
+        return other, mine, status
+
+    other, mine, status = asyncio.run(run())
+
+    assert other == "No document is being processed."
+    assert mine.endswith("Cancelling...")
+    assert "cancelled" in status
+
+
+def test_ui_builds_with_per_session_state(interface):
+    blocks = interface.create_ui()
+    states = [block for block in blocks.blocks.values() if block.__class__.__name__ == "State"]
+    assert len(states) == 1
+    assert states[0].value == new_session_state()
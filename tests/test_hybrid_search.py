@@ -0,0 +1,72 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import config
+
+
+def add(vector_db, name, *texts, doc_id=None):
+    vector_db.create_collection(name)
+    documents = [{"text": t, "metadata": {"start_idx": i * 100, "end_idx": i * 100 + len(t)}}
+                 for i, t in enumerate(texts)]
+    assert vector_db.add_documents(name, documents, doc_id=doc_id)
+
+
+def test_hybrid_search_finds_exact_terms(vector_db):
+    add(vector_db, "manual", "Reset the ISO-9001 audit log weekly", "Clean the filters monthly")
+
+    results = vector_db.query_collection("manual", "ISO-9001", n_results=1, hybrid=True)
+
+    assert results[0]["text"] == "Reset the ISO-9001 audit log weekly"
+
+
+def test_search_is_not_blocked_by_a_writer_on_another_collection(vector_db):
+    add(vector_db, "alpha", "rivers and lakes")
+    add(vector_db, "beta", "mountains and hills")
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        # A writer holds beta's index; alpha's searches go ahead
+        with vector_db._lexical_index_lock("beta"):
+            future = pool.submit(vector_db.query_collection, "alpha", "lakes", 1, True)
+            results = future.result(timeout=5)
+
+    assert results[0]["text"] == "rivers and lakes"
+
+
+def test_search_waits_for_a_writer_on_its_own_collection(vector_db):
+    add(vector_db, "alpha", "rivers and lakes")
+    started = threading.Event()
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        with vector_db._lexical_index_lock("alpha"):
+            def search():
+                started.set()
+                return vector_db.query_collection("alpha", "lakes", 1, True)
+            future = pool.submit(search)
+            started.wait(5)
+            assert not future.done()
+        assert future.result(timeout=5)[0]["text"] == "rivers and lakes"
+
+
+def test_deleting_the_last_document_drops_the_collection_from_memory(vector_db):
+    add(vector_db, config.CORPUS_COLLECTION, "apples grow on trees", doc_id="a")
+    add(vector_db, config.CORPUS_COLLECTION, "pears grow on trees", doc_id="b")
+    vector_db.query_collection(config.CORPUS_COLLECTION, "trees", 2, True)
+
+    assert vector_db.delete_document("a") == 1
+    assert config.CORPUS_COLLECTION in vector_db.stores
+    assert (config.CORPUS_COLLECTION, "a") not in vector_db._document_locks
+
+    assert vector_db.delete_document("b") == 1
+    assert config.CORPUS_COLLECTION not in vector_db.stores
+    assert config.CORPUS_COLLECTION not in vector_db.lexical_indexes
+    assert config.CORPUS_COLLECTION not in vector_db._lexical_locks
+
+
+def test_unloaded_collection_is_reloaded_on_the_next_query(vector_db):
+    add(vector_db, "alpha", "rivers and lakes", "mountains and hills")
+
+    vector_db.unload_collection("alpha")
+    assert "alpha" not in vector_db.stores and "alpha" not in vector_db.lexical_indexes
+
+    results = vector_db.query_collection("alpha", "lakes", 1, True)
+    assert results[0]["text"] == "rivers and lakes"
+    assert "alpha" in vector_db.lexical_indexes
@@ -0,0 +1,55 @@
+import pytest
+import config
+from services.ingest_cache import IngestCache
+from services.ingest_pipeline import IngestPipeline
+
+
+@pytest.fixture
+def pipeline(vector_db, fake_embeddings):
+    return IngestPipeline(None, None, fake_embeddings, vector_db, IngestCache())
+
+
+def chunks(*texts):
+    return [{"text": t, "metadata": {"start_idx": i * 100, "end_idx": i * 100 + len(t)}} for i, t in enumerate(texts)]
+
+
+def test_page_overlap_is_relative_to_the_larger_version():
+    assert IngestPipeline.page_overlap(["a", "b", "c", "d"], ["a", "b", "c", "d"]) == 1.0
+    assert IngestPipeline.page_overlap(["a", "b"], ["a", "b", "c", "d"]) == 0.5
+    assert IngestPipeline.page_overlap(["a"], ["x"]) == 0.0
+    assert IngestPipeline.page_overlap(None, ["a"]) == 0.0
+
+
+def test_previous_version_resolves_the_named_indexed_document(pipeline, vector_db, monkeypatch):
+    monkeypatch.setattr(config, "CORPUS_MODE", False)
+    vector_db.create_collection("doc_report")
+    vector_db.add_documents("doc_report", chunks("alpha one"))
+    pipeline.ingest_cache.put("key1", {"collection_name": "doc_report", "doc_id": None,
+                                       "page_hashes": ["p1"]})
+
+    previous = pipeline.previous_version({"collection_name": "doc_report", "doc_id": None})
+
+    assert previous["cache_key"] == "key1"
+    assert previous["page_hashes"] == ["p1"]
+
+
+def test_previous_version_ignores_documents_no_longer_indexed(pipeline, monkeypatch):
+    monkeypatch.setattr(config, "CORPUS_MODE", False)
+    pipeline.ingest_cache.put("key1", {"collection_name": "doc_gone", "doc_id": None})
+
+    assert pipeline.previous_version({"collection_name": "doc_gone", "doc_id": None}) is None
+
+
+def test_previous_version_requires_the_current_storage_mode(pipeline, vector_db, monkeypatch):
+    monkeypatch.setattr(config, "CORPUS_MODE", True)
+    vector_db.create_collection("doc_report")
+    vector_db.add_documents("doc_report", chunks("alpha one"))
+    pipeline.ingest_cache.put("key1", {"collection_name": "doc_report", "doc_id": None})
+
+    # An own-collection document is not updated in place while in corpus mode
+    assert pipeline.previous_version({"collection_name": "doc_report", "doc_id": None}) is None
+
+
+def test_unknown_location_has_no_previous_version(pipeline):
+    assert pipeline.previous_version({"collection_name": "never_ingested", "doc_id": None}) is None
+    assert pipeline.previous_version({}) is None
@@ -0,0 +1,65 @@
+import pytest
+import config
+from services.ingest_cache import IngestCache
+
+
+@pytest.fixture
+def cache(isolated_storage):
+    return IngestCache()
+
+
+@pytest.fixture
+def pdf(tmp_path):
+    path = tmp_path / "doc.pdf"
+    path.write_bytes(b"%PDF-1.4 fake bytes")
+    return path
+
+
+def test_key_depends_on_file_bytes(cache, pdf, tmp_path):
+    other = tmp_path / "other.pdf"
+    other.write_bytes(b"%PDF-1.4 other bytes")
+    copy = tmp_path / "copy.pdf"
+    copy.write_bytes(pdf.read_bytes())
+
+    assert cache.compute_key(pdf) == cache.compute_key(copy)
+    assert cache.compute_key(pdf) != cache.compute_key(other)
+
+
+@pytest.mark.parametrize("setting, value", [
+    ("CHUNK_SIZE", 123),
+    ("EMBEDDING_MODEL", "another-model"),
+    ("OCR_LANG", "deu"),
+    ("OCR_TESSERACT_CONFIG", "--psm 6"),
+    ("OCR_DPI", 150),
+    ("OCR_BINARIZE", True),
+    ("OCR_MIN_PAGE_CHARS", 1),
+    ("OCR_MIN_TEXT_QUALITY", 0.1),
+])
+def test_key_changes_with_pipeline_settings(cache, pdf, monkeypatch, setting, value):
+    before = cache.compute_key(pdf)
+
+    monkeypatch.setattr(config, setting, value)
+
+    assert cache.compute_key(pdf) != before
+
+
+def test_put_get_and_invalidate(cache):
+    cache.put("k", {"collection_name": "doc_a", "doc_id": None, "chunks": []})
+
+    assert cache.get("k")["collection_name"] == "doc_a"
+    cache.invalidate("k")
+    assert cache.get("k") is None
+
+
+def test_location_points_at_the_latest_entry(cache):
+    cache.put("old", {"collection_name": "corpus", "doc_id": "a"})
+    cache.put("new", {"collection_name": "corpus", "doc_id": "a"})
+
+    assert cache.for_location("corpus", "a")["cache_key"] == "new"
+    assert cache.for_location("corpus", "b") is None
+
+
+def test_unreadable_entry_is_a_miss(cache):
+    (config.INGEST_CACHE_DIR / "bad.json").write_text("{not json")
+
+    assert cache.get("bad") is None
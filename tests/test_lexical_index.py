@@ -0,0 +1,47 @@
+import pytest
+from services.lexical_index import BM25Index, reciprocal_rank_fusion, tokenize
+
+
+def test_tokenize_keeps_compound_identifiers_and_their_parts():
+    tokens = tokenize("See ISO-9001 section 4.2.1")
+
+    assert "iso-9001" in tokens
+    assert {"iso", "9001", "4.2.1", "4", "2", "1"} <= set(tokens)
+
+
+def test_search_ranks_exact_term_matches_first():
+    index = BM25Index()
+    index.add(["a", "b", "c"], [
+        "the warranty covers parts and labour",
+        "clause 4.2.1 limits liability",
+        "delivery terms and shipping",
+    ])
+
+    results = index.search("liability clause 4.2.1", n_results=3)
+
+    assert results[0][0] == "b"
+    assert [chunk_id for chunk_id, _ in results] == ["b"]
+
+
+def test_search_respects_id_filter():
+    index = BM25Index()
+    index.add(["doc1:a", "doc2:a"], ["shared term", "shared term"])
+
+    results = index.search("shared", n_results=5, id_filter=lambda chunk_id: chunk_id.startswith("doc2:"))
+
+    assert [chunk_id for chunk_id, _ in results] == ["doc2:a"]
+
+
+def test_reciprocal_rank_fusion_rewards_agreement():
+    fused = reciprocal_rank_fusion([(["x", "y", "z"], 1.0), (["y", "x", "w"], 1.0)], k=60)
+
+    ids = [chunk_id for chunk_id, _ in fused]
+    assert set(ids[:2]) == {"x", "y"}
+    assert ids.index("z") > 1 and ids.index("w") > 1
+
+
+def test_reciprocal_rank_fusion_applies_weights():
+    fused = reciprocal_rank_fusion([(["x"], 1.0), (["y"], 3.0)], k=60)
+
+    assert fused[0][0] == "y"
+    assert fused[0][1] == pytest.approx(3.0 / 61)
@@ -0,0 +1,87 @@
+import config
+from services.lexical_index import BM25Index
+
+DOCS = {f"id{i}": f"alpha beta gamma {i} word{i % 3}" for i in range(20)}
+
+
+def fresh_index(ids):
+    index = BM25Index()
+    index.add(ids, [DOCS[i] for i in ids])
+    return index
+
+
+def test_removed_chunks_are_not_returned_and_stats_match_a_rebuild():
+    ids = list(DOCS)
+    index = fresh_index(ids)
+    index.remove(ids[:3])
+
+    assert len(index) == 17
+    assert index.search("word1 gamma 7", 5) == fresh_index(ids[3:]).search("word1 gamma 7", 5)
+
+
+def test_tombstones_are_compacted_past_the_threshold():
+    ids = list(DOCS)
+    index = fresh_index(ids)
+
+    index.remove(ids[:4])
+    assert len(index.removed) == 4
+
+    index.remove(ids[4:10])
+    assert not index.removed
+    assert len(index.ids) == 10
+
+
+def test_readding_an_id_replaces_it():
+    index = BM25Index()
+    index.add(["a"], ["old text"])
+    index.add(["a"], ["new text"])
+
+    assert len(index) == 1
+    assert index.search("old", 5) == []
+    assert index.search("new", 5)[0][0] == "a"
+
+
+def test_load_replays_change_log_on_top_of_snapshot(tmp_path):
+    path = tmp_path / "c.json"
+    ids = list(DOCS)
+    index = fresh_index(ids[:5])
+    index.save(path)
+
+    for chunk_id in ids[5:]:
+        index.add([chunk_id], [DOCS[chunk_id]])
+        BM25Index.append_changes(path, [chunk_id], [DOCS[chunk_id]])
+    index.remove(ids[:3])
+    BM25Index.append_changes(path, [], [], removed=ids[:3])
+
+    loaded = BM25Index.load(path)
+
+    assert len(loaded) == len(index) == 17
+    assert loaded.search("word1 gamma 7", 5) == index.search("word1 gamma 7", 5)
+
+
+def test_damaged_last_log_line_is_skipped(tmp_path):
+    path = tmp_path / "c.json"
+    fresh_index(["id0"]).save(path)
+    BM25Index.append_changes(path, ["id1"], [DOCS["id1"]])
+    with open(BM25Index.log_path(path), "a") as file:
+        file.write('{"ids": ["id2"], "te')
+
+    loaded = BM25Index.load(path)
+
+    assert sorted(loaded.ids) == ["id0", "id1"]
+
+
+def test_snapshot_is_needed_once_log_outgrows_it(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, "LEXICAL_LOG_MIN_BYTES", 0)
+    path = tmp_path / "c.json"
+    index = fresh_index(["id0"])
+    index.save(path)
+    assert not BM25Index.needs_snapshot(path)
+
+    for chunk_id in list(DOCS)[1:]:
+        BM25Index.append_changes(path, [chunk_id], [DOCS[chunk_id]])
+    assert BM25Index.needs_snapshot(path)
+
+    index.save(path)
+    assert not BM25Index.exists(str(path) + ".missing")
+    assert not (tmp_path / "c.json.log").exists()
@@ -0,0 +1,90 @@
+import asyncio
+import json
+import httpx
+import pytest
+import config
+from services.llm_service import LLMService, LLMStreamError
+
+
+def ollama_lines(*objects):
+    return "\n".join(json.dumps(o) for o in objects).encode()
+
+
+@pytest.fixture
+def llm(isolated_storage):
+    return LLMService()
+
+
+def use_transport(llm, handler):
+    """Route the service's pooled client for the running loop through a mock transport."""
+    llm._clients[asyncio.get_running_loop()] = httpx.AsyncClient(
+        base_url="http://ollama", transport=httpx.MockTransport(handler)
+    )
+
+
+async def collect(stream):
+    return [token async for token in stream]
+
+
+def test_answer_streams_tokens_in_order(llm):
+    def handler(request):
+        return httpx.Response(200, content=ollama_lines(
+            {"response": "Hel"}, {"response": "lo"}, {"response": "", "done": True}
+        ))
+
+    async def run():
+        use_transport(llm, handler)
+        tokens = await collect(llm.answer_question_stream("q", [{"text": "context"}]))
+        await llm.aclose()
+        return tokens
+
+    assert asyncio.run(run()) == ["Hel", "lo"]
+
+
+def test_mid_stream_error_is_raised_with_the_partial_answer(llm):
+    def handler(request):
+        return httpx.Response(200, content=ollama_lines({"response": "Par"}, {"response": "tial"}, {"error": "oom"}))
+
+    async def run():
+        use_transport(llm, handler)
+        tokens = []
+        with pytest.raises(LLMStreamError) as error:
+            async for token in llm.answer_question_stream("q", [{"text": "context"}]):
+                tokens.append(token)
+        await llm.aclose()
+        return tokens, error.value
+
+    tokens, error = asyncio.run(run())
+    assert tokens == ["Par", "tial"]
+    assert error.partial == "Partial"
+    assert "oom" in str(error)
+
+
+def test_http_error_status_is_not_returned_as_answer_text(llm):
+    async def run():
+        use_transport(llm, lambda request: httpx.Response(500, content=b"boom"))
+        with pytest.raises(LLMStreamError) as error:
+            await collect(llm.answer_question_stream("q", [{"text": "context"}]))
+        await llm.aclose()
+        return error.value
+
+    error = asyncio.run(run())
+    assert error.partial == ""
+    assert "500" in str(error)
+
+
+def test_each_event_loop_gets_its_own_client_and_aclose_closes_them(llm):
+    async def get_client():
+        return llm._get_client()
+
+    first = asyncio.run(get_client())
+    assert asyncio.run(get_client()) is not first
+
+    async def close():
+        client = llm._get_client()
+        await llm.aclose()
+        return client
+
+    client = asyncio.run(close())
+    assert client.is_closed
+    assert len(llm._clients) == 0
@@ -0,0 +1,77 @@
+import asyncio
+import pytest
+from PIL import Image
+import config
+from services import ocr_service
+from services.ocr_service import OCRService, to_page_buffer
+
+
+@pytest.fixture
+def tesseract_calls(monkeypatch):
+    """Replace Tesseract with a stub that records the pages it is given."""
+    calls = []
+
+    def fake_ocr(buffer, lang, tesseract_config, timeout, options):
+        calls.append(buffer.data)
+        return f"text of {len(calls)}"
+
+    monkeypatch.setattr(ocr_service, "_ocr_page_buffer", fake_ocr)
+    return calls
+
+
+@pytest.fixture
+def ocr(isolated_storage, monkeypatch):
+    monkeypatch.setattr(config, "OCR_CACHE_ENABLED", True)
+    monkeypatch.setattr(config, "OCR_PARALLEL", False)
+    return OCRService()
+
+
+def page(shade, size=(40, 40)):
+    return Image.new("L", size, shade)
+
+
+def test_cache_key_follows_pixels_and_settings(ocr):
+    key = ocr._cache_key(to_page_buffer(page(10), 300))
+
+    assert ocr._cache_key(to_page_buffer(page(10), 300)) == key
+    assert ocr._cache_key(to_page_buffer(page(11), 300)) != key
+    assert ocr._cache_key(to_page_buffer(page(10), 200)) != key
+    assert ocr._cache_key(to_page_buffer(page(10, (40, 41)), 300)) != key
+
+    ocr.lang = "deu"
+    ocr._settings_key = None
+    assert ocr._cache_key(to_page_buffer(page(10), 300)) != key
+
+
+def test_identical_pages_are_ocrd_once(ocr, tesseract_calls):
+    text = asyncio.run(ocr.process_images({1: page(10), 2: page(10), 3: page(20)}))
+
+    assert len(tesseract_calls) == 2
+    assert text[1] == text[2]
+    assert text[3] != text[1]
+
+
+def test_cache_persists_across_instances(ocr, tesseract_calls):
+    asyncio.run(ocr.process_images({1: page(10)}))
+
+    again = OCRService()
+    text = asyncio.run(again.process_images({1: page(10)}))
+
+    assert len(tesseract_calls) == 1
+    assert text[1] == "text of 1"
+
+
+def test_disabled_cache_always_runs_tesseract(isolated_storage, monkeypatch, tesseract_calls):
+    monkeypatch.setattr(config, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "OCR_PARALLEL", False)
+    service = OCRService()
+
+    asyncio.run(service.process_images({1: page(10), 2: page(10)}))
+
+    assert service.cache is None
+    assert len(tesseract_calls) == 2
+
+
+def test_single_image_extraction_uses_the_cache(ocr, tesseract_calls):
+    assert ocr._extract_text_from_image(page(30)) == ocr._extract_text_from_image(page(30))
+    assert len(tesseract_calls) == 1
@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from PIL import Image
+import config
+from services.ocr_service import OCRService
+
+
+@pytest.fixture
+def ocr(monkeypatch):
+    monkeypatch.setattr(config, "OCR_CACHE_ENABLED", False)
+    monkeypatch.setattr(config, "OCR_PARALLEL", True)
+    monkeypatch.setattr(config, "OCR_WORKERS", 1)
+    return OCRService()
+
+
+def test_cancelling_parallel_ocr_cancels_outstanding_pages(ocr, monkeypatch):
+    started, cancelled = [], []
+
+    async def slow_page(page_num, buffer):
+        started.append(page_num)
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(page_num)
+            raise
+        return "never"
+
+    monkeypatch.setattr(ocr, "_ocr_page", slow_page)
+    pages = [(i, Image.new("L", (20, 20), i)) for i in range(6)]
+
+    async def run():
+        task = asyncio.ensure_future(ocr.process_images(pages))
+        while len(started) < 2:
+            await asyncio.sleep(0.01)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+
+    # Two pages per worker were in flight; both were cancelled, none were left running
+    assert sorted(cancelled) == sorted(started) == [0, 1]
+
+
+def test_parallel_ocr_returns_pages_in_order(ocr, monkeypatch):
+    async def fake_page(page_num, buffer):
+        await asyncio.sleep(0.01 * (5 - page_num))
+        return f"page {page_num}"
+
+    monkeypatch.setattr(ocr, "_ocr_page", fake_page)
+    done = []
+
+    text = asyncio.run(ocr.process_images(
+        [(i, Image.new("L", (20, 20), i)) for i in range(5)], progress=done.append
+    ))
+
+    assert list(text) == [0, 1, 2, 3, 4]
+    assert text[3] == "page 3"
+    assert sorted(done) == [0, 1, 2, 3, 4]
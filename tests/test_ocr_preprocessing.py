@@ -0,0 +1,63 @@
+import pickle
+from PIL import Image, ImageDraw
+from services.ocr_service import PageBuffer, _otsu_threshold, preprocess_page, to_page_buffer
+
+NO_PREPROCESSING = {"clean_dpi": None, "deskew": False, "binarize": False}
+
+
+def text_page(size=(600, 800), noise=False):
+    """White page with black text-like bars; optional mid-grey speckle."""
+    image = Image.new("L", size, 255)
+    draw = ImageDraw.Draw(image)
+    for y in range(50, size[1] - 50, 40):
+        draw.rectangle([40, y, size[0] - 40, y + 12], fill=0)
+    if noise:
+        for x in range(0, size[0], 2):
+            for y in range(0, size[1], 2):
+                image.putpixel((x, y), 128)
+    return image
+
+
+def test_page_buffer_holds_raw_grayscale_pixels():
+    image = Image.new("RGB", (4, 3), (255, 0, 0))
+
+    buffer = to_page_buffer(image, dpi=300)
+
+    assert isinstance(buffer, PageBuffer)
+    assert (buffer.mode, buffer.size, buffer.dpi) == ("L", (4, 3), 300)
+    restored = Image.frombytes(buffer.mode, buffer.size, buffer.data)
+    assert list(restored.getdata()) == list(image.convert("L").getdata())
+
+
+def test_page_buffer_pickles_without_encoding():
+    buffer = to_page_buffer(text_page(), dpi=300)
+    assert pickle.loads(pickle.dumps(buffer)) == buffer
+
+
+def test_clean_pages_are_downscaled_to_clean_dpi():
+    image = preprocess_page(text_page(), dpi=300, options=dict(NO_PREPROCESSING, clean_dpi=150))
+    assert image.size == (300, 400)
+
+
+def test_noisy_pages_keep_full_resolution():
+    image = preprocess_page(text_page(noise=True), dpi=300, options=dict(NO_PREPROCESSING, clean_dpi=150))
+    assert image.size == (600, 800)
+
+
+def test_binarize_leaves_only_black_and_white():
+    page = text_page(noise=True)
+    image = preprocess_page(page, dpi=300, options=dict(NO_PREPROCESSING, binarize=True))
+    assert set(image.getdata()) <= {0, 255}
+
+
+def test_otsu_threshold_separates_two_levels():
+    histogram = [0] * 256
+    histogram[40] = 1000
+    histogram[220] = 3000
+    assert 40 <= _otsu_threshold(histogram) < 220
+
+
+def test_deskew_leaves_straight_pages_unrotated():
+    page = text_page()
+    image = preprocess_page(page, dpi=300, options=dict(NO_PREPROCESSING, deskew=True))
+    assert image.size == page.size
@@ -0,0 +1,76 @@
+import asyncio
+import threading
+import time
+import pytest
+from PIL import Image
+import config
+from services import ocr_service
+from services.ocr_service import OCRService
+
+
+@pytest.fixture
+def sequential_ocr(isolated_storage, monkeypatch):
+    monkeypatch.setattr(config, "OCR_PARALLEL", False)
+    return OCRService()
+
+
+def test_sequential_ocr_runs_off_the_event_loop(sequential_ocr, monkeypatch):
+    loop_thread = threading.get_ident()
+    ocr_threads, render_threads = [], []
+
+    def fake_tesseract(buffer, lang, tesseract_config, timeout, options):
+        ocr_threads.append(threading.get_ident())
+        time.sleep(0.05)
+        return f"{buffer.size[0]} wide"
+
+    def pages():
+        for page_num in range(3):
+            render_threads.append(threading.get_ident())
+            yield page_num, Image.new("L", (10 + page_num, 10), 255)
+
+    monkeypatch.setattr(ocr_service, "_ocr_page_buffer", fake_tesseract)
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticking = asyncio.ensure_future(ticker())
+        done = []
+        text = await sequential_ocr.process_images(pages(), progress=done.append)
+        ticking.cancel()
+        return text, done, ticks
+
+    text, done, ticks = asyncio.run(run())
+
+    assert text == {0: "10 wide", 1: "11 wide", 2: "12 wide"}
+    assert done == [0, 1, 2]
+    assert loop_thread not in ocr_threads + render_threads
+    # The loop kept running while Tesseract worked
+    assert ticks >= 10
+
+
+def test_sequential_ocr_isolates_page_failures(sequential_ocr, monkeypatch):
+    def flaky_tesseract(buffer, lang, tesseract_config, timeout, options):
+        if buffer.size[0] == 11:
+            raise RuntimeError("tesseract crashed")
+        return "ok"
+
+    monkeypatch.setattr(ocr_service, "_ocr_page_buffer", flaky_tesseract)
+    pages = {i: Image.new("L", (10 + i, 10), 255) for i in range(3)}
+
+    assert asyncio.run(sequential_ocr.process_images(pages)) == {0: "ok", 1: "", 2: "ok"}
+
+
+def test_worker_pool_does_not_fork_a_threaded_process(isolated_storage, monkeypatch):
+    monkeypatch.setattr(config, "OCR_WORKERS", 1)
+    ocr = OCRService()
+    try:
+        executor = ocr._get_executor()
+        assert executor._mp_context.get_start_method() in ("forkserver", "spawn")
+    finally:
+        ocr.shutdown()
@@ -0,0 +1,100 @@
+import numpy as np
+import pytest
+import config
+from services.vector_store import NumpyVectorStore, quantization_report, quantize
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def make_store(n, dtype, path=None, **kwargs):
+    store = NumpyVectorStore("test", path, dtype=dtype, **kwargs)
+    ids = [f"c{i}" for i in range(n)]
+    store.add(ids, random_vectors(n), ["" for _ in ids], [{} for _ in ids])
+    return store
+
+
+def test_int8_codes_reconstruct_within_one_step():
+    vectors = random_vectors(100)
+
+    codes, scales = quantize(vectors, "int8")
+
+    assert codes.dtype == np.int8
+    assert np.abs(codes * scales - vectors).max() <= scales.max() / 2 + 1e-6
+
+
+def test_unknown_dtype_is_rejected():
+    with pytest.raises(ValueError):
+        quantize(random_vectors(2), "int4")
+
+
+@pytest.mark.parametrize("dtype", ["float16", "int8"])
+def test_rescoring_recovers_exact_top_k(dtype):
+    exact = make_store(200, "float32")
+    quantized = make_store(200, dtype, rescore_factor=4)
+
+    for query in random_vectors(10, seed=3):
+        assert [h["id"] for h in quantized.query(query, 5)] == [h["id"] for h in exact.query(query, 5)]
+    assert quantized.index_bytes() < exact.index_bytes()
+
+
+def test_quantized_store_reloads_with_its_codes(tmp_path):
+    make_store(50, "int8", path=tmp_path / "store")
+
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="int8")
+
+    assert loaded.quantized is not None and loaded.quantized.dtype == np.int8
+    assert loaded.query(random_vectors(50)[4], 1)[0]["id"] == "c4"
+
+
+def test_quantization_report_compares_every_setting():
+    vectors = random_vectors(100)
+    ids = [f"c{i}" for i in range(100)]
+
+    report = quantization_report(ids, vectors, random_vectors(5, seed=1), k=5)
+
+    settings = {(row["dtype"], row["rescore_factor"]) for row in report["results"]}
+    assert ("float32", 0) in settings and ("int8", 0) in settings and ("float16", 0) in settings
+    baseline = next(row for row in report["results"] if row["dtype"] == "float32")
+    assert baseline["recall_at_k"] == 1.0
+    assert all(0.0 <= row["recall_at_k"] <= 1.0 for row in report["results"])
+
+
+def test_int8_scales_are_fixed_after_calibration(tmp_path, monkeypatch):
+    monkeypatch.setattr(NumpyVectorStore, "CALIBRATION_ROWS", 20)
+    store = make_store(20, "int8", path=tmp_path / "store")
+    scales, codes = store.scales.copy(), np.array(store.quantized)
+    generation = store.generation
+
+    store.add([f"n{i}" for i in range(30)], random_vectors(30, seed=2) * 3, [""] * 30, [{}] * 30)
+
+    assert store.generation == generation
+    assert np.array_equal(store.scales, scales)
+    assert np.array_equal(store.quantized[:20], codes)
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="int8")
+    assert np.array_equal(loaded.scales, scales)
+    assert loaded.query(random_vectors(30, seed=2)[12], 1)[0]["id"] == "n12"
+
+
+def test_dtype_change_rewrites_the_codes(tmp_path):
+    make_store(50, "int8", path=tmp_path / "store")
+
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="float16")
+
+    assert loaded.quantized.dtype == np.float16
+    assert loaded.query(random_vectors(50)[9], 1)[0]["id"] == "c9"
+
+
+def test_auto_backend_keeps_a_quantized_corpus_exact(vector_db, monkeypatch):
+    monkeypatch.setattr(config, "VECTOR_BACKEND", "auto")
+    monkeypatch.setattr(config, "VECTOR_STORAGE_DTYPE", "int8")
+    monkeypatch.setattr(config, "EXACT_BACKEND_MAX_VECTORS", 1)
+    vector_db.create_collection(config.CORPUS_COLLECTION)
+    documents = [{"text": text, "metadata": {}} for text in ("alpha beta", "gamma delta", "epsilon")]
+
+    assert vector_db.add_documents(config.CORPUS_COLLECTION, documents, doc_id="doc")
+
+    store = vector_db.get_store(config.CORPUS_COLLECTION)
+    assert isinstance(store, NumpyVectorStore) and store.dtype == "int8"
+    assert store.count() == 3
@@ -0,0 +1,68 @@
+import threading
+import numpy as np
+import pytest
+from services.query_batcher import QueryEmbeddingBatcher
+
+
+class RecordingEmbeddings:
+    def __init__(self, fail=False):
+        self.batches = []
+        self.fail = fail
+
+    def create_embeddings(self, texts):
+        self.batches.append(list(texts))
+        if self.fail:
+            raise RuntimeError("model unavailable")
+        return np.array([[len(t), i] for i, t in enumerate(texts)], dtype=np.float32)
+
+
+def test_concurrent_queries_share_one_encode_call():
+    embeddings = RecordingEmbeddings()
+    batcher = QueryEmbeddingBatcher(embeddings, window_ms=200, max_batch_size=4)
+    try:
+        futures = [batcher.submit(text) for text in ["a", "bb", "ccc", "dddd"]]
+        vectors = [future.result(timeout=5) for future in futures]
+    finally:
+        batcher.close()
+
+    assert embeddings.batches == [["a", "bb", "ccc", "dddd"]]
+    assert [v[0] for v in vectors] == [1, 2, 3, 4]
+
+
+def test_each_caller_gets_its_own_vector():
+    embeddings = RecordingEmbeddings()
+    batcher = QueryEmbeddingBatcher(embeddings, window_ms=50, max_batch_size=32)
+    results = {}
+
+    def ask(text):
+        results[text] = batcher.embed(text)
+
+    threads = [threading.Thread(target=ask, args=("q" * n,)) for n in range(1, 9)]
+    try:
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(timeout=5)
+    finally:
+        batcher.close()
+
+    assert {text: vector[0] for text, vector in results.items()} == {"q" * n: n for n in range(1, 9)}
+
+
+def test_encoding_errors_reach_every_caller():
+    batcher = QueryEmbeddingBatcher(RecordingEmbeddings(fail=True), window_ms=50, max_batch_size=2)
+    try:
+        futures = [batcher.submit("a"), batcher.submit("b")]
+        for future in futures:
+            with pytest.raises(RuntimeError, match="model unavailable"):
+                future.result(timeout=5)
+    finally:
+        batcher.close()
+
+
+def test_closed_batcher_rejects_new_queries():
+    batcher = QueryEmbeddingBatcher(RecordingEmbeddings(), window_ms=1)
+    batcher.close()
+
+    with pytest.raises(RuntimeError):
+        batcher.submit("late")
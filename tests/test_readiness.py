@@ -0,0 +1,74 @@
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+import config
+import main_app
+from ui import gradio_app
+from ui.gradio_app import GradioInterface
+
+
+@pytest.fixture
+def interface(monkeypatch):
+    """A fresh interface behind the app, with the GC loop and warm-up encode off."""
+    monkeypatch.setattr(config, "COLLECTION_GC_INTERVAL", 0)
+    monkeypatch.setattr(config, "WARMUP_ON_STARTUP", True)
+    monkeypatch.setattr(config, "WARMUP_ENCODE", False)
+    interface = GradioInterface()
+    monkeypatch.setattr(main_app, "gradio_interface", interface)
+    return interface
+
+
+def wait_for_status(client, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while True:
+        response = client.get("/readyz")
+        if response.json()["status"] == status or time.monotonic() > deadline:
+            return response
+        time.sleep(0.01)
+
+
+def test_readyz_is_503_until_warm_up_finishes(interface):
+    loading = threading.Event()
+    release = threading.Event()
+
+    def load_services():
+        loading.set()
+        release.wait(timeout=5)
+
+    interface.load_services = load_services
+    with TestClient(main_app.app) as client:
+        assert loading.wait(timeout=5)
+        response = client.get("/readyz")
+        assert response.status_code == 503
+        assert response.json()["status"] == gradio_app.LOADING
+        # Liveness does not wait for warm-up
+        assert client.get("/healthz").status_code == 200
+
+        release.set()
+        response = wait_for_status(client, gradio_app.READY)
+
+    assert response.status_code == 200
+    assert response.json()["status"] == gradio_app.READY
+    assert response.json()["seconds"] is not None
+
+
+def test_failed_warm_up_is_reported_and_retried(interface):
+    attempts = []
+
+    def load_services():
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise RuntimeError("model download failed")
+
+    interface.load_services = load_services
+    with TestClient(main_app.app) as client:
+        response = wait_for_status(client, gradio_app.WARMUP_FAILED)
+        assert response.status_code == 503
+        assert response.json()["error"] == "model download failed"
+
+    # The next request that needs the services starts warm-up again
+    asyncio.run(interface.ready())
+    assert interface.is_ready
+    assert len(attempts) == 2
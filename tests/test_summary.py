@@ -0,0 +1,85 @@
+import asyncio
+import pytest
+import config
+from services.llm_service import LLMService
+
+
+@pytest.fixture
+def llm(isolated_storage):
+    return LLMService()
+
+
+def paragraphs(count, start=0):
+    return [f"Paragraph {i} describes topic {i} with some supporting detail. " * 6 for i in range(start, start + count)]
+
+
+def test_groups_respect_budget_and_keep_every_chunk(llm):
+    chunks = paragraphs(60)
+    groups = llm._group_chunks(chunks, budget=400)
+    assert "\n\n".join(groups) == "\n\n".join(chunks)
+    for group in groups:
+        pieces = group.split("\n\n")
+        assert len(pieces) == 1 or llm._estimate_tokens(group) <= 400 + len(pieces)
+
+
+def test_inserting_a_chunk_leaves_other_groups_unchanged(llm):
+    chunks = paragraphs(80)
+    before = llm._group_chunks(chunks, budget=400)
+    edited = chunks[:40] + ["A brand new paragraph inserted in the middle of the document. " * 5] + chunks[40:]
+    after = llm._group_chunks(edited, budget=400)
+
+    reused = set(before) & set(after)
+    assert len(before) > 4
+    assert len(reused) >= len(before) - 2
+
+
+def test_empty_summary_is_raised_and_not_cached(llm, monkeypatch):
+    replies = iter(["", "A real summary"])
+
+    async def complete(prompt):
+        return next(replies)
+
+    monkeypatch.setattr(llm, "_complete", complete)
+
+    async def summarize():
+        return await llm._cached_summary(config.SUMMARY_MAP_PROMPT_TEMPLATE, "some text", asyncio.Semaphore(1))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(summarize())
+    assert asyncio.run(summarize()) == "A real summary"
+    # Served from the cache now; _complete has no replies left
+    assert asyncio.run(summarize()) == "A real summary"
+
+
+def test_oversized_partials_are_truncated_so_no_prompt_exceeds_the_context(llm, monkeypatch):
+    monkeypatch.setattr(config, "SUMMARY_CONTEXT_TOKENS", 400)
+    monkeypatch.setattr(config, "SUMMARY_MAP_TOKENS", 200)
+    prompts = []
+
+    async def verbose_complete(prompt):
+        prompts.append(prompt)
+        # Every partial summary comes back nearly as large as the whole context
+        return "word " * 300
+
+    monkeypatch.setattr(llm, "_complete", verbose_complete)
+
+    summary = asyncio.run(llm._map_reduce_summary(paragraphs(12)))
+
+    assert summary.strip()
+    template_tokens = max(llm._estimate_tokens(template) for template in (
+        config.SUMMARIZATION_PROMPT_TEMPLATE,
+        config.SUMMARY_MAP_PROMPT_TEMPLATE,
+        config.SUMMARY_REDUCE_PROMPT_TEMPLATE
+    ))
+    final = [p for p in prompts if p.startswith(config.SUMMARIZATION_PROMPT_TEMPLATE[:40])]
+    assert len(final) == 1
+    for prompt in prompts:
+        assert llm._estimate_tokens(prompt) <= config.SUMMARY_CONTEXT_TOKENS + template_tokens
+
+
+def test_truncate_tokens_cuts_at_a_word_boundary(llm):
+    text = "alpha beta gamma delta " * 50
+    cut = llm._truncate_tokens(text, 20)
+    assert llm._estimate_tokens(cut) <= 20
+    assert text.startswith(cut) and cut.split()[-1] in ("alpha", "beta", "gamma", "delta")
+    assert llm._truncate_tokens("short", 20) == "short"
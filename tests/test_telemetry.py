@@ -0,0 +1,85 @@
+import asyncio
+import time
+import pytest
+from fastapi.testclient import TestClient
+from prometheus_client import REGISTRY
+import config
+import main_app
+from services import telemetry
+
+
+def histogram_sum(stage):
+    return REGISTRY.get_sample_value("docqa_stage_seconds_sum", {"stage": stage}) or 0.0
+
+
+def test_spans_nest_into_the_active_trace():
+    with telemetry.trace("question") as trace:
+        with telemetry.span("retrieve"):
+            pass
+        with pytest.raises(ValueError):
+            with telemetry.span("generate"):
+                raise ValueError("boom")
+
+    data = trace.to_dict()
+    assert [s["stage"] for s in data["spans"]] == ["retrieve", "generate"]
+    assert data["spans"][1]["error"] == "ValueError"
+    assert data["duration_ms"] is not None
+    assert telemetry.get_trace(trace.id)["id"] == trace.id
+
+
+def test_record_uses_explicit_duration_for_trace_and_histogram():
+    before = histogram_sum("test_queue_wait")
+    trace = telemetry.Trace("ocr")
+    started = time.perf_counter() - 5.0
+    telemetry.record("test_queue_wait", started, duration=0.25, trace=trace)
+
+    assert trace.breakdown() == {"test_queue_wait": 250.0}
+    assert histogram_sum("test_queue_wait") - before == pytest.approx(0.25)
+
+
+def test_record_with_explicit_trace_works_outside_its_context():
+    trace = telemetry.Trace("question")
+
+    async def generator():
+        # Resumed from a task whose context never activated the trace
+        yield
+        telemetry.record("llm_first_token", time.perf_counter(), duration=0.1, trace=trace)
+
+    async def consume():
+        async for _ in generator():
+            pass
+
+    with telemetry.activate(None):
+        asyncio.run(consume())
+    assert "llm_first_token" in trace.breakdown()
+
+
+def test_record_without_trace_only_observes_the_histogram():
+    before = histogram_sum("test_untraced")
+    telemetry.record("test_untraced", time.perf_counter(), duration=0.5)
+    assert histogram_sum("test_untraced") - before == pytest.approx(0.5)
+    assert telemetry.current_trace() is None
+
+
+def test_recent_traces_never_returns_everything_for_a_zero_limit():
+    for _ in range(3):
+        with telemetry.trace("question"):
+            pass
+    newest = telemetry.recent_traces(1)
+
+    assert len(newest) == 1
+    assert telemetry.recent_traces(0) == newest
+    assert telemetry.recent_traces(-5) == newest
+
+
+def test_trace_routes_require_the_admin_token(monkeypatch):
+    monkeypatch.setattr(config, "ADMIN_TOKEN", "secret")
+    client = TestClient(main_app.app)
+    with telemetry.trace("question") as trace:
+        pass
+
+    assert client.get("/traces").status_code == 401
+    assert client.get(f"/traces/{trace.id}").status_code == 401
+    headers = {"X-Admin-Token": "secret"}
+    assert client.get("/traces", params={"limit": 1}, headers=headers).json()[0]["id"] == trace.id
+    assert client.get(f"/traces/{trace.id}", headers=headers).json()["id"] == trace.id
@@ -0,0 +1,108 @@
+import pytest
+import config
+
+
+def chunks(*texts):
+    result, offset = [], 0
+    for text in texts:
+        result.append({"text": text, "metadata": {"start_idx": offset, "end_idx": offset + len(text)}})
+        offset += len(text) + 1
+    return result
+
+
+def stored_texts(vector_db, collection, doc_id=None):
+    where = {"doc_id": doc_id} if doc_id else None
+    return sorted(entry["text"] for entry in vector_db.get_store(collection).get(where=where))
+
+
+def test_first_sync_adds_every_chunk(vector_db):
+    vector_db.create_collection("doc")
+
+    stats = vector_db.sync_document("doc", chunks("alpha one", "beta two", "gamma three"))
+
+    assert stats == {"chunks": 3, "reused": 0, "updated": 0, "added": 3, "removed": 0}
+    assert stored_texts(vector_db, "doc") == ["alpha one", "beta two", "gamma three"]
+
+
+def test_resync_embeds_only_new_chunks(vector_db, fake_embeddings):
+    vector_db.create_collection("doc")
+    vector_db.sync_document("doc", chunks("alpha one", "beta two", "gamma three"))
+    fake_embeddings.calls.clear()
+
+    stats = vector_db.sync_document("doc", chunks("alpha one", "beta changed", "gamma three"))
+
+    assert stats["reused"] == 2
+    assert stats["added"] == 1
+    assert stats["removed"] == 1
+    assert fake_embeddings.calls == [["beta changed"]]
+    assert stored_texts(vector_db, "doc") == ["alpha one", "beta changed", "gamma three"]
+
+
+def test_moved_chunks_get_their_metadata_refreshed(vector_db):
+    vector_db.create_collection("doc")
+    vector_db.sync_document("doc", chunks("alpha one", "beta two"))
+
+    stats = vector_db.sync_document("doc", chunks("inserted first", "alpha one", "beta two"))
+
+    assert stats["updated"] == 2
+    alpha = [e for e in vector_db.get_store("doc").get() if e["text"] == "alpha one"][0]
+    assert alpha["metadata"]["start_idx"] == len("inserted first") + 1
+
+
+def test_repeated_texts_get_distinct_ids(vector_db):
+    vector_db.create_collection("doc")
+
+    stats = vector_db.sync_document("doc", chunks("same text", "same text"))
+
+    assert stats["added"] == 2
+    assert vector_db.get_store("doc").count() == 2
+
+
+def test_sync_is_scoped_to_one_document_in_a_shared_collection(vector_db):
+    vector_db.create_collection(config.CORPUS_COLLECTION)
+    vector_db.sync_document(config.CORPUS_COLLECTION, chunks("shared text", "only a"), doc_id="a")
+    vector_db.sync_document(config.CORPUS_COLLECTION, chunks("shared text", "only b"), doc_id="b")
+
+    vector_db.sync_document(config.CORPUS_COLLECTION, chunks("shared text"), doc_id="a")
+
+    assert stored_texts(vector_db, config.CORPUS_COLLECTION, "a") == ["shared text"]
+    assert stored_texts(vector_db, config.CORPUS_COLLECTION, "b") == ["only b", "shared text"]
+
+
+def test_failed_sync_keeps_the_previous_version(vector_db, monkeypatch):
+    vector_db.create_collection("doc")
+    vector_db.sync_document("doc", chunks("alpha one", "beta two"))
+    store = vector_db.get_store("doc")
+
+    def fail(ids, metadatas):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(store, "update_metadata", fail)
+
+    assert vector_db.sync_document("doc", chunks("new first", "alpha one")) is None
+    assert stored_texts(vector_db, "doc") == ["alpha one", "beta two"]
+    # The staged chunk is gone from the lexical index as well
+    assert [chunk_id for chunk_id, _ in vector_db._get_lexical_index("doc").search("new first", 5)] == []
+
+
+def test_lexical_index_follows_the_sync(vector_db):
+    vector_db.create_collection("doc")
+    vector_db.sync_document("doc", chunks("alpha one", "beta two"))
+
+    vector_db.sync_document("doc", chunks("alpha one", "delta four"))
+
+    index = vector_db._get_lexical_index("doc")
+    assert index.search("beta", 5) == []
+    assert len(index.search("delta", 5)) == 1
+
+
+def test_precomputed_embeddings_are_used_for_added_chunks(vector_db, fake_embeddings):
+    vector_db.create_collection("doc")
+    new = chunks("alpha one", "beta two")
+    embeddings = fake_embeddings.create_embeddings([c["text"] for c in new])
+    fake_embeddings.calls.clear()
+
+    stats = vector_db.sync_document("doc", new, embeddings=embeddings)
+
+    assert stats["added"] == 2
+    assert fake_embeddings.calls == []
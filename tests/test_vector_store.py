@@ -0,0 +1,166 @@
+import json
+import numpy as np
+import pytest
+from services.vector_store import NumpyVectorStore, matches_where
+
+
+def random_vectors(n, dim=16, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def make_store(n=50, path=None, dtype="float32", **kwargs):
+    store = NumpyVectorStore("test", path, dtype=dtype, **kwargs)
+    ids = [f"c{i}" for i in range(n)]
+    store.add(ids, random_vectors(n), [f"text {i}" for i in ids],
+              [{"doc_id": f"d{i % 3}", "page": i} for i in range(n)])
+    return store
+
+
+def test_query_returns_exact_nearest_neighbour_first():
+    store = make_store()
+    target = random_vectors(50)[7]
+
+    hits = store.query(target, n_results=3)
+
+    assert hits[0]["id"] == "c7"
+    assert hits[0]["distance"] == pytest.approx(0.0, abs=1e-5)
+    assert [h["distance"] for h in hits] == sorted(h["distance"] for h in hits)
+
+
+def test_query_applies_where_filter():
+    store = make_store()
+
+    hits = store.query(random_vectors(1, seed=9)[0], n_results=50, where={"doc_id": {"$in": ["d1"]}})
+
+    assert hits
+    assert all(hit["metadata"]["doc_id"] == "d1" for hit in hits)
+    assert len(hits) == len([i for i in range(50) if i % 3 == 1])
+
+
+def test_matches_where_rejects_unsupported_operators():
+    assert matches_where({"a": 1}, {"a": {"$eq": 1}})
+    assert not matches_where({"a": 1}, {"a": 2})
+    with pytest.raises(ValueError):
+        matches_where({"a": 1}, {"a": {"$gt": 0}})
+
+
+def test_duplicate_ids_are_rejected():
+    store = make_store(5)
+
+    with pytest.raises(ValueError):
+        store.add(["c1"], random_vectors(1), ["dup"], [{}])
+
+
+def test_delete_removes_rows_and_keeps_the_rest_aligned():
+    store = make_store()
+    store.delete(["c0", "c7", "missing"])
+
+    assert store.count() == 48
+    assert store.get(ids=["c7"]) == []
+    hit = store.query(random_vectors(50)[8], n_results=1)[0]
+    assert hit["id"] == "c8"
+    assert hit["text"] == "text c8"
+
+
+def test_update_metadata_replaces_records():
+    store = make_store(5)
+    store.update_metadata(["c2"], [{"doc_id": "new"}])
+
+    assert store.get(where={"doc_id": "new"})[0]["id"] == "c2"
+
+
+def test_persisted_store_round_trips(tmp_path):
+    store = make_store(path=tmp_path / "store")
+    store.delete(["c3"])
+
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="float32")
+
+    assert NumpyVectorStore.exists(tmp_path / "store")
+    assert loaded.count() == 49
+    assert loaded.query(random_vectors(50)[10], n_results=1)[0]["id"] == "c10"
+
+
+
+def test_appends_write_only_the_new_rows(tmp_path):
+    store = make_store(path=tmp_path / "store")
+    vectors_path = store._file("vectors")
+    before = vectors_path.read_bytes()
+
+    store.add(["n0", "n1"], random_vectors(2, seed=5), ["a", "b"], [{}, {}])
+    store.delete(["c1"])
+
+    after = vectors_path.read_bytes()
+    assert after[:len(before)] == before
+    assert len(after) == len(before) + 2 * 16 * 4
+    assert store.generation == 0
+    assert store.count() == 51
+
+
+def test_doc_id_filters_use_the_row_index():
+    store = make_store()
+    store._iter_records = None  # any metadata scan would fail
+
+    rows = store._candidates({"doc_id": {"$in": ["d1", "missing"]}})
+
+    assert rows.tolist() == [i for i in range(50) if i % 3 == 1]
+
+
+def test_compaction_drops_deleted_rows(tmp_path):
+    store = make_store(path=tmp_path / "store")
+    store.delete([f"c{i}" for i in range(0, 50, 2)])
+
+    assert store.generation == 1
+    assert len(store.vectors) == 25
+    assert sorted(p.name for p in (tmp_path / "store").iterdir()) == [
+        "manifest.json", "records.1.jsonl", "vectors.1.f32"
+    ]
+    assert store.query(random_vectors(50)[11], n_results=1)[0]["id"] == "c11"
+    assert [hit["id"] for hit in store.get(where={"doc_id": "d0"})] == [f"c{i}" for i in range(3, 50, 6)]
+
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="float32")
+    assert loaded.count() == 25
+    assert loaded.get(ids=["c11"])[0]["text"] == "text c11"
+
+
+def test_metadata_updates_survive_a_reload(tmp_path):
+    store = make_store(path=tmp_path / "store")
+    store.update_metadata(["c4"], [{"doc_id": "moved"}])
+
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="float32")
+
+    assert [hit["id"] for hit in loaded.get(where={"doc_id": "moved"})] == ["c4"]
+    assert "c4" not in [hit["id"] for hit in loaded.get(where={"doc_id": "d1"})]
+
+
+def test_torn_write_is_discarded_on_load(tmp_path):
+    store = make_store(path=tmp_path / "store")
+    # A crash after the vectors were written but mid-way through the records
+    with open(store._file("vectors"), "ab") as file:
+        file.write(random_vectors(1, seed=6).tobytes())
+    with open(store._file("records"), "ab") as file:
+        file.write(b'{"row": 50, "id": "torn"')
+
+    loaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="float32")
+    loaded.add(["next"], random_vectors(1, seed=7), ["next"], [{}])
+
+    reloaded = NumpyVectorStore.load("test", tmp_path / "store", dtype="float32")
+    assert reloaded.count() == 51
+    assert reloaded.get(ids=["torn"]) == []
+    assert reloaded.query(random_vectors(1, seed=7)[0], n_results=1)[0]["id"] == "next"
+
+
+def test_snapshot_layout_is_migrated(tmp_path):
+    path = tmp_path / "store"
+    path.mkdir()
+    np.save(path / "vectors.npy", random_vectors(3))
+    (path / "records.json").write_text(json.dumps({
+        "dtype": "float32", "ids": ["a", "b", "c"], "documents": ["A", "B", "C"],
+        "metadatas": [{"doc_id": "x"}, {"doc_id": "y"}, {"doc_id": "x"}]
+    }))
+
+    loaded = NumpyVectorStore.load("test", path, dtype="float32")
+
+    assert NumpyVectorStore.exists(path)
+    assert not (path / "records.json").exists()
+    assert [hit["text"] for hit in loaded.get(where={"doc_id": "x"})] == ["A", "C"]
+    assert loaded.query(random_vectors(3)[1], n_results=1)[0]["id"] == "b"
@@ -1,38 +1,160 @@
 import gradio as gr
 import logging
-from pathlib import Path
-import os
 import asyncio
+import threading
 import time
 
 # ✅ Import all required services
+# Heavy ones (models, Chroma, Tesseract) are imported in load_services()
 import config
-from services.document_processor import DocumentProcessor
-from services.ocr_service import OCRService
-from services.embedding_service import EmbeddingService
-from services.vector_db_service import VectorDBService
-from services.llm_service import LLMService
+from services.ingest_jobs import IngestJobManager, IngestQueueFull, DONE, FAILED, CANCELLED
+from services import telemetry
+from services.llm_service import LLMStreamError
+
+# Built by load_services(); the first access before that loads them
+SERVICE_ATTRIBUTES = (
+    "document_processor",
+    "ocr_service",
+    "embedding_service",
+    "vector_db_service",
+    "llm_service",
+    "ingest_cache",
+    "ingest_pipeline",
+    "ingest_jobs",
+    "context_packer"
+)
+
+PENDING = "pending"
+LOADING = "loading"
+WARMING = "warming"
+READY = "ready"
+WARMUP_FAILED = "failed"
+
+
+def new_session_state():
+    """Per-browser-session document context."""
+    return {
+        "collection_name": None,
+        "doc_id": None,
+        "document": None,
+        "metadata": {},
+        "job_id": None
+    }
 
 
 class GradioInterface:
     def __init__(self):
-        self.document_processor = DocumentProcessor()
-        self.ocr_service = OCRService()
-        self.embedding_service = EmbeddingService()
-        self.vector_db_service = VectorDBService(self.embedding_service)
-        self.llm_service = LLMService()
-
-        # Tracking state
-        self.current_document = None
-        self.document_summary = None
-        self.collection_name = None
-        self.document_metadata = {}
+        # Building the UI is cheap; the services behind it are loaded by warm_up()
+        self._services_lock = threading.Lock()
+        self._warmup_task = None
+        self.warmup = {
+            "status": PENDING,
+            "stage": None,
+            "started_at": None,
+            "seconds": None,
+            "error": None
+        }
+
+    def __getattr__(self, name):
+        if name in SERVICE_ATTRIBUTES:
+            self.load_services()
+            return self.__dict__[name]
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    @property
+    def services_loaded(self) -> bool:
+        return "ingest_jobs" in self.__dict__
+
+    def load_services(self):
+        """Import and build the document, model and storage services (blocking, once)."""
+        with self._services_lock:
+            if self.services_loaded:
+                return
+
+            from services.document_processor import DocumentProcessor
+            from services.ocr_service import OCRService
+            from services.embedding_service import EmbeddingService
+            from services.vector_db_service import VectorDBService
+            from services.llm_service import LLMService
+            from services.ingest_cache import IngestCache
+            from services.ingest_pipeline import IngestPipeline
+            from services.context_packer import ContextPacker
+
+            self.warmup["stage"] = "load_services"
+            document_processor = DocumentProcessor()
+            ocr_service = OCRService()
+            self.warmup["stage"] = "load_embedding_model"
+            embedding_service = EmbeddingService()
+            self.warmup["stage"] = "open_vector_db"
+            vector_db_service = VectorDBService(embedding_service)
+            ingest_cache = IngestCache()
+            ingest_pipeline = IngestPipeline(
+                document_processor,
+                ocr_service,
+                embedding_service,
+                vector_db_service,
+                ingest_cache
+            )
+
+            # Published together, so a half-built set is never visible
+            self.document_processor = document_processor
+            self.ocr_service = ocr_service
+            self.embedding_service = embedding_service
+            self.vector_db_service = vector_db_service
+            self.llm_service = LLMService()
+            self.ingest_cache = ingest_cache
+            self.ingest_pipeline = ingest_pipeline
+            self.context_packer = ContextPacker()
+            self.ingest_jobs = IngestJobManager(ingest_pipeline)
+
+    async def warm_up(self):
+        """Load the services off the event loop and optionally run a dummy encode."""
+        self.warmup.update(status=LOADING, started_at=time.time(), seconds=None, error=None)
+        started = time.perf_counter()
+        try:
+            with telemetry.trace("warmup"):
+                with telemetry.span("load_services"):
+                    await asyncio.to_thread(self.load_services)
+                if config.WARMUP_ENCODE:
+                    self.warmup.update(status=WARMING, stage="encode")
+                    # Bypasses the embedding cache, so the model itself runs
+                    with telemetry.span("warmup_encode"):
+                        await asyncio.to_thread(self.embedding_service.encode_batched, ["warm-up query"])
+        except Exception as e:
+            logging.error(f"Service warm-up failed: {e}")
+            self.warmup.update(status=WARMUP_FAILED, error=str(e), seconds=round(time.perf_counter() - started, 3))
+            raise
+
+        self.warmup.update(status=READY, stage=None, seconds=round(time.perf_counter() - started, 3))
+        logging.info(f"Services ready in {self.warmup['seconds']:.2f}s")
+
+    def start_warm_up(self) -> asyncio.Task:
+        """Start warm-up in the background, or return the one already running or done."""
+        task = self._warmup_task
+        if task is None or (task.done() and self.warmup["status"] == WARMUP_FAILED):
+            task = asyncio.get_running_loop().create_task(self.warm_up())
+            # Failures are reported through self.warmup; don't log them as unretrieved
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            self._warmup_task = task
+        return task
+
+    @property
+    def is_ready(self) -> bool:
+        return self.warmup["status"] == READY
+
+    async def ready(self):
+        """Wait until warm-up has finished; a failed warm-up is retried."""
+        if not self.is_ready:
+            await asyncio.shield(self.start_warm_up())
 
     def create_ui(self):
         """Create and configure the Gradio UI."""
         with gr.Blocks(title="Intelligent Document Processing & Q&A") as app:
             gr.Markdown("# 📄 Intelligent Document Processing & Q&A System")
 
+            # Document context lives in session state, not on the shared interface
+            session_state = gr.State(new_session_state())
+
             with gr.Row():
                 with gr.Column(scale=2):
                     file_input = gr.File(
@@ -40,7 +162,15 @@ class GradioInterface:
                         file_types=[".pdf"],
                         type="file"
                     )
-                    process_btn = gr.Button("Process Document", variant="primary")
+                    # Update the session's current document in place instead of adding a new one
+                    replace_current = gr.Checkbox(
+                        label="This is a revision of the current document",
+                        value=False,
+                        visible=config.INCREMENTAL_INGEST
+                    )
+                    with gr.Row():
+                        process_btn = gr.Button("Process Document", variant="primary")
+                        cancel_btn = gr.Button("Cancel")
                     status_output = gr.Textbox(label="Processing Status", interactive=False)
 
                 with gr.Column(scale=3):
@@ -55,26 +185,46 @@ class GradioInterface:
                 submit_btn = gr.Button("Submit", variant="primary")
 
             with gr.Row():
+                # Corpus mode: answer from every ingested document, not just this one
+                search_all = gr.Checkbox(
+                    label="Search all documents",
+                    value=False,
+                    visible=config.CORPUS_MODE
+                )
+                summarize_btn = gr.Button("Summarize Document")
                 clear_btn = gr.Button("Clear Chat")
 
             process_btn.click(
                 fn=self.process_document,
-                inputs=[file_input],
-                outputs=[status_output]
+                inputs=[file_input, session_state, replace_current],
+                outputs=[status_output, session_state]
+            )
+
+            cancel_btn.click(
+                fn=self.cancel_processing,
+                inputs=[session_state],
+                outputs=[status_output],
+                queue=False
             )
 
             submit_btn.click(
                 fn=self.answer_question,
-                inputs=[question_input, chatbot],
+                inputs=[question_input, chatbot, session_state, search_all],
                 outputs=[chatbot, question_input]
             )
 
             question_input.submit(
                 fn=self.answer_question,
-                inputs=[question_input, chatbot],
+                inputs=[question_input, chatbot, session_state, search_all],
                 outputs=[chatbot, question_input]
             )
 
+            summarize_btn.click(
+                fn=self.summarize_document,
+                inputs=[chatbot, session_state],
+                outputs=[chatbot]
+            )
+
             clear_btn.click(
                 fn=lambda: None,
                 inputs=None,
@@ -82,107 +232,191 @@ class GradioInterface:
                 show_progress=False
             )
 
-        return app
+        # Handlers are coroutines, so several sessions can ingest and chat at once
+        app.queue(
+            concurrency_count=config.GRADIO_CONCURRENCY,
+            max_size=config.GRADIO_QUEUE_MAX_SIZE
+        )
 
-    async def _process_pdf_async(self, file_path):
-        """Process the PDF file asynchronously."""
-        try:
-            processed_doc = await self.document_processor.process_pdf(file_path)
-            extracted_text = ""
-
-            for page_num in sorted(processed_doc["extracted_text"].keys()):
-                page_text = processed_doc["extracted_text"][page_num]
-                if page_text and page_text.strip():
-                    extracted_text += page_text + "\n\n"
-
-            if len(extracted_text.strip()) < 100 and processed_doc["images"]:
-                ocr_text = await self.ocr_service.process_images(processed_doc["images"])
-                for page_num in sorted(ocr_text.keys()):
-                    extracted_text += ocr_text[page_num] + "\n\n"
-
-            # Extract title and first line
-            lines = extracted_text.strip().splitlines()
-            non_empty_lines = [line.strip() for line in lines if line.strip()]
-            title_line = non_empty_lines[0] if non_empty_lines else "Unknown"
-            first_line = non_empty_lines[1] if len(non_empty_lines) > 1 else "Unknown"
-            self.document_metadata = {
-                "title": title_line,
-                "first_line": first_line
-            }
+        return app
 
-            filename = Path(file_path).stem
-            self.collection_name = f"doc_{filename}_{int(time.time())}"
+    async def process_document(self, file_obj, session, replace_current=False):
+        """Submit the uploaded document for background ingestion and stream its progress."""
+        session = session or new_session_state()
 
-            chunks = self.embedding_service.chunk_text(extracted_text)
-            self.vector_db_service.create_collection(self.collection_name, overwrite=True)
-            self.vector_db_service.add_documents(self.collection_name, chunks)
+        if not file_obj:
+            yield "Please upload a PDF file first.", session
+            return
 
-            self.current_document = {
-                "path": file_path,
-                "filename": filename,
-                "text": extracted_text,
-                "chunks": chunks
-            }
+        if not self.is_ready:
+            yield "Loading models, please wait...", session
+            try:
+                await self.ready()
+            except Exception as e:
+                yield f"Error: service warm-up failed: {str(e)}", session
+                return
 
-            return True, "Document processed successfully! Ready for Q&A."
-        except Exception as e:
-            logging.error(f"Error processing document: {e}")
-            return False, f"Error processing document: {str(e)}"
+        try:
+            replace = None
+            if replace_current and config.INCREMENTAL_INGEST and session["collection_name"]:
+                replace = {"collection_name": session["collection_name"], "doc_id": session.get("doc_id")}
+            job = self.ingest_jobs.submit(file_obj.name, replace=replace)
+        except IngestQueueFull as e:
+            yield str(e), session
+            return
 
-    def process_document(self, file_obj):
-        """Process the uploaded document."""
-        if not file_obj:
-            return "Please upload a PDF file first."
+        session["job_id"] = job.id
+        yield job.describe(), session
 
         try:
-            file_path = file_obj.name
-            success, result = asyncio.run(self._process_pdf_async(file_path))
-            return result
+            async for event in self.ingest_jobs.watch(job):
+                if event["stage"] not in (DONE, FAILED, CANCELLED):
+                    yield job.describe(event), session
         except Exception as e:
             logging.error(f"Error in document processing: {e}")
-            return f"Error: {str(e)}"
+            yield f"Error: {str(e)}", session
+            return
+
+        if job.status == DONE:
+            result = job.result
+            session["collection_name"] = result["collection_name"]
+            session["doc_id"] = result.get("doc_id")
+            session["metadata"] = result["metadata"]
+            session["document"] = {
+                "path": file_obj.name,
+                "filename": result["filename"],
+                "text": result["text"],
+                "chunks": result["chunks"]
+            }
+            if result.get("from_cache"):
+                yield "Document loaded from cache! Ready for Q&A.", session
+            elif result.get("incremental"):
+                changes = result["incremental"]
+                yield (
+                    f"Document updated from its previous version! Reused {changes['chunks_reused']} of "
+                    f"{len(result['chunks'])} chunks; embedded {changes['chunks_embedded']}, "
+                    f"removed {changes['chunks_removed']}. Ready for Q&A."
+                ), session
+            else:
+                yield "Document processed successfully! Ready for Q&A.", session
+        elif job.status == CANCELLED:
+            yield f"[job {job.id}] Processing cancelled.", session
+        else:
+            yield f"Error processing document: {job.error}", session
+
+    async def cancel_processing(self, session):
+        """Cancel the session's running ingestion job."""
+        job_id = (session or {}).get("job_id")
+        if job_id and self.services_loaded and self.ingest_jobs.cancel(job_id):
+            return f"[job {job_id}] Cancelling..."
+        return "No document is being processed."
+
+    async def summarize_document(self, history, session):
+        """Summarize the session's document into the chat."""
+        history = history or []
+        document = (session or {}).get("document")
+        request = "Summarize the document"
+
+        if not document:
+            history.append([request, "Please upload and process a document first."])
+            yield history
+            return
+
+        history.append([request, "Summarizing..."])
+        yield history
+
+        try:
+            await self.ready()
+            # Long documents are summarized map-reduce over their chunks
+            history[-1][1] = await self.llm_service.generate_summary(document["text"], document["chunks"])
+        except Exception as e:
+            logging.error(f"Error summarizing document: {e}")
+            history[-1][1] = f"Error: {str(e)}"
+        yield history
+
+    async def _answer_question_stream(self, question, session, search_all=False):
+        """Answer a question using RAG, yielding the answer as it is generated."""
+        if search_all and config.CORPUS_MODE:
+            collection_name, doc_ids = config.CORPUS_COLLECTION, None
+        elif session["collection_name"]:
+            collection_name = session["collection_name"]
+            doc_ids = [session["doc_id"]] if session.get("doc_id") else None
+        else:
+            yield "Please upload and process a document first."
+            return
+
+        await self.ready()
+
+        question_trace = telemetry.Trace("question", collection=collection_name)
+        try:
+            # The trace is only current between yields; a generator may resume in another task
+            with telemetry.activate(question_trace):
+                # Retrieval is blocking; keep it off the event loop
+                results = await asyncio.to_thread(
+                    self.vector_db_service.query_collection,
+                    collection_name,
+                    question,
+                    n_results=config.CONTEXT_CANDIDATES,
+                    doc_ids=doc_ids
+                )
 
-    async def _answer_question_async(self, question):
-        """Answer a question asynchronously using RAG."""
-        if not self.collection_name:
-            return "Please upload and process a document first."
+                # Merge overlapping chunks, drop near-duplicates and fit the token budget
+                context, _ = self.context_packer.pack(results)
 
-        results = self.vector_db_service.query_collection(
-            self.collection_name,
-            question,
-            n_results=5
-        )
+            with question_trace.span("answer_stream"):
+                async for token in self.llm_service.answer_question_stream(
+                    question, context, trace=question_trace
+                ):
+                    yield token
+        finally:
+            question_trace.finish()
 
-        answer = await self.llm_service.answer_question(question, results)
-        return answer
+    async def answer_question(self, question, history, session, search_all=False):
+        """Handle question answering in the chatbot, streaming partial answers."""
+        history = history or []
+        session = session or new_session_state()
+        document_metadata = session["metadata"]
 
-    def answer_question(self, question, history):
-        """Handle question answering in the chatbot."""
         if not question or not question.strip():
-            return history, ""
+            yield history, ""
+            return
 
-        if not self.collection_name:
-            history.append((question, "Please upload and process a document first."))
-            return history, ""
+        search_all = bool(search_all) and config.CORPUS_MODE
+
+        if not session["collection_name"] and not search_all:
+            history.append([question, "Please upload and process a document first."])
+            yield history, ""
+            return
 
         lower_q = question.lower().strip()
 
         # Only respond with title directly if the question is very specific
-        if any(kw in lower_q for kw in ["title", "name of the story", "chapter title"]) and self.document_metadata.get("title"):
-            answer = f"The title of the story is: **{self.document_metadata['title']}**"
-            history.append((question, answer))
-            return history, ""
-
-        if "first line" in lower_q and self.document_metadata.get("first_line"):
-            answer = f"The first line of the story is: \"{self.document_metadata['first_line']}\""
-            history.append((question, answer))
-            return history, ""
-
+        if not search_all and any(kw in lower_q for kw in ["title", "name of the story", "chapter title"]) and document_metadata.get("title"):
+            answer = f"The title of the story is: **{document_metadata['title']}**"
+            history.append([question, answer])
+            yield history, ""
+            return
+
+        if not search_all and "first line" in lower_q and document_metadata.get("first_line"):
+            answer = f"The first line of the story is: \"{document_metadata['first_line']}\""
+            history.append([question, answer])
+            yield history, ""
+            return
+
+        history.append([question, ""])
         try:
-            answer = asyncio.run(self._answer_question_async(question))
-            history.append((question, answer))
-            return history, ""
+            async for token in self._answer_question_stream(question, session, search_all):
+                history[-1][1] += token
+                yield history, ""
+        except LLMStreamError as e:
+            logging.error(f"Error answering question: {e}")
+            if e.partial:
+                # Keep what was streamed and report the failure as its own message
+                history.append([None, f"⚠️ The answer above is incomplete. {str(e)}"])
+            else:
+                history[-1][1] = str(e)
+            yield history, ""
         except Exception as e:
             logging.error(f"Error answering question: {e}")
-            history.append((question, f"Error: {str(e)}"))
-            return history, ""
\ No newline at end of file
+            history[-1][1] = f"Error: {str(e)}"
+            yield history, ""